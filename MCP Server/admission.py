@@ -0,0 +1,235 @@
+"""
+Rate limiting and admission control for the API and the MCP tools
+
+Two checks run before a request or tool call does any work:
+
+- Token buckets per (client, route): each client may call each route or
+  tool at a sustained `rate` per second with bursts up to `burst`. One
+  runaway agent exhausts its own buckets without touching anyone else's.
+- A bounded admission queue: at most `max_concurrent` requests run at
+  once, and the rest wait in a queue of at most `max_queue`. A request
+  that would wait longer than `max_wait` seconds (predicted from recent
+  service times, or actually timing out) is shed immediately, so the
+  requests that are admitted still meet their latency goal.
+
+MCP sessions get a queue of their own on top (SessionLimits): a client
+that fires many tool calls at once over one streamable HTTP session waits
+in its session's queue, and cannot take over the shared slots.
+
+Rejections raise Rejected with a retry-after hint; the API turns it into a
+429 response and the MCP server into a tool error. Both checks are plain
+arithmetic on the event loop thread and cost microseconds.
+
+Configuration comes from the environment:
+
+    TODO_RATE_LIMIT=50:100             default rate:burst for every route/tool (off if unset)
+    TODO_RATE_LIMITS="create_todo=5:10,POST /todos=5:10"   per route/tool overrides
+    TODO_MAX_CONCURRENCY=256  TODO_MAX_QUEUE=1024  TODO_MAX_QUEUE_WAIT_MS=2000
+    TODO_MCP_SESSION_CONCURRENCY=8  TODO_MCP_SESSION_QUEUE=32     per MCP session
+    TODO_TRUST_CLIENT_ID=1             key API clients by X-Client-Id (set only behind a proxy that sets it)
+"""
+import asyncio
+import os
+import re
+import time
+import weakref
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+Limit = Tuple[float, float]
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class Rejected(Exception):
+    """The request was not admitted; retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}, retry in {retry_after:.2f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def route_key(method: str, path: str) -> str:
+    """Rate-limit key of an HTTP request: ids are collapsed, so /todos/7 is "GET /todos/{id}" """
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+def parse_limit(text: str) -> Limit:
+    """"rate" or "rate:burst" (burst defaults to twice the rate)"""
+    rate, _, burst = text.partition(":")
+    return float(rate), float(burst) if burst else 2 * float(rate)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.stamp = burst, now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0, or the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per (client, route), with per-route limits"""
+
+    def __init__(self, default: Optional[Limit] = None, routes: Optional[Dict[str, Limit]] = None,
+                 max_buckets: int = 100_000):
+        self.default = default
+        self.routes = routes or {}
+        self.max_buckets = max_buckets
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def check(self, client: str, route: str, now: Optional[float] = None) -> float:
+        """0 when the call may go ahead, else seconds to wait"""
+        limit = self.routes.get(route, self.default)
+        if limit is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        key = (client, route)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_buckets:
+                # Forget the oldest bucket; at worst its client gets a fresh burst
+                del self.buckets[next(iter(self.buckets))]
+            bucket = self.buckets[key] = TokenBucket(*limit, now)
+        return bucket.take(now)
+
+
+class AdmissionQueue:
+    """At most `max_concurrent` running, `max_queue` waiting, none waiting past `max_wait`"""
+
+    def __init__(self, max_concurrent: int = 256, max_queue: int = 1024, max_wait: float = 2.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiters = 0
+        # Moving average of how long an admitted request holds its slot
+        self.service_time = 0.0
+        self.slots: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_concurrent)
+        if self.slots.locked():
+            if self.waiters >= self.max_queue:
+                raise Rejected("server busy: admission queue full", self.service_time or 1.0)
+            predicted = (self.waiters + 1) * self.service_time / self.max_concurrent
+            if predicted > self.max_wait:
+                raise Rejected("server busy: expected wait over the latency goal", predicted)
+            self.waiters += 1
+            try:
+                # wait_for rather than asyncio.timeout, which needs Python 3.11
+                await asyncio.wait_for(self.slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                raise Rejected("server busy: timed out in the admission queue", self.max_wait) from None
+            finally:
+                self.waiters -= 1
+        else:
+            await self.slots.acquire()
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.slots.release()
+            self.service_time += 0.1 * (time.monotonic() - started - self.service_time)
+
+
+class AdmissionControl:
+    """Rate limits, then a slot in the admission queue"""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, queue: Optional[AdmissionQueue] = None,
+                 trust_client_id: bool = False):
+        self.limiter = limiter or RateLimiter()
+        self.queue = queue or AdmissionQueue()
+        # Whether the API may tell clients apart by their X-Client-Id header
+        self.trust_client_id = trust_client_id
+        self.outcomes: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionControl":
+        default = os.environ.get("TODO_RATE_LIMIT")
+        routes = {}
+        for item in filter(None, os.environ.get("TODO_RATE_LIMITS", "").split(",")):
+            route, _, limit = item.rpartition("=")
+            routes[route.strip()] = parse_limit(limit)
+        return cls(
+            RateLimiter(parse_limit(default) if default else None, routes),
+            AdmissionQueue(
+                max_concurrent=int(os.environ.get("TODO_MAX_CONCURRENCY", 256)),
+                max_queue=int(os.environ.get("TODO_MAX_QUEUE", 1024)),
+                max_wait=float(os.environ.get("TODO_MAX_QUEUE_WAIT_MS", 2000)) / 1000,
+            ),
+            trust_client_id=os.environ.get("TODO_TRUST_CLIENT_ID", "") not in ("", "0"),
+        )
+
+    @asynccontextmanager
+    async def admit(self, client: str, route: str):
+        """Run the block if the client may call the route now, else raise Rejected"""
+        retry_after = self.limiter.check(client, route)
+        if retry_after:
+            self.outcomes["rate_limited"] += 1
+            raise Rejected(f"rate limit exceeded for {route}", retry_after)
+        try:
+            async with self.queue.slot():
+                self.outcomes["admitted"] += 1
+                yield
+        except Rejected:
+            self.outcomes["shed"] += 1
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "admitted": self.outcomes["admitted"],
+            "rate_limited": self.outcomes["rate_limited"],
+            "shed": self.outcomes["shed"],
+            "active": self.queue.active,
+            "queued": self.queue.waiters,
+            "avg_service_ms": round(self.queue.service_time * 1000, 3),
+        }
+
+
+class SessionLimits:
+    """An admission queue per client session, dropped with the session"""
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, max_wait: float = 2.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.queues: "weakref.WeakKeyDictionary[object, AdmissionQueue]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> "SessionLimits":
+        return cls(
+            max_concurrent=int(os.environ.get("TODO_MCP_SESSION_CONCURRENCY", 8)),
+            max_queue=int(os.environ.get("TODO_MCP_SESSION_QUEUE", 32)),
+            max_wait=float(os.environ.get("TODO_MAX_QUEUE_WAIT_MS", 2000)) / 1000,
+        )
+
+    def slot(self, session: object):
+        """A slot in the session's queue; raises Rejected when the session has too many calls waiting"""
+        queue = self.queues.get(session)
+        if queue is None:
+            queue = self.queues[session] = AdmissionQueue(self.max_concurrent, self.max_queue, self.max_wait)
+        return queue.slot()
+
+    def stats(self) -> Dict[str, int]:
+        queues = list(self.queues.values())
+        return {
+            "sessions": len(queues),
+            "active": sum(queue.active for queue in queues),
+            "queued": sum(queue.waiters for queue in queues),
+        }
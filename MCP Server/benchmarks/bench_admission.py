@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: overhead of rate limiting and admission control
+
+Measures what admission costs per request, first in isolation (one
+admit() around an empty block, with rate limits off and on) and then end
+to end: GET /todos/{id} through the ASGI app in-process, with admission
+control disabled, with it enabled but never limiting, and with a rate
+limit on every route.
+
+    python benchmarks/bench_admission.py --calls 100000 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import main
+from admission import AdmissionControl, RateLimiter
+from models import TodoCreate
+
+
+class NoAdmission:
+    """Stand-in that admits everything without any bookkeeping"""
+
+    def admit(self, client, route):
+        return _NOTHING
+
+
+class _Nothing:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+_NOTHING = _Nothing()
+
+
+async def admit_loop(control, calls: int, clients: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        async with control.admit(f"default/client-{i % clients}", "GET /todos/{id}"):
+            pass
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def http_loop(control, requests: int, todo_id: int) -> float:
+    main.admission = control
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get(f"/todos/{todo_id}")
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get(f"/todos/{todo_id}")
+            assert response.status_code == 200, response.status_code
+        return (time.perf_counter() - started) / requests * 1e6
+
+
+def main_():
+    parser = argparse.ArgumentParser(description="Admission control overhead")
+    parser.add_argument("--calls", type=int, default=100_000, help="admit() calls in the micro benchmark")
+    parser.add_argument("--clients", type=int, default=1000, help="distinct clients (token buckets)")
+    parser.add_argument("--requests", type=int, default=5000, help="HTTP requests per configuration")
+    args = parser.parse_args()
+
+    # Limits generous enough that nothing is ever refused
+    limited = (1e9, 1e9)
+    print(f"⏱  admit() around an empty block, {args.clients} clients")
+    for label, control in (
+        ("rate limits off", AdmissionControl()),
+        ("rate limit on", AdmissionControl(RateLimiter(default=limited))),
+    ):
+        print(f"   {label:<18} {asyncio.run(admit_loop(control, args.calls, args.clients)):>8.2f} µs/call")
+
+    todo_id = main.database.create_todo(TodoCreate(title="Benchmark todo")).id
+    print("\n🌐 GET /todos/{id} through the ASGI app")
+    baseline = None
+    for label, control in (
+        ("no admission", NoAdmission()),
+        ("admission, no limits", AdmissionControl()),
+        ("admission + limits", AdmissionControl(RateLimiter(default=limited))),
+    ):
+        per_request = asyncio.run(http_loop(control, args.requests, todo_id))
+        extra = "" if baseline is None else f"  (+{per_request - baseline:.1f} µs)"
+        baseline = per_request if baseline is None else baseline
+        print(f"   {label:<22} {per_request:>8.1f} µs/request{extra}")
+
+
+if __name__ == "__main__":
+    main_()
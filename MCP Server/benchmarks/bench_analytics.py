@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: group-by analytics, columnar NumPy mirror vs walking Todo objects
+
+Fills a columnar mirror with --rows todos created over the last year (a
+fifth completed, with 1-3 of --tags tags each), then times count, mean age
+and median time to complete per status, priority and tag:
+
+- the vectorised group-by over the mirror's columns;
+- the same aggregation as a Python loop over Todo objects, the way a
+  report over the dict of todos would be written.
+
+Building the mirror from Todo objects is timed too: the in-memory backend
+pays it once, on the first analytics request.
+
+    python benchmarks/bench_analytics.py --rows 2000000 --tags 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitmap_index import TagIndex
+from columnar import TodoColumns, summarize
+from models import AnalyticsGroupBy, Todo, TodoStatus
+
+
+def timed(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def make_todos(rows: int, tags: int, now: datetime, rng: random.Random):
+    year = 365 * 86400
+    statuses = list(TodoStatus)
+    for todo_id in range(1, rows + 1):
+        created = now - timedelta(seconds=rng.uniform(0, year))
+        status = statuses[0] if rng.random() < 0.4 else rng.choice(statuses)
+        updated = created + timedelta(seconds=rng.expovariate(1 / (3 * 86400)))
+        yield Todo(
+            id=todo_id, title=f"task {todo_id}", priority=rng.randint(1, 5), status=status,
+            created_at=created, updated_at=min(updated, now),
+            tags=sorted({f"tag{rng.randrange(tags)}" for _ in range(rng.randint(1, 3))}),
+        )
+
+
+def loop(todos, group_by: AnalyticsGroupBy, now: datetime):
+    """The aggregation as a plain loop: count, summed age and times to complete per key"""
+    groups = {}
+    for todo in todos:
+        if group_by == AnalyticsGroupBy.TAG:
+            keys = todo.tags
+        elif group_by == AnalyticsGroupBy.STATUS:
+            keys = [todo.status.value]
+        else:
+            keys = [str(todo.priority)]
+        age = (now - todo.created_at).total_seconds()
+        took = (todo.updated_at - todo.created_at).total_seconds() if todo.status == TodoStatus.COMPLETED else None
+        for key in keys:
+            entry = groups.setdefault(key, [0, 0.0, []])
+            entry[0] += 1
+            entry[1] += age
+            if took is not None:
+                entry[2].append(took)
+    return len(todos), {key: (count, age, np.sort(np.array(took, dtype=np.float64)))
+                        for key, (count, age, took) in groups.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group-by analytics: columnar mirror vs a loop over todos")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--tags", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    todos = list(make_todos(args.rows, args.tags, now, random.Random(11)))
+    started = time.perf_counter()
+    columns = TodoColumns()
+    columns.add_many(todos)
+    built = time.perf_counter() - started
+    index = TagIndex()
+    index.add_many((todo.id, todo.tags) for todo in todos)
+    tags = {tag: bitmap.array() for tag, bitmap in index.tags.items()}
+    size = sum(getattr(columns, name).nbytes for name in ("ids", "status", "priority", "created", "done", "row_of"))
+    print(f"📊 {args.rows:,} todos, {args.tags} tags, median of {args.repeat}")
+    print(f"   mirror built in {built:.1f} s, {size / 2**20:.0f} MiB\n")
+
+    print(f"{'group by':<12} {'groups':>7} {'loop ms':>9} {'columnar ms':>12} {'speedup':>8}")
+    for group_by in (AnalyticsGroupBy.STATUS, AnalyticsGroupBy.PRIORITY, AnalyticsGroupBy.TAG):
+        loop_ms, expected = timed(lambda: loop(todos, group_by, now), max(1, args.repeat // 2))
+        columnar_ms, partial = timed(lambda: columns.group(group_by, now, tags), args.repeat)
+        found, wanted = summarize(group_by, partial, now), summarize(group_by, expected, now)
+        assert [(g.key, g.count, g.completed) for g in found.groups] == \
+            [(g.key, g.count, g.completed) for g in wanted.groups]
+        for got, want in zip(found.groups, wanted.groups):
+            assert abs(got.mean_age_hours - want.mean_age_hours) < 0.01
+        print(f"{group_by.value:<12} {len(found.groups):>7} {loop_ms:>9.0f} {columnar_ms:>12.1f} "
+              f"{loop_ms / columnar_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bursts of identical reads with and without single-flight
+
+Fills a store with --rows todos and fires bursts of --burst concurrent
+identical reads through database.store (the path the API and MCP handlers
+take): the pending listing, a substring search and the stats counters.
+Each burst runs with coalescing on and off; the report shows how many
+backend executions the burst cost and how long it took to answer all of
+its callers.
+
+    python benchmarks/bench_coalescing.py --backend sqlite --rows 50000 --burst 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from models import TodoCreate, TodoQuery
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+READS = {
+    "status=pending": lambda store: store.query(TodoQuery(statuses=["pending"])),
+    "search 'invoice'": lambda store: store.search("invoice"),
+    "stats": lambda store: store.counts(),
+}
+
+
+async def burst(read, size: int, coalesce: bool):
+    store = database.store
+    store.flights.enabled = coalesce
+    before = store.flights.stats()["executions"]
+    started = time.perf_counter()
+    await asyncio.gather(*(read(store) for _ in range(size)))
+    return (time.perf_counter() - started) * 1000, store.flights.stats()["executions"] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identical-read bursts with and without coalescing")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="sqlite")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--burst", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.configure(args.backend, os.path.join(tmp, "todos.db"))
+        for i in range(args.rows):
+            database.create_todo(TodoCreate(title=f"{WORDS[i % len(WORDS)]} task {i}",
+                                            status=["pending", "in_progress", "completed"][i % 3]))
+        print(f"📦 {args.rows} todos ({args.backend}), bursts of {args.burst} identical reads\n")
+        print(f"{'read':<18} {'coalesced ms':>13} {'runs':>5} {'separate ms':>12} {'runs':>5}")
+        for label, read in READS.items():
+            on_ms, on_runs = asyncio.run(burst(read, args.burst, True))
+            off_ms, off_runs = asyncio.run(burst(read, args.burst, False))
+            print(f"{label:<18} {on_ms:>13.1f} {on_runs:>5} {off_ms:>12.1f} {off_runs:>5}")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes on the wire and latency of large listings, by encoding
+
+Fills the in-memory store with --rows todos and fetches GET /todos through
+the ASGI app in-process, once per available encoding (identity, gzip, and
+br/zstd when their packages are installed), with and without the
+precompressed response cache. For each it reports the response size, the
+server-side latency, and an end-to-end estimate that adds the time to move
+the bytes over a --mbps link.
+
+    python benchmarks/bench_compression.py --rows 10000 --requests 20 --mbps 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import database
+import main
+from content_encoding import CODECS, ResponseCompressor
+from models import TodoCreate
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+
+async def fetch(encoding: str, requests: int, cache: bool):
+    main.compressor = ResponseCompressor(cache_entries=16 if cache else 0)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {"Accept-Encoding": encoding}
+        latencies, size = [], 0
+        for _ in range(requests):
+            started = time.perf_counter()
+            async with client.stream("GET", "/todos", headers=headers) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.headers.get("content-encoding", "identity") == encoding
+            size = len(raw)
+    return statistics.median(latencies), size
+
+
+def main_():
+    parser = argparse.ArgumentParser(description="Compressed vs plain listing responses")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--mbps", type=float, default=100.0, help="Link speed for the end-to-end estimate")
+    args = parser.parse_args()
+
+    for i in range(args.rows):
+        database.create_todo(TodoCreate(
+            title=f"{WORDS[i % len(WORDS)]} task {i}",
+            description=f"Follow up on {WORDS[(i * 7) % len(WORDS)]} with the team",
+            priority=1 + i % 5,
+        ))
+    print(f"📦 GET /todos with {args.rows} todos, median of {args.requests} requests, {args.mbps:g} Mbit/s link\n")
+    print(f"{'encoding':<10} {'cache':<6} {'bytes':>11} {'ratio':>6} {'server ms':>10} {'wire ms':>8} {'total ms':>9}")
+    plain = None
+    for encoding in ["identity", *CODECS]:
+        for cache in ((False,) if encoding == "identity" else (False, True)):
+            latency, size = asyncio.run(fetch(encoding, args.requests, cache))
+            plain = plain or size
+            wire = size * 8 / (args.mbps * 1e6) * 1000
+            print(f"{encoding:<10} {'on' if cache else 'off':<6} {size:>11,} {plain / size:>6.1f} "
+                  f"{latency:>10.1f} {wire:>8.1f} {latency + wire:>9.1f}")
+
+
+if __name__ == "__main__":
+    main_()
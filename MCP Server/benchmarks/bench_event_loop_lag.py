@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event-loop stalls from storage calls, blocking vs async store
+
+Fills a SQLite store with --rows todos, then runs --requests concurrent
+"handlers" that each do a substring search, while a heartbeat task ticks
+every millisecond and records how late each tick fires. Handlers either
+call the backend directly from the coroutine, as the server used to, or
+await database.store, which runs SQLite work in a worker thread.
+
+A stalled loop cannot accept connections or answer cheap requests, so the
+heartbeat's worst-case lateness is the latency every other client pays.
+
+    python benchmarks/bench_event_loop_lag.py --rows 50000 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from models import TodoCreate
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+
+async def heartbeat(lags, stop: asyncio.Event, interval: float = 0.001):
+    loop = asyncio.get_running_loop()
+    expected = loop.time() + interval
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, expected - loop.time()))
+        now = loop.time()
+        lags.append((now - expected) * 1000)
+        expected = now + interval
+
+
+async def run(handler, requests: int):
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(WORDS[i % len(WORDS)]) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    lags.sort()
+    return elapsed, lags[-1], lags[int(len(lags) * 0.99) - 1], statistics.median(lags)
+
+
+async def blocking_handler(word: str):
+    return database.search_todos(word)
+
+
+async def async_handler(word: str):
+    return await database.store.search(word)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag under storage load")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.configure("sqlite", os.path.join(tmp, "todos.db"))
+        for i in range(args.rows):
+            database.create_todo(TodoCreate(title=f"{WORDS[i % len(WORDS)]} task {i}"))
+        print(f"📦 {args.rows} todos in SQLite, {args.requests} concurrent searches\n")
+        print(f"{'handlers':<10} {'total s':>8} {'max lag ms':>11} {'p99 lag ms':>11} {'median ms':>10}")
+        for label, handler in (("blocking", blocking_handler), ("async", async_handler)):
+            elapsed, worst, p99, median = asyncio.run(run(handler, args.requests))
+            print(f"{label:<10} {elapsed:>8.2f} {worst:>11.1f} {p99:>11.1f} {median:>10.2f}")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
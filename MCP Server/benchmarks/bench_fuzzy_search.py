@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fuzzy search with the trigram index vs a brute-force scan
+
+Fills an in-memory store with --rows generated todos, then times each query
+through the incrementally maintained TrigramIndex and through a scan that
+scores every todo (what a backend without the index has to do), checking
+that both return the same ranking.
+
+    python benchmarks/bench_fuzzy_search.py --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trigram_index
+from database import MemoryBackend, _search_text
+from models import TodoCreate
+
+VERBS = ["deploy", "review", "write", "fix", "refactor", "document", "schedule", "migrate", "test", "plan"]
+NOUNS = ["service", "report", "meeting", "dashboard", "pipeline", "invoice", "database", "release",
+         "onboarding", "budget", "roadmap", "api", "backup", "newsletter", "contract"]
+QUALIFIERS = ["quarterly", "urgent", "weekly", "customer", "internal", "legacy", "mobile", "billing"]
+
+QUERIES = ["deployment", "deplyo servce", "quartrly report", "migrate legacy database", "newsleter", "xylophone"]
+
+
+def build_store(rows: int, seed: int) -> MemoryBackend:
+    rng = random.Random(seed)
+    store = MemoryBackend()
+    for _ in range(rows):
+        store.create(TodoCreate(
+            title=f"{rng.choice(VERBS)} {rng.choice(QUALIFIERS)} {rng.choice(NOUNS)}",
+            description=f"{rng.choice(VERBS)} the {rng.choice(NOUNS)} before the {rng.choice(NOUNS)}"
+            if rng.random() < 0.5 else None,
+            priority=rng.randint(1, 5),
+        ))
+    return store
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare indexed and brute-force fuzzy search")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--threshold", type=float, default=trigram_index.DEFAULT_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    store = build_store(args.rows, args.seed)
+    print(f"📦 {args.rows} todos, {len(store.trigrams.postings)} distinct trigrams, "
+          f"built in {time.perf_counter() - started:.1f}s (index maintained on insert)")
+    docs = [(todo.id, _search_text(todo)) for todo in store.todos.values()]
+
+    print(f"\n{'query':<26} {'matches':>8} {'index ms':>10} {'scan ms':>10} {'speedup':>8}")
+    for query in QUERIES:
+        index_ms, indexed = timed(lambda: store.trigrams.search(query, args.threshold), args.repeat)
+        scan_ms, scanned = timed(lambda: trigram_index.scan(docs, query, args.threshold), args.repeat)
+        assert [doc_id for doc_id, _ in indexed] == [doc_id for doc_id, _ in scanned], query
+        print(f"{query:<26} {len(indexed):>8} {index_ms:>10.2f} {scan_ms:>10.2f} {scan_ms / max(index_ms, 1e-6):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark: todo relations at scale, cycle checks and the incremental ready set
+
+Fills the in-memory backend with --rows todos in projects of 20-200,
+each created top-down: a root, then todos under the root or under one of
+its first levels, each blocked by up to two earlier todos of the project
+and often by one of the previous project. Those links chain every project
+to all the ones before it, so what a todo transitively waits for grows
+with the history. A quarter of the todos are completed. Then times:
+
+- creating subtasks of recent todos, blocked by older ones (the cycle
+  check on insert);
+- adding a blocker to an existing todo, accepted and refused as a cycle:
+  the level-pruned search against a plain DFS over the dependencies;
+- completing and reopening todos: the incremental ready set against
+  recomputing it from every todo's children and blockers;
+- listing the --limit todos ready to start.
+
+    python benchmarks/bench_graph.py --rows 100000 --limit 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend, _graph_entry
+from models import TodoCreate, TodoStatus, TodoUpdate
+from todo_graph import DependencyGraph
+
+
+def timed(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def per_op(fn, ops) -> float:
+    """Mean µs per call of fn over ops"""
+    started = time.perf_counter()
+    for op in ops:
+        fn(*op)
+    return (time.perf_counter() - started) / len(ops) * 1e6
+
+
+def reaches(graph: DependencyGraph, start: int, goal: int) -> bool:
+    """Plain DFS through every dependency, without levels"""
+    stack, seen = [start], {start}
+    while stack:
+        node = stack.pop()
+        if node == goal:
+            return True
+        for dependency in graph.dependencies(node):
+            if dependency not in seen:
+                seen.add(dependency)
+                stack.append(dependency)
+    return False
+
+
+def recompute_ready(backend: MemoryBackend):
+    """The ready set from scratch: every open todo whose children and blockers are all completed"""
+    todos = backend.todos
+    open_children = set()
+    for todo in todos.values():
+        if todo.parent_id in todos and todo.status != TodoStatus.COMPLETED:
+            open_children.add(todo.parent_id)
+    return {todo.id for todo in todos.values()
+            if todo.status != TodoStatus.COMPLETED and todo.id not in open_children and
+            not any(b in todos and todos[b].status != TodoStatus.COMPLETED for b in todo.blocked_by)}
+
+
+def fill(backend: MemoryBackend, rows: int, rng: random.Random) -> int:
+    """Create the projects; returns how many blocker sets were refused as cycles"""
+    previous, refused = [], 0
+    while len(backend.todos) < rows:
+        project, upper, ancestors = [], [], {}
+        for _ in range(min(rng.randint(20, 200), rows - len(backend.todos))):
+            parent = rng.choice(upper) if upper else None
+            above = {parent} | ancestors[parent] if parent else set()
+            candidates = [todo_id for todo_id in project if todo_id not in above]
+            blockers = rng.sample(candidates, min(len(candidates), rng.randint(0, 2)))
+            if previous and rng.random() < 0.5:
+                blockers.append(rng.choice(previous))
+            data = dict(title=f"task {len(backend.todos)}", priority=rng.randint(1, 5), parent_id=parent,
+                        status=TodoStatus.COMPLETED if rng.random() < 0.25 else TodoStatus.PENDING)
+            try:
+                todo = backend.create(TodoCreate(**data, blocked_by=blockers))
+            except ValueError:
+                # A blocker that already waits for an ancestor of this todo
+                refused += 1
+                todo = backend.create(TodoCreate(**data))
+            project.append(todo.id)
+            ancestors[todo.id] = above
+            if len(above) < 2:
+                upper.append(todo.id)
+        previous = project
+    return refused
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dependency graph: cycle checks and the incremental ready set")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--ops", type=int, default=2000, help="Writes timed per row of the table")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    backend = MemoryBackend()
+    started = time.perf_counter()
+    refused = fill(backend, args.rows, rng)
+    filled = time.perf_counter() - started
+    graph = backend._graph()
+    started = time.perf_counter()
+    DependencyGraph().load(_graph_entry(todo) for todo in backend.todos.values())
+    built = time.perf_counter() - started
+    edges = len(graph.parent) + sum(len(blockers) for blockers in graph.blocked_by.values())
+    print(f"🕸️  {args.rows:,} todos, {edges:,} relations, {len(graph.ready):,} ready, median of {args.repeat}")
+    print(f"   filled in {filled:.1f} s ({refused} blocker sets refused as cycles), "
+          f"graph built in {built * 1000:.0f} ms\n")
+
+    print(f"{'write':<36} {'µs/op':>9} {'plain DFS µs':>13}")
+    last = max(backend.todos)
+    # A subtask of a recent todo, blocked by todos from earlier projects
+    creates = [(TodoCreate(title=f"new {i}", parent_id=rng.randint(last - 200, last),
+                           blocked_by=rng.sample(range(last - 2000, last - 200), 3)),) for i in range(args.ops)]
+    outcomes = []
+
+    def create(todo_data):
+        try:
+            backend.create(todo_data)
+        except ValueError:
+            outcomes.append(False)
+        else:
+            outcomes.append(True)
+
+    created = per_op(create, creates)
+    print(f"{'create with parent + 3 blockers':<36} {created:>9.1f}   ({outcomes.count(False)} refused as cycles)")
+
+    # A blocker from a while back, and one that already waits for the todo
+    accepted, cycles = [], []
+    for todo_id in rng.sample(range(1000, last), args.ops * 2):
+        blocker = rng.randint(todo_id - 1000, todo_id - 1)
+        if len(accepted) < args.ops and not reaches(graph, blocker, todo_id):
+            accepted.append((todo_id, blocker))
+        waiting = graph.dependents(todo_id)
+        if len(cycles) < args.ops and waiting:
+            cycles.append((todo_id, waiting[0]))
+
+    def add_blocker(todo_id, blocker):
+        try:
+            backend.update(todo_id, TodoUpdate(blocked_by=[*backend.todos[todo_id].blocked_by, blocker]))
+        except ValueError:
+            return False
+        return True
+
+    for label, pairs in [("add an older blocker", accepted), ("add a blocker that waits for it", cycles)]:
+        plain = per_op(lambda todo_id, blocker: reaches(graph, blocker, todo_id), pairs)
+        outcomes = []
+        check = per_op(lambda todo_id, blocker: outcomes.append(add_blocker(todo_id, blocker)), pairs)
+        assert all(outcomes) if pairs is accepted else not any(outcomes)
+        print(f"{label:<36} {check:>9.1f} {plain:>13.1f}")
+
+    toggles = [(todo_id, TodoUpdate(status=status)) for todo_id in rng.sample(range(1, last), args.ops // 2)
+               for status in (TodoStatus.COMPLETED, TodoStatus.PENDING)]
+    without = MemoryBackend()
+    for _ in range(args.ops // 2):
+        without.create(TodoCreate(title="plain"))
+    baseline = per_op(without.update, [(i // 2 + 1, change) for i, (_, change) in enumerate(toggles)])
+    print(f"{'complete/reopen, no graph':<36} {baseline:>9.1f}")
+    print(f"{'complete/reopen, ready set kept':<36} {per_op(backend.update, toggles):>9.1f}")
+    assert graph.ready == recompute_ready(backend)
+    recompute_ms, _ = timed(lambda: recompute_ready(backend), args.repeat)
+    print(f"{'complete/reopen, ready recomputed':<36} {recompute_ms * 1000:>9.0f}")
+
+    print(f"\n{'read':<36} {'ms':>9}")
+    ready_ms, found = timed(lambda: backend.ready(args.limit), args.repeat)
+    expected = sorted(recompute_ready(backend), key=lambda i: (-backend.todos[i].priority, i))[:args.limit]
+    assert [t.id for t in found] == expected
+    print(f"{f'{args.limit} ready todos, ready set':<36} {ready_ms:>9.2f}")
+    print(f"{f'{args.limit} ready todos, recomputed':<36} {recompute_ms:>9.1f}")
+    relations_ms, _ = timed(lambda: [backend.relations(i) for i in range(1, 101)], args.repeat)
+    print(f"{'graph of one todo':<36} {relations_ms / 100:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: idempotent and deduplicated creates
+
+Fills each backend with --rows todos, then:
+
+- creates --creates todos, each sent --retries extra times as a client
+  retrying after a timeout would, once plainly and once with an
+  idempotency key, and counts the todos that ended up existing; the
+  latency of a plain create, a keyed create and a replayed one;
+- times finding an existing todo with the same title and description:
+  the content-hash index against comparing normalized text with every
+  todo, as a check without the index would.
+
+    python benchmarks/bench_idempotency.py --rows 100000 --creates 1000 --retries 2
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend, SQLiteBackend
+from models import TodoCreate
+
+
+def timed(fn, repeat: int = 1):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(times), result
+
+
+def normalized(text) -> str:
+    return " ".join((text or "").casefold().split())
+
+
+def scan_for_duplicate(backend, title: str, description) -> bool:
+    key = (normalized(title), normalized(description))
+    return any((normalized(todo.title), normalized(todo.description)) == key for todo in backend.all())
+
+
+def run(label: str, backend, rows: int, creates: int, retries: int, repeat: int):
+    for i in range(rows):
+        backend.create(TodoCreate(title=f"Existing todo {i}", description=f"Filed by user {i % 97}"))
+    base = len(backend.all())
+
+    plain, keyed, replayed = [], [], []
+    for i in range(creates):
+        todo = TodoCreate(title=f"Plain {i}")
+        for attempt in range(1 + retries):
+            plain.append(timed(lambda: backend.create(todo))[0])
+    with_plain = len(backend.all()) - base
+    for i in range(creates):
+        todo = TodoCreate(title=f"Keyed {i}")
+        for attempt in range(1 + retries):
+            micros, _ = timed(lambda: backend.create_once(todo, f"request-{i}"))
+            (replayed if attempt else keyed).append(micros)
+    with_keys = len(backend.all()) - base - with_plain
+
+    probe = (f"existing  TODO {rows // 2}", f"filed by user {(rows // 2) % 97}")
+    indexed, found = timed(lambda: backend.duplicate_of(*probe), repeat)
+    assert found is not None
+    scanned, found = timed(lambda: scan_for_duplicate(backend, *probe), max(1, repeat // 10))
+    assert found
+
+    print(f"{label:<8} {with_plain:>8} {with_keys:>8} {statistics.median(plain):>10.0f} "
+          f"{statistics.median(keyed):>10.0f} {statistics.median(replayed):>10.0f} {indexed:>11.1f} {scanned:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idempotency keys and content-hash deduplication")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--creates", type=int, default=1000)
+    parser.add_argument("--retries", type=int, default=2, help="Extra sends of every create")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"🔁 {args.creates} creates sent {1 + args.retries} times each, over {args.rows} todos\n")
+    print("Todos created without and with keys, latency per create, and per duplicate lookup:\n")
+    print(f"{'backend':<8} {'plain':>8} {'keyed':>8} {'create µs':>10} {'keyed µs':>10} {'replay µs':>10} "
+          f"{'hash µs':>11} {'scan µs':>11}")
+    run("memory", MemoryBackend(), args.rows, args.creates, args.retries, args.repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        run("sqlite", sqlite, args.rows, args.creates, args.retries, args.repeat)
+        sqlite.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: list_todos text generation, formatting every call vs cached fragments
+
+Fills the in-memory store with --rows todos and times only the text the
+list_todos tool returns: formatting each todo afresh, as the tool used to,
+against joining fragments from todo_text.TodoText on a cold cache (first
+call) and a warm one (repeat calls). A last round updates --churn percent
+of the todos between calls, so those are rendered again.
+
+    python benchmarks/bench_mcp_rendering.py --rows 100000 --repeat 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from models import TodoCreate, TodoStatus, TodoUpdate
+from todo_text import TodoText
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+
+def uncached(todos):
+    return f"Found {len(todos)} todos:\n\n" + "\n".join([
+        f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Priority: {todo.priority})"
+        for todo in todos
+    ])
+
+
+def cached(rendered: TodoText, todos):
+    return f"Found {len(todos)} todos:\n\n" + "\n".join(rendered.lines("default", todos, "list"))
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="list_todos text generation with and without cached fragments")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--churn", type=float, default=1.0, help="Percent of todos updated between calls")
+    args = parser.parse_args()
+
+    for i in range(args.rows):
+        database.create_todo(TodoCreate(title=f"{WORDS[i % len(WORDS)]} task {i}", priority=1 + i % 5))
+    todos = database.get_all_todos()
+    assert uncached(todos[:100]) == cached(TodoText(), todos[:100])
+
+    rendered = TodoText()
+    cold_started = time.perf_counter()
+    cached(rendered, todos)
+    cold = (time.perf_counter() - cold_started) * 1000
+
+    changed = random.Random(1).sample(range(1, args.rows + 1), int(args.rows * args.churn / 100))
+
+    def churned():
+        for todo_id in changed:
+            database.update_todo(todo_id, TodoUpdate(status=TodoStatus.IN_PROGRESS))
+        fresh = database.get_all_todos()
+        started = time.perf_counter()
+        cached(rendered, fresh)
+        return (time.perf_counter() - started) * 1000
+
+    print(f"📝 list_todos text for {args.rows} todos, median of {args.repeat}\n")
+    print(f"{'rendering':<28} {'ms':>8}")
+    print(f"{'format every todo':<28} {timed(lambda: uncached(todos), args.repeat):>8.1f}")
+    print(f"{'cached, cold':<28} {cold:>8.1f}")
+    print(f"{'cached, warm':<28} {timed(lambda: cached(rendered, todos), args.repeat):>8.1f}")
+    print(f"{f'cached, {args.churn:g}% updated':<28} {statistics.median(churned() for _ in range(args.repeat)):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark: MCP sessions over stdio (a process per session) vs streamable HTTP
+
+Runs --sessions client sessions, --concurrency at a time. Each one
+initializes, makes --calls tool calls (creating a todo, then reading it
+back, in turn) and closes:
+
+- stdio: spawns the server script for every session, as Gemini CLI does;
+- http: opens a session on one long-lived `mcp_server.py --transport http`
+  process, which is started once before the clock starts; once with
+  replies as SSE streams (the default) and once as JSON bodies
+  (--json-response).
+
+Reports sessions per second and the latency of the tool calls, and for
+stdio the time to the initialize response, where most of the cost is.
+
+    python benchmarks/bench_mcp_sessions.py --sessions 200 --concurrency 8 --calls 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 0, "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {},
+        "clientInfo": {"name": "bench_mcp_sessions", "version": "1.0.0"},
+    },
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+
+def tool_call(request_id: int, todo_id):
+    """Odd ids create a todo, even ids read back the one just created"""
+    if todo_id is None:
+        name, arguments = "create_todo", {"title": f"session todo {request_id}", "priority": 3}
+    else:
+        name, arguments = "get_todo", {"todo_id": todo_id}
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}}
+
+
+def created_id(result) -> int:
+    text = result["result"]["content"][0]["text"]
+    return int(text.split("ID: ")[1].split("\n")[0])
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def stdio_session(script: str, calls: int, latencies, inits):
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, script, cwd=APP_DIR,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+
+    async def request(message):
+        proc.stdin.write((json.dumps(message) + "\n").encode())
+        await proc.stdin.drain()
+        while True:
+            reply = json.loads(await proc.stdout.readline())
+            if reply.get("id") == message["id"]:
+                return reply
+
+    try:
+        await request(INITIALIZE)
+        inits.append((time.perf_counter() - started) * 1000)
+        proc.stdin.write((json.dumps(INITIALIZED) + "\n").encode())
+        todo_id = None
+        for request_id in range(1, calls + 1):
+            called = time.perf_counter()
+            reply = await request(tool_call(request_id, todo_id))
+            latencies.append((time.perf_counter() - called) * 1000)
+            todo_id = created_id(reply) if todo_id is None else None
+    finally:
+        proc.kill()
+        await proc.wait()
+
+
+def reply_of(response: httpx.Response):
+    response.raise_for_status()
+    if response.headers["content-type"].startswith("application/json"):
+        return response.json()
+    data = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    return json.loads(data[0])
+
+
+async def http_session(client: httpx.AsyncClient, calls: int, latencies, inits):
+    async def request(message, session_id):
+        return reply_of(await client.post("/mcp", json=message, headers={**HEADERS, "Mcp-Session-Id": session_id}))
+
+    started = time.perf_counter()
+    response = await client.post("/mcp", json=INITIALIZE, headers=HEADERS)
+    response.raise_for_status()
+    session_id = response.headers["mcp-session-id"]
+    inits.append((time.perf_counter() - started) * 1000)
+    await client.post("/mcp", json=INITIALIZED, headers={**HEADERS, "Mcp-Session-Id": session_id})
+    todo_id = None
+    for request_id in range(1, calls + 1):
+        called = time.perf_counter()
+        reply = await request(tool_call(request_id, todo_id), session_id)
+        latencies.append((time.perf_counter() - called) * 1000)
+        todo_id = created_id(reply) if todo_id is None else None
+    await client.delete("/mcp", headers={**HEADERS, "Mcp-Session-Id": session_id})
+
+
+async def run_sessions(session, sessions: int, concurrency: int):
+    """Seconds to run `sessions` sessions, at most `concurrency` at a time"""
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            await session()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(sessions)))
+    return time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_http_server(port: int, *options: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "mcp_server.py", "--transport", "http", "--port", str(port), *options],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("The HTTP server did not start")
+
+
+def report(label: str, seconds: float, sessions: int, latencies, inits):
+    print(f"{label:<10} {sessions / seconds:>12.1f} {statistics.median(inits):>10.1f} "
+          f"{statistics.median(latencies):>10.2f} {percentile(latencies, 0.95):>10.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="MCP sessions: stdio spawn-per-session vs streamable HTTP")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=4, help="Tool calls per session")
+    parser.add_argument("--script", default="mcp_server_fixed.py", help="Server script spawned per stdio session")
+    args = parser.parse_args()
+
+    print(f"🔌 {args.sessions} sessions, {args.concurrency} at a time, {args.calls} tool calls each\n")
+    print(f"{'':<10} {'sessions/s':>12} {'init ms':>10} {'call p50':>10} {'call p95':>10}")
+
+    latencies, inits = [], []
+    seconds = await run_sessions(lambda: stdio_session(args.script, args.calls, latencies, inits),
+                                 args.sessions, args.concurrency)
+    report("stdio", seconds, args.sessions, latencies, inits)
+
+    for label, options in [("http/sse", ()), ("http/json", ("--json-response",))]:
+        port = free_port()
+        proc = start_http_server(port, *options)
+        try:
+            latencies, inits = [], []
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+                seconds = await run_sessions(lambda: http_session(client, args.calls, latencies, inits),
+                                             args.sessions, args.concurrency)
+            report(label, seconds, args.sessions, latencies, inits)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
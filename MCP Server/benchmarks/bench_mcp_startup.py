@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the MCP stdio server
+
+Gemini CLI spawns mcp_server_fixed.py for every session, so the time from
+process start to the `initialize` response is paid on each connection. This
+script measures:
+
+  • time to the initialize response and to the first tool call result,
+    over several fresh processes
+  • an import-time breakdown (python -X importtime) of the server module,
+    grouped by top-level package
+
+Pass --budget-ms to fail (exit code 1) when the median time to initialize
+exceeds the budget, e.g. in CI:
+
+    python benchmarks/bench_mcp_startup.py --runs 10 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "bench_mcp_startup", "version": "1.0.0"},
+    },
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+FIRST_CALL = {
+    "jsonrpc": "2.0", "id": 2, "method": "tools/call",
+    "params": {"name": "get_todo_stats", "arguments": {}},
+}
+
+
+def send(proc, message):
+    proc.stdin.write((json.dumps(message) + "\n").encode())
+    proc.stdin.flush()
+
+
+def read_response(proc, request_id):
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited before responding")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_once(script: str):
+    """Seconds from spawn to the initialize response and to the first tool result"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, script], cwd=APP_DIR,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        send(proc, INITIALIZE)
+        read_response(proc, 1)
+        initialized = time.perf_counter() - started
+        send(proc, INITIALIZED)
+        send(proc, FIRST_CALL)
+        read_response(proc, 2)
+        first_call = time.perf_counter() - started
+    finally:
+        proc.kill()
+        proc.wait()
+    return initialized, first_call
+
+
+def import_breakdown(module: str, top: int):
+    """Cumulative import time (ms) per top-level package, largest first"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    totals = defaultdict(float)
+    for line in result.stderr.splitlines():
+        # Lines look like "import time:  <self us> | <cumulative us> | <module>"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MCP server cold start")
+    parser.add_argument("--script", default="mcp_server_fixed.py", help="Server script to spawn")
+    parser.add_argument("--module", default="mcp_server", help="Module for the import breakdown")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="Packages to show in the import breakdown")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if median initialize time exceeds this")
+    args = parser.parse_args()
+
+    samples = [measure_once(args.script) for _ in range(args.runs)]
+    init_ms = [s[0] * 1000 for s in samples]
+    call_ms = [s[1] * 1000 for s in samples]
+
+    print(f"🚀 {args.script}, {args.runs} cold starts")
+    print(f"   initialize response: median {statistics.median(init_ms):8.1f} ms  min {min(init_ms):8.1f} ms")
+    print(f"   first tool result:   median {statistics.median(call_ms):8.1f} ms  min {min(call_ms):8.1f} ms")
+
+    print(f"\n📦 Import time of '{args.module}' by package (self time, ms)")
+    for package, ms in import_breakdown(args.module, args.top):
+        print(f"   {package:<24} {ms:8.1f}")
+
+    if args.budget_ms is not None:
+        median = statistics.median(init_ms)
+        if median > args.budget_ms:
+            print(f"\n❌ Median initialize time {median:.1f} ms exceeds budget of {args.budget_ms} ms")
+            sys.exit(1)
+        print(f"\n✅ Within startup budget of {args.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: "next N todos to work on" from the priority queues vs a full sort
+
+Fills an in-memory store with --rows todos and asks for the top N by
+(priority desc, created_at asc) two ways: MemoryBackend.next, which walks
+the per-(status, priority) queues and stops after N, and the old approach
+of get_all_todos("pending") followed by sorting in the caller. A share of
+the todos change status and priority first, so the queues have been
+maintained through updates rather than only appends.
+
+    python benchmarks/bench_next_todos.py --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend
+from models import TodoCreate, TodoUpdate
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time next-todos queries")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = MemoryBackend()
+    for i in range(args.rows):
+        store.create(TodoCreate(title=f"task {i}", priority=rng.randint(1, 5),
+                                status=rng.choice(["pending", "in_progress", "completed"])))
+    started = time.perf_counter()
+    updates = args.rows // 10
+    for todo_id in rng.sample(range(1, args.rows + 1), updates):
+        store.update(todo_id, TodoUpdate(priority=rng.randint(1, 5),
+                                         status=rng.choice(["pending", "in_progress", "completed"])))
+    update_us = (time.perf_counter() - started) / updates * 1e6
+    print(f"📦 {args.rows} todos, {updates} re-prioritised ({update_us:.1f} µs per update incl. all indexes)\n")
+
+    print(f"{'statuses':<22} {'N':>5} {'queues ms':>10} {'sort ms':>9} {'speedup':>8}")
+    for statuses in (["pending"], ["pending", "in_progress"]):
+        for limit in (1, 10, 100, 1000):
+            queue_ms, found = timed(lambda: store.next(statuses, limit), args.repeat)
+            sort_ms, expected = timed(lambda: sorted(
+                (t for status in statuses for t in store.all(status)),
+                key=lambda t: (-t.priority, t.created_at, t.id))[:limit], args.repeat)
+            assert found == expected, (statuses, limit)
+            print(f"{'+'.join(statuses):<22} {limit:>5} {queue_ms:>10.3f} {sort_ms:>9.2f} "
+                  f"{sort_ms / max(queue_ms, 1e-6):>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
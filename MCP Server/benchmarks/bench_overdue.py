@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: overdue listings and deadline checks, due index vs full scans
+
+Fills the in-memory backend with --rows todos due at random times in the
+month around now (a third of them completed), then times:
+
+- the --limit most overdue todos: a range read of the due index against
+  scanning every todo and sorting the overdue ones;
+- one watcher tick (the todos that became overdue in the last --tick
+  seconds) against scanning every todo for due times in that window.
+
+    python benchmarks/bench_overdue.py --rows 200000 --limit 100 --tick 1
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend
+from models import TodoCreate, TodoStatus
+
+
+def timed(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overdue checks through the due index vs scans")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--tick", type=float, default=1.0, help="Seconds covered by one watcher check")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    now = datetime.now()
+    backend = MemoryBackend()
+    month = 30 * 24 * 3600
+    for i in range(args.rows):
+        backend.create(TodoCreate(
+            title=f"task {i}",
+            status=TodoStatus.COMPLETED if i % 3 == 0 else TodoStatus.PENDING,
+            due_at=now + timedelta(seconds=rng.uniform(-month / 2, month / 2)),
+        ))
+    overdue_total = backend.by_due.count(None, now)
+    print(f"⏰ {args.rows:,} todos, {overdue_total:,} overdue, median of {args.repeat}\n")
+
+    def scan_overdue():
+        late = (t for t in backend.todos.values()
+                if t.due_at is not None and t.status != TodoStatus.COMPLETED and t.due_at < now)
+        return heapq.nsmallest(args.limit, late, key=lambda t: (t.due_at, t.id))
+
+    start = now - timedelta(seconds=args.tick)
+
+    def scan_window():
+        return sorted((t for t in backend.todos.values()
+                       if t.due_at is not None and t.status != TodoStatus.COMPLETED and start <= t.due_at < now),
+                      key=lambda t: (t.due_at, t.id))
+
+    print(f"{'question':<32} {'found':>7} {'scan ms':>9} {'index ms':>9}")
+    scan_ms, expected = timed(scan_overdue, args.repeat)
+    index_ms, found = timed(lambda: backend.overdue(now, args.limit), args.repeat)
+    assert found == expected
+    print(f"{f'{args.limit} most overdue':<32} {len(found):>7} {scan_ms:>9.1f} {index_ms:>9.3f}")
+    scan_ms, expected = timed(scan_window, args.repeat)
+    index_ms, found = timed(lambda: backend.came_due(start, now), args.repeat)
+    assert found == expected
+    print(f"{f'became overdue in last {args.tick:g}s':<32} {len(found):>7} {scan_ms:>9.1f} {index_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: mixed-predicate queries through the planner vs a full scan
+
+Fills an in-memory store with --rows todos and runs combined queries
+(status sets, priority ranges, time ranges, text, sorting, limits) through
+MemoryBackend.query, comparing each with a scan that checks every predicate
+on every todo and then sorts, and printing the plan the planner chose.
+
+    python benchmarks/bench_query_planner.py --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend, _matches
+from models import TodoCreate, TodoQuery
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+
+def build_store(rows: int, seed: int) -> MemoryBackend:
+    rng = random.Random(seed)
+    store = MemoryBackend()
+    for _ in range(rows):
+        store.create(TodoCreate(
+            title=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randint(1, 999)}",
+            priority=rng.choices([1, 2, 3, 4, 5], weights=[35, 30, 20, 10, 5])[0],
+            status=rng.choices(["pending", "in_progress", "completed"], weights=[30, 10, 60])[0],
+        ))
+    # Spread timestamps over the last 30 days so time ranges are selective
+    now = datetime.now()
+    for todo in list(store.todos.values()):
+        age = timedelta(minutes=rng.randint(0, 30 * 24 * 60))
+        aged = todo.model_copy(update={"created_at": now - age, "updated_at": now - age / 2})
+        store._unindex(todo)
+        store.todos[todo.id] = aged
+        store._index(aged)
+    return store
+
+
+def scan(store: MemoryBackend, q: TodoQuery):
+    """Check every predicate on every todo, then sort and cut"""
+    todos = [
+        t for t in store.todos.values()
+        if (not q.statuses or t.status in q.statuses)
+        and (q.min_priority or 1) <= t.priority <= (q.max_priority or 5)
+        and (q.updated_after is None or t.updated_at >= q.updated_after)
+        and (not q.text or _matches(t, q.text.lower()))
+    ]
+    field = (q.sort_by.value if q.sort_by else "id")
+    todos.sort(key=lambda t: (getattr(t, field), t.id), reverse=q.order.value == "desc")
+    return todos[:q.limit] if q.limit else todos
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare planned queries with full scans")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store = build_store(args.rows, args.seed)
+    day_ago = datetime.now() - timedelta(days=1)
+    queries = {
+        "urgent open work": TodoQuery(statuses=["pending", "in_progress"], min_priority=5,
+                                      sort_by="priority", order="desc", limit=20),
+        "in progress, p4+": TodoQuery(statuses=["in_progress"], min_priority=4),
+        "pending, text": TodoQuery(statuses=["pending"], text="invoice", limit=50),
+        "recent completed": TodoQuery(statuses=["completed"], updated_after=day_ago,
+                                      sort_by="updated_at", order="desc", limit=20),
+        "low priority, recent": TodoQuery(max_priority=2, updated_after=day_ago),
+        "first page": TodoQuery(limit=50),
+    }
+
+    print(f"📦 {args.rows} todos\n")
+    print(f"{'query':<22} {'rows':>7} {'planned ms':>11} {'scan ms':>9} {'speedup':>8}")
+    for label, q in queries.items():
+        planned_ms, (todos, plan) = timed(lambda: store.query(q), args.repeat)
+        scan_ms, expected = timed(lambda: scan(store, q), args.repeat)
+        assert [t.id for t in todos] == [t.id for t in expected], label
+        print(f"{label:<22} {len(todos):>7} {planned_ms:>11.2f} {scan_ms:>9.2f} {scan_ms / max(planned_ms, 1e-6):>7.1f}x")
+        print(f"{'':<22} plan: {' -> '.join(plan)}")
+
+
+if __name__ == "__main__":
+    main()
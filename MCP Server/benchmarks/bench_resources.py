@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: watching todos through resource subscriptions vs polling
+
+--clients clients each watch one of --todos todos, while a writer
+updates a random watched todo --rate times a second for --seconds:
+
+- subscribe: every client subscribes to its todo://{id}, and the store's
+  write listener sends notifications/resources/updated to the clients
+  whose todo changed;
+- poll: every client reads its todo://{id} every --interval seconds and
+  compares it with the last read.
+
+Reports how long after a write its client learned of it, how many
+resource reads and notifications that took, and the latency of the
+writes themselves (which pay for the listener under subscriptions).
+The clients are in-process stand-ins for sessions, so the numbers leave
+out the transport.
+
+    python benchmarks/bench_resources.py --todos 10000 --clients 1000 --rate 200 --interval 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import mcp_server
+from models import TodoCreate, TodoUpdate
+from todo_resources import parse
+
+TENANT = "bench"
+
+
+class Client:
+    """A watcher of one todo, keeping how long each change took to reach it"""
+
+    def __init__(self, todo_id: int, written, delays):
+        self.todo_id = todo_id
+        self.uri = f"todo://{todo_id}?tenant={TENANT}"
+        self.written = written
+        self.delays = delays
+        self.notified = 0
+
+    def saw_change(self):
+        self.delays.append((time.perf_counter() - self.written[self.todo_id]) * 1000)
+
+    async def send_resource_updated(self, uri):
+        self.notified += 1
+        self.saw_change()
+
+
+async def write_load(ids, rate: float, seconds: float, written, write_times):
+    rng = random.Random(7)
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        todo_id = rng.choice(ids)
+        started = time.perf_counter()
+        written[todo_id] = started
+        with database.tenant(TENANT):
+            await database.store.update(todo_id, TodoUpdate(title=f"Watched todo {todo_id}, edit {count}"))
+        write_times.append((time.perf_counter() - started) * 1000)
+        count += 1
+        await asyncio.sleep(1 / rate)
+
+
+async def poll(client: Client, interval: float, stop: asyncio.Event, reads):
+    last = None
+    while not stop.is_set():
+        [content] = await mcp_server.handle_read_resource(client.uri)
+        reads.append(1)
+        if last is not None and content.content != last:
+            client.saw_change()
+        last = content.content
+        await asyncio.sleep(interval)
+
+
+def report(label: str, delays, write_times, reads: int, notifications: int, seconds: float):
+    delays = sorted(delays)
+    if delays:
+        seen = f"{statistics.median(delays):>11.2f} {delays[int(len(delays) * 0.95)]:>11.2f}"
+    else:
+        seen = f"{'-':>11} {'-':>11}"
+    print(f"{label:<10} {seen} {reads / seconds:>9.0f} "
+          f"{notifications / seconds:>9.0f} {statistics.median(write_times) * 1000:>10.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Resource subscriptions vs polling")
+    parser.add_argument("--todos", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200, help="Writes per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between a polling client's reads")
+    args = parser.parse_args()
+
+    database.configure("memory")
+    with database.tenant(TENANT):
+        ids = [(await database.store.create(TodoCreate(title=f"Watched todo {i}"))).id for i in range(args.todos)]
+    rng = random.Random(3)
+    watched = rng.sample(ids, min(args.clients, len(ids)))
+
+    print(f"👀 {len(watched)} clients watching one of {args.todos} todos each, "
+          f"{args.rate:.0f} writes/s for {args.seconds:.0f}s\n")
+    print(f"{'':<10} {'seen p50 ms':>11} {'seen p95 ms':>11} {'reads/s':>9} {'notes/s':>9} {'write µs':>10}")
+
+    written, delays, write_times = {}, [], []
+    await write_load(ids, args.rate, args.seconds, written, write_times)
+    report("no watch", [], write_times, 0, 0, args.seconds)
+
+    # Subscriptions: a notification per change, sent from the write's listener
+    subscriptions = mcp_server.subscriptions
+    database.store.listen(subscriptions.changed)
+    written, delays, write_times = {}, [], []
+    clients = [Client(todo_id, written, delays) for todo_id in watched]
+    for client in clients:
+        subscriptions.subscribe(client, client.uri, parse(client.uri).key(TENANT))
+    await write_load(watched, args.rate, args.seconds, written, write_times)
+    await asyncio.sleep(0.1)
+    report("subscribe", delays, write_times, 0, sum(client.notified for client in clients), args.seconds)
+    for client in clients:
+        subscriptions.unsubscribe(client, client.uri, parse(client.uri).key(TENANT))
+
+    # Polling: every client reads its todo on a timer
+    written, delays, write_times, reads = {}, [], [], []
+    clients = [Client(todo_id, written, delays) for todo_id in watched]
+    stop = asyncio.Event()
+    pollers = [asyncio.create_task(poll(client, args.interval, stop, reads)) for client in clients]
+    await asyncio.sleep(args.interval)
+    await write_load(watched, args.rate, args.seconds, written, write_times)
+    await asyncio.sleep(args.interval)
+    stop.set()
+    await asyncio.gather(*pollers)
+    report("poll", delays, write_times, len(reads), 0, args.seconds + 2 * args.interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
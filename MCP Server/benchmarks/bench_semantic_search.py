@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: semantic top-k search over the NumPy vector index
+
+Embeds --rows generated todo titles into a VectorIndex and times queries
+two ways: the index's sparse scoring (only the query's non-zero dimensions
+are read) with cut-off top-k selection, and a dense matrix-vector product
+over every dimension followed by a full argpartition. Both must agree on
+the top-k scores (generated titles repeat, so ids of tied scores may differ).
+
+    python benchmarks/bench_semantic_search.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import VectorIndex, DEFAULT_DIMENSIONS
+
+VERBS = ["deploy", "review", "write", "fix", "refactor", "document", "schedule", "migrate", "test", "plan",
+         "update", "prepare", "clean", "organize", "call", "email", "design", "build", "research", "book"]
+NOUNS = ["service", "report", "meeting", "dashboard", "pipeline", "invoice", "database", "release",
+         "onboarding", "budget", "roadmap", "api", "backup", "newsletter", "contract", "flight",
+         "dentist", "groceries", "presentation", "interview", "landing page", "tax return", "garden"]
+QUALIFIERS = ["quarterly", "urgent", "weekly", "customer", "internal", "legacy", "mobile", "billing",
+              "marketing", "security", "holiday", "team", "personal", "production", "staging"]
+
+QUERIES = ["deploying the production services", "prepare tax documents", "book flights for the holiday",
+           "security review of the api", "weekly team meetings"]
+
+
+def dense_top_k(index: VectorIndex, query: str, limit: int):
+    """Reference: full matrix-vector product and argpartition over all rows"""
+    dims, values = index.query_vector(query)
+    dense = np.zeros(index.dimensions, dtype=np.float32)
+    dense[dims] = values
+    scores = dense @ index.matrix[:, :index.count]
+    top = np.argpartition(-scores, limit)[:limit]
+    return sorted((float(s) for s in scores[top] if s > 0), reverse=True)
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time semantic top-k search")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = VectorIndex(args.dimensions)
+    started = time.perf_counter()
+    batch = 100_000
+    for start in range(1, args.rows + 1, batch):
+        index.add_many(
+            (doc_id, f"{rng.choice(VERBS)} {rng.choice(QUALIFIERS)} {rng.choice(NOUNS)}")
+            for doc_id in range(start, min(start + batch, args.rows + 1))
+        )
+    matrix_mb = index.matrix.nbytes / 2**20
+    print(f"📦 {index.count} todos embedded in {time.perf_counter() - started:.1f}s, "
+          f"matrix {index.dimensions}x{index.matrix.shape[1]} ({matrix_mb:.0f} MB)")
+
+    print(f"\n{'query':<36} {'index ms':>9} {'dense ms':>9}")
+    latencies = []
+    for query in QUERIES:
+        index_ms, found = timed(lambda: index.search(query, args.limit), args.repeat)
+        dense_ms, expected = timed(lambda: dense_top_k(index, query, args.limit), args.repeat)
+        assert np.allclose([score for _, score in found], expected, atol=1e-5), query
+        latencies.append(index_ms)
+        print(f"{query:<36} {index_ms:>9.2f} {dense_ms:>9.2f}")
+    print(f"\n⏱  median query latency {statistics.median(latencies):.2f} ms at {index.count} todos")
+
+
+if __name__ == "__main__":
+    main()
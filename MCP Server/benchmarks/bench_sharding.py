@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput of the sharded in-memory store vs shard count
+
+For each shard count, starts a ShardedBackend and has --threads client
+threads (standing in for concurrent requests) run, in turn:
+
+- writes: create --rows todos, then update a random sample of them
+- point reads: get by id
+- fan-out reads: substring search and a combined query, which every shard
+  answers over its own part of the data before the router merges
+
+The single-process MemoryBackend, on one thread, is measured first as the
+baseline. Point operations are dominated by the pipe round trip, so they
+scale with shards only while client threads outnumber them; fan-out reads
+split the scan work across cores and scale with the shard count up to the
+number of cores.
+
+    python benchmarks/bench_sharding.py --rows 50000 --shards 1 2 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend
+from models import TodoCreate, TodoUpdate, TodoQuery
+from sharding import ShardedBackend
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+
+def throughput(fn, count: int, threads: int) -> float:
+    """Operations per second running fn(i) for i in range(count) on a thread pool"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(fn, range(count)))
+    return count / (time.perf_counter() - started)
+
+
+def run(store, args, threads: int) -> dict:
+    rng = random.Random(args.seed)
+    titles = [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}" for i in range(args.rows)]
+    ids = [rng.randint(1, args.rows) for _ in range(args.ops)]
+    query = TodoQuery(statuses=["pending"], min_priority=3, sort_by="updated_at", order="desc", limit=20)
+    return {
+        "create/s": throughput(lambda i: store.create(TodoCreate(
+            title=titles[i], priority=i % 5 + 1, status=["pending", "in_progress", "completed"][i % 3])),
+            args.rows, threads),
+        "update/s": throughput(lambda i: store.update(ids[i], TodoUpdate(priority=i % 5 + 1)), args.ops, threads),
+        "get/s": throughput(lambda i: store.get(ids[i]), args.ops, threads),
+        "search/s": throughput(lambda i: store.search(WORDS[i % len(WORDS)] + " r"), args.scans, threads),
+        "query/s": throughput(lambda i: store.query(query), args.scans, threads),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded store throughput vs shard count")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--ops", type=int, default=20_000, help="point operations per measurement")
+    parser.add_argument("--scans", type=int, default=50, help="fan-out reads per measurement")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--shards", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"📦 {args.rows} todos, {args.threads} client threads, {os.cpu_count()} cores\n")
+    columns = ["create/s", "update/s", "get/s", "search/s", "query/s"]
+    print(f"{'store':<12}" + "".join(f"{c:>11}" for c in columns))
+
+    # The plain memory store is not meant for concurrent writers, and the GIL
+    # would serialise its threads anyway
+    results = run(MemoryBackend(), args, threads=1)
+    print(f"{'memory':<12}" + "".join(f"{results[c]:>11.0f}" for c in columns))
+    for shards in args.shards:
+        store = ShardedBackend(f"bench-{shards}", shards)
+        try:
+            results = run(store, args, args.threads)
+        finally:
+            store.close()
+        print(f"{f'{shards} shard(s)':<12}" + "".join(f"{results[c]:>11.0f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
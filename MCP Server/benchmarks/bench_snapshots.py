@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: consistent paging with pinned snapshots vs copying the store
+
+Fills the in-memory backend with --rows todos, then pages through all of
+them (--page todos per page) while --writes updates land between pages.
+A consistent read used to mean copying every todo up front; a snapshot is
+pinned in O(1) and each page is corrected for the writes since. Also
+reports what pinned snapshots add to the cost of a write.
+
+    python benchmarks/bench_snapshots.py --rows 100000 --page 1000 --writes 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryBackend
+from models import TodoCreate, TodoQuery, TodoUpdate
+
+WORDS = ["deploy", "review", "write", "fix", "report", "meeting", "invoice", "pipeline", "backup", "release"]
+
+
+def write_burst(backend: MemoryBackend, rng: random.Random, rows: int, writes: int):
+    for _ in range(writes):
+        backend.update(rng.randint(1, rows), TodoUpdate(priority=rng.randint(1, 5)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot paging vs full copies")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=100, help="Updates between two pages")
+    args = parser.parse_args()
+
+    backend = MemoryBackend()
+    for i in range(args.rows):
+        backend.create(TodoCreate(title=f"{WORDS[i % len(WORDS)]} task {i}", priority=1 + i % 5))
+    rng = random.Random(7)
+    pages = (args.rows + args.page - 1) // args.page
+    print(f"📄 {args.rows} todos in {pages} pages of {args.page}, {args.writes} updates between pages\n")
+
+    started = time.perf_counter()
+    copy = list(backend.todos.values())
+    copied = (time.perf_counter() - started) * 1000
+    for offset in range(0, args.rows, args.page):
+        copy[offset:offset + args.page]
+        write_burst(backend, rng, args.rows, args.writes)
+    copy_total = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    snapshot = backend.pin()
+    pinned = (time.perf_counter() - started) * 1000
+    seen, page_times = [], []
+    for offset in range(0, args.rows, args.page):
+        page_started = time.perf_counter()
+        seen.extend(backend.query(TodoQuery(limit=args.page, offset=offset, snapshot=snapshot))[0])
+        page_times.append((time.perf_counter() - page_started) * 1000)
+        write_burst(backend, rng, args.rows, args.writes)
+    snapshot_total = (time.perf_counter() - started) * 1000
+    assert [t.id for t in seen] == list(range(1, args.rows + 1))
+
+    print(f"{'consistent read':<26} {'start ms':>9} {'total ms':>9} {'max page ms':>12}")
+    print(f"{'copy every todo':<26} {copied:>9.2f} {copy_total:>9.1f} {'-':>12}")
+    print(f"{'pinned snapshot':<26} {pinned:>9.4f} {snapshot_total:>9.1f} {max(page_times):>12.2f}")
+    print(f"   old versions kept: {sum(len(v) for v in backend.history.values())}")
+
+    for label, pin in (("no snapshot", False), ("snapshot pinned", True)):
+        backend.snapshots.clear()
+        backend._expire()
+        if pin:
+            backend.pin()
+        started = time.perf_counter()
+        write_burst(backend, rng, args.rows, 10_000)
+        print(f"{'update, ' + label:<26} {(time.perf_counter() - started) / 10_000 * 1e6:>9.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tag filters as compressed-bitmap operations vs sets and scans
+
+Tags --rows todo ids with 1-5 of --tags tags each, drawn from a Zipf-like
+distribution so a few tags are on a large share of the todos and most are
+rare. Each tag query is answered three ways: scanning every todo's tags
+(what a search over titles amounts to), an inverted index of Python sets,
+and bitmap_index.TagIndex, which the memory backend uses. Also reports
+per-tag facet counts and the memory each index takes.
+
+Works on the index directly: building a million Todo models would take
+longer than everything measured here.
+
+    python benchmarks/bench_tags.py --rows 1000000 --tags 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitmap_index import TagIndex
+
+
+def timed(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def scan(doc_tags, all_of, any_of, none_of):
+    all_of, any_of, none_of = set(all_of), set(any_of), set(none_of)
+    return [todo_id for todo_id, tags in enumerate(doc_tags) if all_of <= tags and
+            (not any_of or any_of & tags) and not none_of & tags]
+
+
+def with_sets(sets, everything, all_of, any_of, none_of):
+    result = None
+    for tag in sorted(all_of, key=lambda tag: len(sets[tag])):
+        result = set(sets[tag]) if result is None else result & sets[tag]
+    if any_of:
+        union = set().union(*(sets[tag] for tag in any_of))
+        result = union if result is None else result & union
+    if result is None:
+        result = set(everything)
+    for tag in none_of:
+        result -= sets[tag]
+    return sorted(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag queries: bitmaps vs sets vs scans")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    names = [f"tag{i}" for i in range(args.tags)]
+    weights = [1 / (rank + 1) for rank in range(args.tags)]
+    doc_tags = [frozenset(rng.choices(names, weights, k=rng.randint(1, 5))) for _ in range(args.rows)]
+
+    started = time.perf_counter()
+    index = TagIndex()
+    index.add_many(enumerate(doc_tags))
+    built = time.perf_counter() - started
+    sets = {name: set() for name in names}
+    for todo_id, tags in enumerate(doc_tags):
+        for tag in tags:
+            sets[tag].add(todo_id)
+    everything = set(range(args.rows))
+
+    set_bytes = sum(sys.getsizeof(ids) for ids in sets.values()) + 28 * sum(len(ids) for ids in sets.values())
+    bitmap_bytes = sum(bitmap.nbytes() for bitmap in index.tags.values())
+    print(f"🏷️  {args.rows:,} todos, {args.tags} tags (Zipf), median of {args.repeat}")
+    print(f"   bitmaps built in {built:.1f} s: {bitmap_bytes / 1e6:.1f} MB vs ~{set_bytes / 1e6:.0f} MB of sets\n")
+
+    queries = [
+        ("common AND common", ["tag0", "tag1"], [], []),
+        ("rare AND common", ["tag500", "tag0"], [], []),
+        ("OR of 3 mid tags", [], ["tag20", "tag30", "tag40"], []),
+        ("common AND NOT common", ["tag0"], [], ["tag1"]),
+        ("NOT common (alone)", [], [], ["tag0"]),
+        ("mixed", ["tag2"], ["tag10", "tag11", "tag12"], ["tag3"]),
+    ]
+    print(f"{'query':<24} {'matches':>9} {'scan ms':>9} {'sets ms':>9} {'bitmap ms':>10}")
+    for label, all_of, any_of, none_of in queries:
+        scan_ms, expected = timed(lambda: scan(doc_tags, all_of, any_of, none_of), 1)
+        set_ms, found = timed(lambda: with_sets(sets, everything, all_of, any_of, none_of), args.repeat)
+        assert found == expected
+        bitmap_ms, found = timed(lambda: index.match(all_of, any_of, none_of).ids(), args.repeat)
+        assert found == expected
+        print(f"{label:<24} {len(expected):>9,} {scan_ms:>9.1f} {set_ms:>9.2f} {bitmap_ms:>10.2f}")
+
+    print()
+    facet_ms, _ = timed(lambda: index.facets(), args.repeat)
+    print(f"{'facets, all todos':<24} {facet_ms:>9.2f} ms")
+    matched = index.match(["tag0"], [], []).ids()
+    facet_ms, _ = timed(lambda: index.facets(matched), args.repeat)
+    print(f"{'facets, tag0 matches':<24} {facet_ms:>9.1f} ms ({len(matched):,} todos, {args.tags} tags)")
+    few = index.match(["tag500"], [], []).ids()
+    facet_ms, _ = timed(lambda: index.facets(few), args.repeat)
+    print(f"{'facets, tag500 matches':<24} {facet_ms:>9.2f} ms ({len(few):,} todos)")
+
+    started = time.perf_counter()
+    for todo_id in range(0, 10_000):
+        index.set(todo_id, ("tag7", "tag900"))
+    print(f"{'retag one todo':<24} {(time.perf_counter() - started) / 10_000 * 1e6:>9.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
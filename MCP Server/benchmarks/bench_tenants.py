@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-tenant latency as the number of tenants grows
+
+Creates one large tenant (--big todos) plus 1, 10, 100 and 1000 small
+tenants (--small todos each) in the in-memory store, then times list,
+search, stats and next-todos calls for one small tenant through the
+database module, exactly as the API and MCP handlers call it. With
+partitioned storage the small tenant's latency should stay flat however
+many tenants, and however large the big one, share the process.
+
+    python benchmarks/bench_tenants.py --big 100000 --small 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from models import TodoCreate
+
+STATUSES = ["pending", "in_progress", "completed"]
+
+
+def fill(name: str, count: int):
+    with database.tenant(name):
+        for i in range(count):
+            database.create_todo(TodoCreate(title=f"{name} task {i}", priority=i % 5 + 1, status=STATUSES[i % 3]))
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def stats():
+    todos = database.get_all_todos()
+    return {status: sum(1 for t in todos if t.status == status) for status in STATUSES}
+
+
+def measure(name: str, repeat: int):
+    with database.tenant(name):
+        return [
+            timed(lambda: database.get_all_todos("pending"), repeat),
+            timed(lambda: database.search_todos("task 4"), repeat),
+            timed(stats, repeat),
+            timed(lambda: database.get_next_todos(limit=10), repeat),
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-tenant latency vs number of tenants")
+    parser.add_argument("--big", type=int, default=100_000, help="todos in the one large tenant")
+    parser.add_argument("--small", type=int, default=100, help="todos in each small tenant")
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    database.configure("memory")
+    fill("big", args.big)
+    print(f"📦 tenant 'big' holds {args.big} todos; small tenants hold {args.small} each\n")
+    print(f"{'tenants':>8} {'todos':>9} {'list ms':>9} {'search ms':>10} {'stats ms':>9} {'next ms':>8}")
+
+    created = 0
+    for count in sorted(args.tenants):
+        for i in range(created, count):
+            fill(f"t{i}", args.small)
+        created = count
+        total = args.big + count * args.small
+        row = measure("t0", args.repeat)
+        print(f"{count:>8} {total:>9} " + " ".join(f"{ms:>{w}.3f}" for ms, w in zip(row, (9, 10, 9, 8))))
+
+    row = measure("big", max(1, args.repeat // 10))
+    print(f"{'big':>8} {args.big:>9} " + " ".join(f"{ms:>{w}.3f}" for ms, w in zip(row, (9, 10, 9, 8))))
+    database.close()
+
+
+if __name__ == "__main__":
+    main()
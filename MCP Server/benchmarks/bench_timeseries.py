@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: activity time series from rollup rings vs bucketing todo timestamps
+
+Spreads --rows writes (creates, with a third of the todos later completed
+and a few deleted) over the last 30 days, counts them in rollups.Rollups
+as the store does, and answers trend questions two ways: reading the
+rollup rows of the range, and scanning every write's timestamp into
+buckets, which is the least a store without rollups has to do. Also
+reports what counting one write costs and the memory of the rings.
+
+    python benchmarks/bench_timeseries.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rollups
+from models import Todo, TodoStatus
+
+
+def timed(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time series from rollups vs scanning timestamps")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    now = datetime.now()
+    month = 30 * 86400
+    when = sorted(now - timedelta(seconds=rng.uniform(0, month)) for _ in range(args.rows))
+    pending = Todo(id=1, title="t", created_at=now, updated_at=now)
+    completed = pending.model_copy(update={"status": TodoStatus.COMPLETED})
+    # (time, todo, old): a create, a completion or a delete, as Rollups.record takes them
+    writes = []
+    for at in when:
+        draw = rng.random()
+        writes.append((at, completed, pending) if draw < 0.3 else (at, None, pending) if draw < 0.35
+                      else (at, pending, None))
+
+    counted = rollups.Rollups()
+    started = time.perf_counter()
+    for write in writes:
+        counted.record(*write)
+    per_write = (time.perf_counter() - started) / len(writes) * 1e6
+    ring_bytes = sum(ring.counts.itemsize * len(ring.counts) for ring in counted.rings.values())
+    print(f"📈 {args.rows:,} writes over 30 days, median of {args.repeat}")
+    print(f"   counting a write: {per_write:.2f} µs; rings: {ring_bytes / 1e3:.0f} kB\n")
+
+    def scan(resolution, first, last):
+        width, _ = rollups.RESOLUTIONS[resolution]
+        buckets = Counter()
+        for at, todo, old in writes:
+            bucket = rollups.bucket_of(at, width)
+            if first <= bucket <= last:
+                for metric in rollups.changes(todo, old):
+                    buckets[bucket, metric] += 1
+        return [[buckets[bucket, metric] for metric in rollups.METRICS] for bucket in range(first, last + 1)]
+
+    print(f"{'question':<24} {'buckets':>8} {'scan ms':>9} {'rollups ms':>11}")
+    for resolution, span in [("minute", "60m"), ("hour", "24h"), ("hour", "30d"), ("day", "30d")]:
+        first, last = rollups.window(resolution, span, now)
+        scan_ms, expected = timed(lambda: scan(resolution, first, last), 1)
+        rollup_ms, found = timed(lambda: rollups.series(resolution, first, counted.rows(resolution, first, last)),
+                                 args.repeat)
+        assert [[point.created, point.completed, point.deleted] for point in found.points] == \
+            [row[:3] for row in expected]
+        print(f"{f'{resolution} x {span}':<24} {last - first + 1:>8} {scan_ms:>9.0f} {rollup_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
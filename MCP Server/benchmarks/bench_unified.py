@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: agent writes read back through the API, one process vs two
+
+An agent creates a todo with the create_todo tool (over streamable HTTP),
+and a REST client reads it back with GET /todos/{id} right away. Repeated
+--ops times, against three set-ups:
+
+- unified: `uvicorn unified:app`, the API and the MCP server in one
+  process on the in-memory store;
+- separate, sqlite: `uvicorn main:app` and `mcp_server.py --transport
+  http` as two processes sharing a SQLite file;
+- separate, memory: the same two processes, each with its own in-memory
+  store (the default when they are started separately).
+
+Reports the latency of the tool call and of the read, how many reads
+found the todo, and the resident memory of the server processes.
+
+    python benchmarks/bench_unified.py --ops 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADERS = {"Accept": "application/json, text/event-stream"}
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 0, "method": "initialize",
+    "params": {"protocolVersion": "2025-03-26", "capabilities": {},
+               "clientInfo": {"name": "bench_unified", "version": "1.0.0"}},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(args, port: int, env) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, *args], cwd=APP_DIR, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"{args} did not start")
+
+
+def rss_mib(procs) -> float:
+    total = 0
+    for proc in procs:
+        with open(f"/proc/{proc.pid}/status") as status:
+            total += next(int(line.split()[1]) for line in status if line.startswith("VmRSS"))
+    return total / 1024
+
+
+def reply_of(response: httpx.Response):
+    response.raise_for_status()
+    data = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    return json.loads(data[0])
+
+
+async def run(mcp_url: str, api_url: str, ops: int):
+    """Per-op tool call and read latencies (ms), and how many reads found the todo"""
+    writes, reads, found = [], [], 0
+    async with httpx.AsyncClient(base_url=mcp_url, timeout=30) as agent, \
+            httpx.AsyncClient(base_url=api_url, timeout=30) as api:
+        response = await agent.post("/mcp", json=INITIALIZE, headers=HEADERS)
+        session = {**HEADERS, "Mcp-Session-Id": response.headers["mcp-session-id"]}
+        await agent.post("/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"}, headers=session)
+        for i in range(ops):
+            started = time.perf_counter()
+            reply = reply_of(await agent.post("/mcp", headers=session, json={
+                "jsonrpc": "2.0", "id": i + 1, "method": "tools/call",
+                "params": {"name": "create_todo", "arguments": {"title": f"agent todo {i}"}}}))
+            written = time.perf_counter()
+            todo_id = int(reply["result"]["content"][0]["text"].split("ID: ")[1].split("\n")[0])
+            read = await api.get(f"/todos/{todo_id}")
+            done = time.perf_counter()
+            writes.append((written - started) * 1000)
+            reads.append((done - written) * 1000)
+            found += read.status_code == 200 and read.json()["title"] == f"agent todo {i}"
+    return writes, reads, found
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Agent writes read back through the API, one process vs two")
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"🔗 {args.ops} create_todo tool calls, each read back with GET /todos/{{id}}\n")
+    print(f"{'set-up':<18} {'tool call ms':>13} {'read ms':>9} {'found':>7} {'RSS MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        setups = [
+            ("unified", "memory", True),
+            ("separate, sqlite", "sqlite", False),
+            ("separate, memory", "memory", False),
+        ]
+        for label, backend, unified in setups:
+            env = {"TODO_DB_BACKEND": backend, "TODO_DB_PATH": os.path.join(tmp, f"{label}.db")}
+            api_port = free_port()
+            uvicorn = ["-m", "uvicorn", "unified:app" if unified else "main:app",
+                       "--port", str(api_port), "--log-level", "warning"]
+            procs = [start(uvicorn, api_port, env)]
+            mcp_port = api_port
+            try:
+                if not unified:
+                    mcp_port = free_port()
+                    procs.append(start(["mcp_server.py", "--transport", "http", "--port", str(mcp_port)],
+                                       mcp_port, env))
+                writes, reads, found = await run(f"http://127.0.0.1:{mcp_port}", f"http://127.0.0.1:{api_port}",
+                                                 args.ops)
+                print(f"{label:<18} {statistics.median(writes):>13.2f} {statistics.median(reads):>9.2f} "
+                      f"{found:>7} {rss_mib(procs):>9.0f}")
+            finally:
+                for proc in procs:
+                    proc.terminate()
+                    proc.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
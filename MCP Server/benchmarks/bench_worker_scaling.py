@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API throughput as the number of server workers grows
+
+Starts start_server.py in production mode with 1, 2, 4, ... workers (up to
+the number of CPU cores) against a fresh SQLite store, drives each with a
+closed-loop load from load_generator.py and prints the scaling table.
+
+    python benchmarks/bench_worker_scaling.py --duration 10 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import load_generator
+
+
+def worker_counts(max_workers: int):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/todos/stats/summary", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+
+def run_once(workers: int, args) -> dict:
+    url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = subprocess.Popen(
+            [sys.executable, "start_server.py", "--workers", str(workers), "--host", "127.0.0.1",
+             "--port", str(args.port), "--db-path", os.path.join(tmp, "bench.db")],
+            cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_up(url)
+            load_args = load_generator.build_parser().parse_args([
+                "--url", url, "--mode", "closed", "--duration", str(args.duration),
+                "--concurrency", str(args.concurrency), "--mix", args.mix,
+                "--seed-todos", str(args.seed_todos), "--server-workers", str(workers), "--quiet",
+            ])
+            report = asyncio.run(load_generator.run(load_args))
+        finally:
+            # SIGINT triggers uvicorn's graceful shutdown, which flushes the store
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=60)
+    return report["summary"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput scaling with worker count")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--mix", default="create=10,read=50,update=10,search=20,stats=10")
+    parser.add_argument("--seed-todos", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        summary = run_once(workers, args)
+        baseline = baseline or summary["throughput"]
+        speedup = summary["throughput"] / baseline if baseline else 0.0
+        print(f"{workers:>8} {summary['throughput']:>10} {speedup:>8.2f} "
+              f"{summary['p50_ms']:>9} {summary['p99_ms']:>9} {summary['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Compressed bitmaps of todo ids, and the tag index built from them
+
+A bitmap splits ids by their high 16 bits into chunks, as roaring bitmaps
+do. A chunk holding at most 4096 ids keeps their low 16 bits as a sorted
+uint16 array (2 bytes per id); a fuller chunk becomes a 65536-bit bitmap
+of 1024 uint64 words (8 KB, however many ids it holds). A tag on 3000 of a
+million todos therefore costs about 6 KB instead of the 125 KB of a plain
+bitmap, while a tag on half of them costs 8 KB per 65536 ids instead of
+the tens of megabytes of a Python set.
+
+AND, OR and AND-NOT run chunk by chunk on whichever form each side has,
+vectorised with NumPy, and only chunks present on the relevant sides are
+touched.
+"""
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+ARRAY_LIMIT = 4096
+WORDS = 1024
+
+_popcount = getattr(np, "bitwise_count", None)
+
+
+def _bits(chunk: np.ndarray) -> np.ndarray:
+    """The bitmap form of a chunk"""
+    if chunk.dtype == np.uint64:
+        return chunk
+    flags = np.zeros(WORDS * 64, dtype=bool)
+    flags[chunk] = True
+    return np.packbits(flags, bitorder="little").view(np.uint64)
+
+
+def _count(chunk: np.ndarray) -> int:
+    if chunk.dtype == np.uint16:
+        return len(chunk)
+    if _popcount is not None:
+        return int(_popcount(chunk).sum())
+    return int.from_bytes(chunk.tobytes(), "little").bit_count()
+
+
+def _values(chunk: np.ndarray) -> np.ndarray:
+    """The low 16 bits held by a chunk, ascending"""
+    if chunk.dtype == np.uint16:
+        return chunk
+    return np.flatnonzero(np.unpackbits(chunk.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _test(bits: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Which of `values` are set in a bitmap chunk"""
+    wide = values.astype(np.uint64)
+    return ((bits[wide >> np.uint64(6)] >> (wide & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+def _compact(chunk: np.ndarray) -> Optional[np.ndarray]:
+    """The smaller form of a chunk, or None when it is empty"""
+    count = _count(chunk)
+    if count == 0:
+        return None
+    if chunk.dtype == np.uint64 and count <= ARRAY_LIMIT:
+        return _values(chunk)
+    if chunk.dtype == np.uint16 and count > ARRAY_LIMIT:
+        return _bits(chunk)
+    return chunk
+
+
+def _and(a: np.ndarray, b: np.ndarray) -> Optional[np.ndarray]:
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        result = np.intersect1d(a, b, assume_unique=True)
+    elif a.dtype == np.uint16:
+        result = a[_test(b, a)]
+    elif b.dtype == np.uint16:
+        result = b[_test(a, b)]
+    else:
+        result = a & b
+    return _compact(result)
+
+
+def _or(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.dtype == np.uint16 and b.dtype == np.uint16 and len(a) + len(b) <= ARRAY_LIMIT:
+        return np.union1d(a, b)
+    return _compact(_bits(a) | _bits(b))
+
+
+def _and_not(a: np.ndarray, b: np.ndarray) -> Optional[np.ndarray]:
+    if a.dtype == np.uint16:
+        if b.dtype == np.uint16:
+            return _compact(np.setdiff1d(a, b, assume_unique=True))
+        return _compact(a[~_test(b, a)])
+    return _compact(a & ~_bits(b))
+
+
+class Bitmap:
+    """A set of non-negative ids as compressed chunks"""
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks: Optional[Dict[int, np.ndarray]] = None):
+        self.chunks: Dict[int, np.ndarray] = chunks or {}
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> "Bitmap":
+        values = np.sort(np.fromiter(ids, dtype=np.int64))
+        chunks = {}
+        if len(values):
+            # Drop repeats (a sort and a shifted compare beats np.unique's hashing)
+            values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+            highs = values >> 16
+            starts = np.flatnonzero(np.diff(highs, prepend=-1))
+            for start, end in zip(starts, list(starts[1:]) + [len(values)]):
+                chunk = (values[start:end] & 0xFFFF).astype(np.uint16)
+                chunks[int(highs[start])] = _bits(chunk) if len(chunk) > ARRAY_LIMIT else chunk
+        return cls(chunks)
+
+    def add(self, todo_id: int):
+        high, low = todo_id >> 16, todo_id & 0xFFFF
+        chunk = self.chunks.get(high)
+        if chunk is None:
+            self.chunks[high] = np.array([low], dtype=np.uint16)
+        elif chunk.dtype == np.uint64:
+            chunk[low >> 6] |= np.uint64(1 << (low & 63))
+        else:
+            at = int(np.searchsorted(chunk, low))
+            if at == len(chunk) or chunk[at] != low:
+                chunk = np.insert(chunk, at, low)
+                self.chunks[high] = _bits(chunk) if len(chunk) > ARRAY_LIMIT else chunk
+
+    def discard(self, todo_id: int):
+        high, low = todo_id >> 16, todo_id & 0xFFFF
+        chunk = self.chunks.get(high)
+        if chunk is None:
+            return
+        if chunk.dtype == np.uint64:
+            chunk[low >> 6] &= ~np.uint64(1 << (low & 63))
+        else:
+            at = int(np.searchsorted(chunk, low))
+            if at < len(chunk) and chunk[at] == low:
+                chunk = np.delete(chunk, at)
+                if len(chunk):
+                    self.chunks[high] = chunk
+                else:
+                    del self.chunks[high]
+
+    def __contains__(self, todo_id: int) -> bool:
+        chunk = self.chunks.get(todo_id >> 16)
+        if chunk is None:
+            return False
+        low = todo_id & 0xFFFF
+        if chunk.dtype == np.uint64:
+            return bool(int(chunk[low >> 6]) >> (low & 63) & 1)
+        at = int(np.searchsorted(chunk, low))
+        return at < len(chunk) and chunk[at] == low
+
+    def __len__(self) -> int:
+        return sum(_count(chunk) for chunk in self.chunks.values())
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        small, large = sorted((self.chunks, other.chunks), key=len)
+        for high, chunk in small.items():
+            if high in large:
+                result = _and(chunk, large[high])
+                if result is not None:
+                    chunks[high] = result
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self.chunks)
+        for high, chunk in other.chunks.items():
+            chunks[high] = _or(chunks[high], chunk) if high in chunks else chunk
+        return Bitmap(chunks)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for high, chunk in self.chunks.items():
+            result = _and_not(chunk, other.chunks[high]) if high in other.chunks else chunk
+            if result is not None:
+                chunks[high] = result
+        return Bitmap(chunks)
+
+    def ids(self) -> List[int]:
+        """All ids, ascending"""
+        return self.array().tolist()
+
+    def array(self) -> np.ndarray:
+        """All ids, ascending, as an int64 array"""
+        parts = [(high << 16) + _values(self.chunks[high]).astype(np.int64) for high in sorted(self.chunks)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def nbytes(self) -> int:
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+
+class TagIndex:
+    """A bitmap of todo ids per tag, plus one of every todo for NOT"""
+
+    def __init__(self):
+        self.tags: Dict[str, Bitmap] = {}
+        self.doc_tags: Dict[int, FrozenSet[str]] = {}
+        self.everything = Bitmap()
+
+    def add_many(self, docs: Iterable):
+        """Bulk-load (id, tags) pairs into an empty index"""
+        ids: Dict[str, List[int]] = {}
+        every = []
+        for todo_id, tags in docs:
+            every.append(todo_id)
+            if tags:
+                self.doc_tags[todo_id] = frozenset(tags)
+                for tag in tags:
+                    ids.setdefault(tag, []).append(todo_id)
+        self.everything = Bitmap.from_ids(every)
+        self.tags = {tag: Bitmap.from_ids(tag_ids) for tag, tag_ids in ids.items()}
+
+    def set(self, todo_id: int, tags: Iterable[str]):
+        """Index a todo with its tags, replacing any it had"""
+        tags = frozenset(tags)
+        old = self.doc_tags.get(todo_id, frozenset())
+        for tag in old - tags:
+            bitmap = self.tags[tag]
+            bitmap.discard(todo_id)
+            if not bitmap.chunks:
+                del self.tags[tag]
+        for tag in tags - old:
+            self.tags.setdefault(tag, Bitmap()).add(todo_id)
+        if tags:
+            self.doc_tags[todo_id] = tags
+        else:
+            self.doc_tags.pop(todo_id, None)
+        self.everything.add(todo_id)
+
+    def remove(self, todo_id: int):
+        self.set(todo_id, ())
+        self.everything.discard(todo_id)
+
+    def match(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (),
+              none_of: Iterable[str] = ()) -> Bitmap:
+        """Todos with every tag of `all_of`, one of `any_of` and none of `none_of`"""
+        empty = Bitmap()
+        result = None
+        # Intersect the rarest tags first, so intermediate results stay small
+        for tag in sorted(set(all_of), key=lambda tag: len(self.tags.get(tag, empty))):
+            bitmap = self.tags.get(tag, empty)
+            result = bitmap if result is None else result & bitmap
+        any_of = set(any_of)
+        if any_of:
+            union = Bitmap()
+            for tag in any_of:
+                union = union | self.tags.get(tag, empty)
+            result = union if result is None else result & union
+        if result is None:
+            result = self.everything
+        for tag in set(none_of):
+            if tag in self.tags:
+                result = result - self.tags[tag]
+        return result
+
+    def facets(self, ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """Todos per tag, among `ids` (default: all todos), most used first"""
+        if ids is None:
+            counts = {tag: len(bitmap) for tag, bitmap in self.tags.items()}
+        else:
+            ids = list(ids)
+            if len(ids) * 4 < len(self.tags) * 64:
+                # Few todos: count their own tags
+                counts = Counter(tag for todo_id in ids for tag in self.doc_tags.get(todo_id, ()))
+            else:
+                counts = self._counts_within(Bitmap.from_ids(ids))
+        return dict(sorted(((tag, n) for tag, n in counts.items() if n), key=lambda item: (-item[1], item[0])))
+
+    def _counts_within(self, within: Bitmap) -> Counter:
+        """|tag & within| for every tag, batched per chunk
+
+        One AND per (tag, chunk) would be thousands of small NumPy calls.
+        Instead, each chunk of `within` tests the array chunks of all tags
+        at once and sums the hits per tag with one reduceat.
+        """
+        counts = Counter()
+        for high, chunk in within.chunks.items():
+            bits = _bits(chunk)
+            names, parts = [], []
+            for tag, bitmap in self.tags.items():
+                other = bitmap.chunks.get(high)
+                if other is None:
+                    continue
+                if other.dtype == np.uint64:
+                    counts[tag] += _count(bits & other)
+                else:
+                    names.append(tag)
+                    parts.append(other)
+            if parts:
+                starts = np.cumsum([0] + [len(part) for part in parts[:-1]])
+                hits = np.add.reduceat(_test(bits, np.concatenate(parts)).astype(np.int64), starts)
+                for tag, n in zip(names, hits.tolist()):
+                    counts[tag] += n
+        return counts
@@ -0,0 +1,198 @@
+"""
+Columnar mirror of the todos for group-by analytics
+
+Reports such as "how old are the open todos of each priority" or "median
+time to complete per tag" read a few fields of every todo. Walking Todo
+objects for that costs a Python-level step per todo and field. The mirror
+keeps those fields as NumPy columns instead, one row per todo: status
+code, priority, creation time and completion time (NaN while open), so
+an aggregation is a handful of vectorised passes over contiguous arrays.
+
+Rows are dense: a deleted todo's row is filled with the last row, as in
+vector_index. `row_of` maps todo ids to rows as an array, so the ids of a
+tag's bitmap turn into rows with one gather, and grouping by tag needs no
+per-todo Python either.
+
+A group-by returns the number of todos and partial aggregates per group
+(count, summed age, and the sorted times to complete), which add up
+across shards before the means and medians are taken (summarize).
+
+Completion time is when the mirror saw the todo become completed. Todos
+completed before the mirror was built, and every todo in SQLite, which
+has no mirror, use their last update time instead.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from models import AnalyticsGroup, AnalyticsGroupBy, Todo, TodoAnalytics, TodoStatus
+
+EPOCH = datetime(1970, 1, 1)
+STATUS_CODES = {status: code for code, status in enumerate(TodoStatus)}
+STATUSES = list(TodoStatus)
+
+# (todos in the store, group key -> (todos, summed age in seconds, sorted seconds to complete of the
+# completed ones)); a todo with several tags is in several tag groups
+Partial = Tuple[int, Dict[str, Tuple[int, float, np.ndarray]]]
+
+
+def seconds(when: datetime) -> float:
+    return (when - EPOCH).total_seconds()
+
+
+class TodoColumns:
+    """Status, priority and timestamps of a set of todos, one NumPy row per todo"""
+
+    def __init__(self, capacity: int = 1024):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.priority = np.zeros(capacity, dtype=np.int8)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.done = np.full(capacity, np.nan)
+        self.row_of = np.full(capacity, -1, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, rows: int, max_id: int):
+        capacity = len(self.ids)
+        if rows > capacity:
+            while capacity < rows:
+                capacity *= 2
+            for name, fill in (("ids", 0), ("status", 0), ("priority", 0), ("created", 0), ("done", np.nan)):
+                column = getattr(self, name)
+                grown = np.full(capacity, fill, dtype=column.dtype)
+                grown[:self.count] = column[:self.count]
+                setattr(self, name, grown)
+        if max_id >= len(self.row_of):
+            size = len(self.row_of)
+            while size <= max_id:
+                size *= 2
+            row_of = np.full(size, -1, dtype=np.int64)
+            row_of[:len(self.row_of)] = self.row_of
+            self.row_of = row_of
+
+    def add_many(self, todos: Iterable[Todo]):
+        """Bulk-load todos (with distinct ids, none present yet), one assignment per column"""
+        todos = list(todos)
+        if not todos:
+            return
+        start, end = self.count, self.count + len(todos)
+        self._reserve(end, max(todo.id for todo in todos))
+        ids = np.fromiter((todo.id for todo in todos), dtype=np.int64, count=len(todos))
+        self.ids[start:end] = ids
+        self.status[start:end] = [STATUS_CODES[todo.status] for todo in todos]
+        self.priority[start:end] = [todo.priority for todo in todos]
+        self.created[start:end] = [seconds(todo.created_at) for todo in todos]
+        self.done[start:end] = [seconds(todo.updated_at) if todo.status == TodoStatus.COMPLETED else np.nan
+                                for todo in todos]
+        self.row_of[ids] = np.arange(start, end)
+        self.count = end
+
+    def put(self, todo: Todo, old: Optional[Todo] = None):
+        """Mirror a new or changed todo"""
+        row = self.row_of[todo.id] if todo.id < len(self.row_of) else -1
+        if row < 0:
+            self.add_many([todo])
+            return
+        self.status[row] = STATUS_CODES[todo.status]
+        self.priority[row] = todo.priority
+        if todo.status != TodoStatus.COMPLETED:
+            self.done[row] = np.nan
+        elif old is None or old.status != TodoStatus.COMPLETED or np.isnan(self.done[row]):
+            self.done[row] = seconds(todo.updated_at)
+
+    def remove(self, todo_id: int):
+        """Drop a todo, moving the last row into its place"""
+        if todo_id >= len(self.row_of) or self.row_of[todo_id] < 0:
+            return
+        row, last = self.row_of[todo_id], self.count - 1
+        if row != last:
+            for column in (self.ids, self.status, self.priority, self.created, self.done):
+                column[row] = column[last]
+            self.row_of[self.ids[row]] = row
+        self.row_of[todo_id] = -1
+        self.count = last
+
+    def group(self, group_by: AnalyticsGroupBy, now: datetime,
+              tags: Optional[Mapping[str, np.ndarray]] = None) -> Partial:
+        """Partial aggregates per group; `tags` maps each tag to its todo ids when grouping by tag"""
+        n = self.count
+        if group_by == AnalyticsGroupBy.TAG:
+            names = list(tags or {})
+            id_lists = [tags[name] for name in names]
+            ids = np.concatenate(id_lists) if id_lists else np.zeros(0, dtype=np.int64)
+            rows = self.row_of[ids]
+            codes = np.repeat(np.arange(len(names)), [len(part) for part in id_lists])
+        else:
+            rows = np.arange(n)
+            if group_by == AnalyticsGroupBy.STATUS:
+                names, codes = [status.value for status in STATUSES], self.status[:n].astype(np.intp)
+            elif group_by == AnalyticsGroupBy.PRIORITY:
+                names, codes = [str(priority) for priority in range(6)], self.priority[:n].astype(np.intp)
+            else:
+                names, codes = ["all"], np.zeros(n, dtype=np.intp)
+        if not names:
+            return n, {}
+        counts = np.bincount(codes, minlength=len(names))
+        ages = np.bincount(codes, weights=seconds(now) - self.created[rows], minlength=len(names))
+        done = self.done[rows]
+        completed = ~np.isnan(done)
+        took, took_codes = (done - self.created[rows])[completed], codes[completed]
+        order = np.lexsort((took, took_codes))
+        took = took[order]
+        ends = np.cumsum(np.bincount(took_codes, minlength=len(names)))
+        starts = ends - np.bincount(took_codes, minlength=len(names))
+        return n, {name: (int(counts[code]), float(ages[code]), took[starts[code]:ends[code]])
+                   for code, name in enumerate(names) if counts[code]}
+
+
+def from_rows(total: int, groups: Iterable[Tuple[str, int, float]], took: Iterable[Tuple[str, float]]) -> Partial:
+    """A Partial from (key, todos, summed age) rows and (key, seconds to complete) rows sorted by key"""
+    took = list(took)
+    keys = [key for key, _ in took]
+    seconds_taken = np.array([value for _, value in took], dtype=np.float64)
+    bounds: Dict[str, Tuple[int, int]] = {}
+    for position, key in enumerate(keys):
+        start, _ = bounds.get(key, (position, position))
+        bounds[key] = (start, position + 1)
+    empty = np.zeros(0, dtype=np.float64)
+    return total, {str(key): (count, age or 0.0, seconds_taken[slice(*bounds[key])] if key in bounds else empty)
+                   for key, count, age in groups}
+
+
+def merge(partials: Iterable[Partial]) -> Partial:
+    """Add up the partial aggregates of several stores (shards)"""
+    total, merged = 0, {}
+    for todos, groups in partials:
+        total += todos
+        for key, (count, age, took) in groups.items():
+            entry = merged.setdefault(key, [0, 0.0, []])
+            entry[0] += count
+            entry[1] += age
+            entry[2].append(took)
+    return total, {key: (count, age, np.sort(np.concatenate(took))) for key, (count, age, took) in merged.items()}
+
+
+def summarize(group_by: AnalyticsGroupBy, partial: Partial, now: datetime) -> TodoAnalytics:
+    """Means and medians from the partial aggregates, groups in a stable order"""
+    total, partial = partial
+    if group_by == AnalyticsGroupBy.STATUS:
+        keys = [status.value for status in STATUSES if status.value in partial]
+    elif group_by == AnalyticsGroupBy.PRIORITY:
+        keys = sorted(partial, key=int, reverse=True)
+    else:
+        keys = sorted(partial, key=lambda key: (-partial[key][0], key))
+    groups = []
+    for key in keys:
+        count, age, took = partial[key]
+        groups.append(AnalyticsGroup(
+            key=key,
+            count=count,
+            completed=len(took),
+            mean_age_hours=round(age / count / 3600, 3),
+            median_hours_to_complete=round(float(np.median(took)) / 3600, 3) if len(took) else None,
+        ))
+    return TodoAnalytics(group_by=group_by, as_of=now, total=total, groups=groups)
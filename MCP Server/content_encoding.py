@@ -0,0 +1,137 @@
+"""
+Negotiated compression of large responses
+
+A listing of 10k todos is a few megabytes of JSON that compresses about
+tenfold. Responses of at least `min_size` bytes are compressed with the
+best encoding the client accepts (Accept-Encoding, honouring q-values):
+zstd, then brotli, then gzip. gzip is always available; brotli and zstd
+are offered when the `brotli` and `zstandard` packages are installed.
+
+Compressing a large listing costs more than producing it, so hot listings
+can also be kept precompressed. Cached bodies are keyed by the tenant's
+store version (the write generation of database.store) together with the
+request and encoding, so any write makes the old entries unreachable.
+The cache only sees writes made by this process; leave it off when
+several workers share a SQLite file.
+
+Configuration comes from the environment:
+
+    TODO_COMPRESS_MIN_BYTES=1024   smallest response to compress (0 turns compression off)
+    TODO_RESPONSE_CACHE=64         precompressed responses to keep (default 0, off)
+"""
+import gzip
+import os
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _codecs() -> Dict[str, Callable[[bytes], bytes]]:
+    """Available encoders in order of preference, at levels fast enough for live responses"""
+    codecs = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        codecs["zstd"] = compressor.compress
+    if brotli is not None:
+        codecs["br"] = lambda data: brotli.compress(data, quality=4)
+    codecs["gzip"] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    return codecs
+
+
+CODECS = _codecs()
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The preferred available encoding the client accepts, or None for identity"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    best, best_weight = None, 0.0
+    for name in CODECS:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class ResponseCompressor:
+    """Compresses response bodies and keeps an LRU of precompressed ones"""
+
+    def __init__(self, min_size: int = 1024, cache_entries: int = 0):
+        self.min_size = min_size
+        self.cache_entries = cache_entries
+        self.cache: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self.counts: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCompressor":
+        return cls(
+            min_size=int(os.environ.get("TODO_COMPRESS_MIN_BYTES", 1024)),
+            cache_entries=int(os.environ.get("TODO_RESPONSE_CACHE", 0)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.min_size > 0
+
+    def wants(self, content_type: str, size: int) -> bool:
+        """Whether a response of this type and size is worth compressing"""
+        return self.enabled and size >= self.min_size and content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        compressed = CODECS[encoding](body)
+        self.counts["compressed"] += 1
+        self.counts["bytes_in"] += len(body)
+        self.counts["bytes_out"] += len(compressed)
+        return compressed
+
+    def cached(self, key: Hashable) -> Optional[bytes]:
+        body = self.cache.get(key)
+        if body is not None:
+            self.cache.move_to_end(key)
+            self.counts["cache_hits"] += 1
+        return body
+
+    def remember(self, key: Hashable, body: bytes):
+        if not self.cache_entries:
+            return
+        self.cache[key] = body
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_entries:
+            self.cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        bytes_in, bytes_out = self.counts["bytes_in"], self.counts["bytes_out"]
+        return {
+            "encodings": list(CODECS),
+            "min_size": self.min_size,
+            "compressed": self.counts["compressed"],
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "ratio": round(bytes_in / bytes_out, 2) if bytes_out else None,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.counts["cache_hits"],
+        }
@@ -1,85 +1,1861 @@
-from typing import List, Optional
+import asyncio
+import hashlib
+import heapq
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 from datetime import datetime
-from models import Todo, TodoCreate, TodoUpdate, TodoStatus
+from pydantic import BaseModel
+from models import (
+    Todo, TodoCreate, TodoUpdate, TodoStatus, TodoQuery, TodoChanges, TodoRelations, TodoTimeseries, TodoAnalytics,
+    AnalyticsGroupBy, SearchMode, SortField, SortOrder
+)
+import rollups
+import trigram_index
+from trigram_index import DEFAULT_THRESHOLD
+from time_index import Key, TimeIndex
+from singleflight import SingleFlight
 
+# Deletions remembered for incremental sync; clients further behind resync fully
+TOMBSTONE_LIMIT = 10_000
 
-# In-memory storage for demo purposes
-# In a real application, you would use a proper database like PostgreSQL, SQLite, etc.
-todos_db: List[Todo] = []
-next_id = 1
+# Seconds a pinned snapshot lives after its last read
+SNAPSHOT_TTL = float(os.environ.get("TODO_SNAPSHOT_TTL", 60))
+# Snapshot query results kept for paging, per store
+SNAPSHOT_RESULTS = 32
+
+# Idempotency keys remembered per tenant, and seconds each is remembered for
+IDEMPOTENCY_KEYS = int(os.environ.get("TODO_IDEMPOTENCY_KEYS", 10_000))
+IDEMPOTENCY_TTL = float(os.environ.get("TODO_IDEMPOTENCY_TTL", 24 * 3600))
+
+
+# Storage backends
+# ----------------
+# The module-level functions below delegate to a backend object. The default
+# in-memory backend is private to the process; the SQLite backend keeps its
+# data in a file so several server worker processes can share one store.
+# The sharded backend (sharding.py) spreads in-memory todos over several
+# processes so one server can use more than one core.
+#
+# Select a backend with the TODO_DB_BACKEND environment variable ("memory",
+# "sqlite" or "sharded") and TODO_DB_PATH for the SQLite file or
+# TODO_DB_SHARDS for the number of shard processes, or call configure(). The
+# backend is created on first use, so importing this module stays cheap.
+#
+# Tenants
+# -------
+# Todos are partitioned by tenant (namespace). Every tenant gets its own
+# backend, so ids, indexes and caches are independent and one tenant's size
+# never shows up in another's latency. With SQLite each tenant is a separate
+# file next to TODO_DB_PATH. The tenant is taken from a context variable set
+# per request with `tenant()`; code that never sets one uses TODO_TENANT, or
+# "default".
+#
+# Snapshots
+# ---------
+# A reader that pages through a listing can pin a snapshot and pass its id
+# with every page (TodoQuery.snapshot), so all pages show the todos as they
+# were when it was pinned. Pinning is O(1): the memory backend numbers its
+# writes, and while snapshots are pinned a write keeps the value it
+# replaces. A snapshot read is the current query, corrected with the old
+# values of the todos changed since. Snapshots are leases that expire
+# SNAPSHOT_TTL seconds after their last read, and old values are dropped
+# once no pinned snapshot can see them. SQLite pins by holding a read
+# transaction open, which WAL mode keeps consistent by itself.
+#
+# Idempotent creates
+# ------------------
+# Clients that retry a create after a timeout cannot tell whether the first
+# attempt went through. create_once takes an optional idempotency key: the
+# first create with a key is remembered (with a fingerprint of its input)
+# for IDEMPOTENCY_TTL seconds, at most IDEMPOTENCY_KEYS per tenant, oldest
+# first out, and a repeat gets the remembered result back without writing.
+# Reusing a key for a different todo is refused. With `dedupe`, a create
+# whose title and description match an existing todo's, ignoring case and
+# whitespace, returns that todo instead; a hash of the normalized text
+# indexes the todos for it (content_hash). The memory backend builds that
+# index on first use, SQLite keeps both in tables of the database, so every
+# worker sees them, and the sharded backend keeps the keys in the router and
+# asks every shard for duplicates.
+
+
+class SnapshotExpired(Exception):
+    """The snapshot was never pinned here, or its lease ran out"""
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was used again for a different todo"""
+
+
+class Created(NamedTuple):
+    """What create_once did"""
+    todo: Todo
+    # An existing todo with the same title and description; nothing was created
+    duplicate: bool = False
+    # The idempotency key was seen before: this is the first request's result
+    replayed: bool = False
+
+
+def content_hash(title: str, description: Optional[str]) -> str:
+    """Hash of a todo's title and description, ignoring case and runs of whitespace"""
+    text = " ".join(title.casefold().split()) + "\0" + " ".join((description or "").casefold().split())
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _fingerprint(todo_data: TodoCreate) -> str:
+    """Hash of a create's input, to tell a retry from a reused idempotency key"""
+    return hashlib.blake2b(todo_data.model_dump_json().encode(), digest_size=16).hexdigest()
+
+
+def _reused(key: str) -> IdempotencyConflict:
+    return IdempotencyConflict(f"Idempotency key {key!r} was already used to create a different todo")
+
+
+class IdempotencyTable:
+    """Results of creates by idempotency key, for `ttl` seconds and at most `limit` keys
+
+    Every entry lives equally long, so insertion order is also expiry
+    order: expired and surplus entries both come off the front.
+    """
+
+    def __init__(self, limit: int = IDEMPOTENCY_KEYS, ttl: float = IDEMPOTENCY_TTL):
+        self.limit = limit
+        self.ttl = ttl
+        # Key -> (expiry, input fingerprint, result)
+        self.entries: "OrderedDict[str, Tuple[float, str, Created]]" = OrderedDict()
+
+    def get(self, key: str, fingerprint: str) -> Optional[Created]:
+        """The remembered result for a key, None if there is none; IdempotencyConflict for other input"""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        if entry[1] != fingerprint:
+            raise _reused(key)
+        return entry[2]._replace(replayed=True)
+
+    def put(self, key: str, fingerprint: str, result: Created):
+        now = time.monotonic()
+        self.entries.pop(key, None)
+        self.entries[key] = (now + self.ttl, fingerprint, result)
+        while self.entries:
+            expiry = next(iter(self.entries.values()))[0]
+            if expiry > now and len(self.entries) <= self.limit:
+                break
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _create_once(table: IdempotencyTable, todo_data: TodoCreate, key: Optional[str], dedupe: bool,
+                 duplicate_of: Callable[[str, Optional[str]], Optional[Todo]],
+                 create: Callable[[TodoCreate], Todo]) -> Created:
+    """create_once over an in-process table: the caller makes it atomic"""
+    fingerprint = _fingerprint(todo_data) if key is not None else None
+    if key is not None:
+        replay = table.get(key, fingerprint)
+        if replay is not None:
+            return replay
+    existing = duplicate_of(todo_data.title, todo_data.description) if dedupe else None
+    result = Created(existing, duplicate=True) if existing is not None else Created(create(todo_data))
+    if key is not None:
+        table.put(key, fingerprint, result)
+    return result
+
+
+def _apply_update(todo: Todo, todo_data: TodoUpdate, now: datetime) -> Todo:
+    """Build the updated version of a todo"""
+    update_data = todo_data.model_dump(exclude_unset=True)
+    return Todo(
+        id=todo.id,
+        title=update_data.get('title', todo.title),
+        description=update_data.get('description', todo.description),
+        status=update_data.get('status', todo.status),
+        priority=update_data.get('priority', todo.priority),
+        tags=update_data['tags'] if update_data.get('tags') is not None else todo.tags,
+        due_at=_naive(update_data['due_at']) if 'due_at' in update_data else todo.due_at,
+        parent_id=update_data['parent_id'] if 'parent_id' in update_data else todo.parent_id,
+        blocked_by=update_data['blocked_by'] if update_data.get('blocked_by') is not None else todo.blocked_by,
+        created_at=todo.created_at,
+        updated_at=now
+    )
+
+
+def _search_text(todo: Todo) -> str:
+    """The text searched by substring and fuzzy search"""
+    return f"{todo.title} {todo.description}" if todo.description else todo.title
+
+
+def _matches(todo: Todo, query_lower: str) -> bool:
+    return query_lower in todo.title.lower() or (
+        todo.description is not None and query_lower in todo.description.lower()
+    )
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a timezone-aware bound to local time, as the store keeps it"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _text_filter(q: TodoQuery) -> Optional[Tuple[str, Callable[[Todo], bool]]]:
+    """The substring predicate, which no index answers, checked per candidate"""
+    if q.text and q.text_mode == SearchMode.SUBSTRING:
+        query_lower = q.text.lower()
+        return f"text contains {q.text!r}", lambda t: _matches(t, query_lower)
+    return None
+
+
+def _open_due(todo: Optional[Todo]) -> Optional[datetime]:
+    """The due time that can make a todo overdue: none once it is completed"""
+    if todo is None or todo.status == TodoStatus.COMPLETED:
+        return None
+    return todo.due_at
+
+
+def _tag_filters(q: TodoQuery) -> Optional[Tuple[Set[str], Set[str], Set[str]]]:
+    """(all of, any of, none of) the query's tags, or None without tag filters"""
+    if not (q.tags_all or q.tags_any or q.tags_none):
+        return None
+    return set(q.tags_all or ()), set(q.tags_any or ()), set(q.tags_none or ())
+
+
+def _tag_label(tags: Tuple[Set[str], Set[str], Set[str]]) -> str:
+    all_of, any_of, none_of = tags
+    parts = [" AND ".join(sorted(all_of)), " OR ".join(sorted(any_of)), " OR ".join(sorted(none_of))]
+    return ", ".join(f"{name} ({part})" for name, part in zip(("all", "any", "none"), parts) if part)
+
+
+def _count_tags(todos: Iterable[Todo]) -> Dict[str, int]:
+    """Todos per tag, most used first"""
+    counts = Counter(tag for todo in todos for tag in todo.tags)
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+def _new_relations(todo: Todo, old: Optional[Todo]) -> Tuple[Optional[int], List[int]]:
+    """The parent and blockers `todo` gains over `old`: the relations to check"""
+    parent_id = todo.parent_id if old is None or todo.parent_id != old.parent_id else None
+    blocked_by = [other for other in todo.blocked_by if old is None or other not in old.blocked_by]
+    return parent_id, blocked_by
+
+
+def _graph_entry(todo: Todo) -> Tuple[int, Optional[int], List[int], Optional[Tuple[int, int]]]:
+    """A todo as DependencyGraph.put arguments: ranked by priority and age while open"""
+    rank = (-todo.priority, todo.id) if todo.status != TodoStatus.COMPLETED else None
+    return todo.id, todo.parent_id, todo.blocked_by, rank
+
+
+def _graph_changed(todo: Todo, old: Optional[Todo]) -> bool:
+    return old is None or (todo.parent_id, todo.blocked_by, todo.status, todo.priority) != (
+        old.parent_id, old.blocked_by, old.status, old.priority)
+
+
+def _relations(todo: Todo, graph, fetch: Callable[[List[int]], Dict[int, Todo]]) -> TodoRelations:
+    """A todo's neighbourhood in a DependencyGraph, with the todos fetched by id"""
+    parent = graph.parent.get(todo.id)
+    children, blocked_by, blocks = (sorted(edges.get(todo.id, ()))
+                                    for edges in (graph.children, graph.blocked_by, graph.blocks))
+    todos = fetch(([parent] if parent is not None else []) + children + blocked_by + blocks)
+    children, blocked_by, blocks = ([todos[i] for i in ids if i in todos] for ids in (children, blocked_by, blocks))
+    # Counted here rather than read from graph.waiting, which only keeps counts for open todos
+    waiting_on = sum(1 for other in children + blocked_by if other.status != TodoStatus.COMPLETED)
+    return TodoRelations(
+        todo=todo,
+        parent=todos.get(parent),
+        children=children,
+        blocked_by=blocked_by,
+        blocks=blocks,
+        waiting_on=waiting_on,
+        ready=todo.id in graph.ready,
+    )
+
+
+def _order(todos: Iterable[Todo], q: TodoQuery, rank: Optional[Dict[int, int]] = None,
+           presorted: Optional[Tuple[str, bool]] = None) -> Tuple[List[Todo], str]:
+    """Apply the query's ordering, offset and limit; returns (todos, plan step)
+
+    `presorted` is the (field, descending) order `todos` already come in.
+    """
+    end = q.offset + q.limit if q.limit else None
+    skip = f", skip {q.offset}" if q.offset else ""
+    if q.sort_by is None and rank is not None:
+        key, reverse, label = (lambda t: rank[t.id]), False, "similarity"
+    else:
+        field = (q.sort_by or SortField.ID).value
+        key, reverse, label = (lambda t: (getattr(t, field), t.id)), q.order == SortOrder.DESC, field
+        label += " desc" if reverse else ""
+        if presorted == (field, reverse):
+            # Already in the requested order: stop after `limit` rows
+            todos = list(islice(todos, q.offset, end))
+            return todos, f"keep {label} order{f' (first {end})' if end else ''}{skip}"
+    if end:
+        pick = heapq.nlargest if reverse else heapq.nsmallest
+        return pick(end, todos, key=key)[q.offset:], f"top {end} by {label}{skip}"
+    return sorted(todos, key=key, reverse=reverse)[q.offset:], f"sort by {label}{skip}"
+
+
+def _similarity_key(query: str) -> Callable[[Todo], Tuple]:
+    """The fuzzy ranking of trigram_index as a sort key, best first"""
+    query_grams = trigram_index.trigrams(query)
+
+    def key(todo: Todo):
+        similarity, jaccard = trigram_index.score(query_grams, trigram_index.trigrams(_search_text(todo)))
+        return -similarity, -jaccard, todo.id
+    return key
+
+
+def _query_order(q: TodoQuery) -> Tuple[Callable[[Todo], Any], bool, str]:
+    """(key, descending, label) of the order a query's results come in"""
+    if q.sort_by is None and q.text and q.text_mode == SearchMode.FUZZY:
+        return _similarity_key(q.text), False, "similarity"
+    field = (q.sort_by or SortField.ID).value
+    descending = q.order == SortOrder.DESC
+    return (lambda t: (getattr(t, field), t.id)), descending, field + (" desc" if descending else "")
+
+
+def _query_predicate(q: TodoQuery) -> Callable[[Todo], bool]:
+    """All of a query's filters as one test, for todos that no index covers"""
+    statuses = {TodoStatus(status) for status in q.statuses} if q.statuses else None
+    low, high = q.min_priority or 1, q.max_priority or 5
+    ranges = [
+        (field, _naive(start), _naive(end))
+        for field, start, end in (("created_at", q.created_after, q.created_before),
+                                  ("updated_at", q.updated_after, q.updated_before))
+        if start is not None or end is not None
+    ]
+    text_filter = _text_filter(q)
+    query_grams = trigram_index.trigrams(q.text) if q.text and q.text_mode == SearchMode.FUZZY else None
+    tags = _tag_filters(q)
+
+    def matches(todo: Todo) -> bool:
+        if statuses is not None and todo.status not in statuses:
+            return False
+        if not low <= todo.priority <= high:
+            return False
+        if tags is not None:
+            all_of, any_of, none_of = tags
+            has = set(todo.tags)
+            if not all_of <= has or (any_of and not any_of & has) or none_of & has:
+                return False
+        for field, start, end in ranges:
+            value = getattr(todo, field)
+            if (start is not None and value < start) or (end is not None and value >= end):
+                return False
+        if text_filter and not text_filter[1](todo):
+            return False
+        if query_grams is not None:
+            similarity, _ = trigram_index.score(query_grams, trigram_index.trigrams(_search_text(todo)))
+            if similarity == 0 or similarity < q.threshold:
+                return False
+        return True
+    return matches
+
+
+def encode_cursor(key: Key) -> str:
+    """Opaque sync cursor for a (timestamp, id) position"""
+    timestamp, todo_id = key
+    return f"{timestamp.isoformat()}|{todo_id}"
+
+
+def decode_cursor(cursor: str) -> Key:
+    try:
+        timestamp, todo_id = cursor.rsplit("|", 1)
+        return _naive(datetime.fromisoformat(timestamp)), int(todo_id)
+    except ValueError:
+        raise ValueError(f"Invalid sync cursor: {cursor!r}") from None
+
+
+def _changes_page(since: Optional[Key], updated: Iterable[Tuple[Key, Todo]], deleted: Iterable[Key],
+                  limit: int, full_resync: bool) -> TodoChanges:
+    """Merge updates and deletions in change order and cut one page"""
+    merged = heapq.merge(((key, todo) for key, todo in updated), ((key, None) for key in deleted),
+                         key=lambda change: change[0])
+    page = list(islice(merged, limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+    if page:
+        since = page[-1][0]
+    return TodoChanges(
+        todos=[todo for _, todo in page if todo is not None],
+        deleted=[todo_id for (_, todo_id), todo in page if todo is None],
+        cursor=encode_cursor(since) if since is not None else None,
+        has_more=has_more,
+        full_resync=full_resync,
+    )
+
+
+def _resync_needed(since: Optional[Key], tombstones: int, oldest: Optional[Key]) -> bool:
+    """Deletions older than the retained tombstones may have been forgotten"""
+    return since is not None and tombstones >= TOMBSTONE_LIMIT and oldest is not None and since < oldest
+
+
+class MemoryBackend:
+    """In-memory storage for a single process
+
+    Secondary indexes are updated on every mutation: id sets per status and
+    per priority, sorted created_at/updated_at indexes for time ranges and
+    incremental sync, a work queue per (status, priority) ordered by
+    created_at for next_todos, a due_at index of open todos for overdue
+    checks, and a trigram index over titles and
+    descriptions for fuzzy search. The semantic vector index and the tag
+    index (compressed bitmaps per tag, see bitmap_index.py) need NumPy, so
+    each is built on its first use and maintained from then on. So is the
+    dependency graph (todo_graph.py), which checks new parent and blocker
+    relations for cycles and keeps the set of todos ready to start, the
+    columnar mirror (columnar.py) that group-by analytics run on, and the
+    content hashes that deduplicating creates look up.
+    Every write is also counted in per-minute, hour and day activity
+    rollups (rollups.py).
+
+    Every write gets a version number. While snapshots are pinned, each
+    write also appends (version, previous value) to the todo's history,
+    which is what snapshot reads use; without snapshots it keeps nothing.
+    """
+
+    # Every call is pure CPU work on in-process data, safe to run on the event loop
+    blocking = False
+    # Validate new relations here; a shard leaves that to its router, which sees every shard
+    check_relations = True
+
+    def __init__(self):
+        self.todos: Dict[int, Todo] = {}
+        self.next_id = 1
+        self.by_status: Dict[TodoStatus, Set[int]] = {status: set() for status in TodoStatus}
+        self.by_priority: Dict[int, Set[int]] = {priority: set() for priority in range(1, 6)}
+        self.by_created = TimeIndex()
+        self.by_updated = TimeIndex()
+        # Oldest-first queue per (status, priority): the next todos to work on
+        self.queues: Dict[Tuple[TodoStatus, int], TimeIndex] = {
+            (status, priority): TimeIndex() for status in TodoStatus for priority in range(1, 6)
+        }
+        # (due_at, id) of todos that are not completed, for overdue checks
+        self.by_due = TimeIndex()
+        # (deleted_at, id) of recent deletions, for incremental sync
+        self.tombstones = TimeIndex()
+        self.trigrams = trigram_index.TrigramIndex()
+        self.vectors = None
+        self.tags = None
+        self.graph = None
+        self.columns = None
+        # content_hash -> ids of the todos with that title and description
+        self.contents: Optional[Dict[str, Set[int]]] = None
+        self.idempotency = IdempotencyTable()
+        self.rollups = rollups.Rollups()
+        # Versions: the number of the latest write, pinned snapshot version ->
+        # (lease expiry, ttl), and per todo [(version, value it replaced)]
+        self.version = 0
+        self.snapshots: Dict[int, Tuple[float, float]] = {}
+        self.snapshot_expiry = float("inf")
+        self.history: Dict[int, List[Tuple[int, Optional[Todo]]]] = {}
+        # Full results of snapshot queries, so later pages are slices
+        self.snapshot_results: Dict[Tuple[int, str], List[Todo]] = {}
+
+    def _versioned(self, todo_id: int, old: Optional[Todo]):
+        """Number a write, keeping the replaced value while a snapshot may read it"""
+        self.version += 1
+        if self.snapshots:
+            if time.monotonic() >= self.snapshot_expiry:
+                self._expire()
+            if self.snapshots:
+                self.history.setdefault(todo_id, []).append((self.version, old))
+
+    def pin(self, ttl: float = SNAPSHOT_TTL) -> int:
+        """Pin a snapshot of the current todos; returns its id"""
+        self._expire()
+        expiry = time.monotonic() + ttl
+        held = self.snapshots.get(self.version)
+        self.snapshots[self.version] = (max(expiry, held[0]) if held else expiry, ttl)
+        self.snapshot_expiry = min(self.snapshot_expiry, expiry)
+        return self.version
+
+    def _renew(self, snapshot: int):
+        now = time.monotonic()
+        held = self.snapshots.get(snapshot)
+        if held is None or held[0] <= now:
+            raise SnapshotExpired(f"Snapshot {snapshot} has expired or does not exist")
+        self.snapshots[snapshot] = (now + held[1], held[1])
+
+    def _expire(self):
+        """Drop expired snapshots, and the old values only they could see"""
+        now = time.monotonic()
+        for snapshot, (expiry, _) in list(self.snapshots.items()):
+            if expiry <= now:
+                del self.snapshots[snapshot]
+        self.snapshot_expiry = min((expiry for expiry, _ in self.snapshots.values()), default=float("inf"))
+        for key in [key for key in self.snapshot_results if key[0] not in self.snapshots]:
+            del self.snapshot_results[key]
+        if not self.snapshots:
+            self.history.clear()
+            return
+        oldest = min(self.snapshots)
+        for todo_id, versions in list(self.history.items()):
+            # A value replaced at or before the oldest snapshot is invisible to all of them
+            kept = [entry for entry in versions if entry[0] > oldest]
+            if not kept:
+                del self.history[todo_id]
+            elif len(kept) < len(versions):
+                self.history[todo_id] = kept
+
+    def _as_of(self, todo_id: int, snapshot: int) -> Optional[Todo]:
+        """A todo as it was when the snapshot was pinned (None if it did not exist)"""
+        for version, old in self.history.get(todo_id, ()):
+            if version > snapshot:
+                return old
+        return self.todos.get(todo_id)
+
+    def _index(self, todo: Todo, old: Optional[Todo] = None):
+        """Point the secondary indexes at a new or changed todo"""
+        if old is not None:
+            self.by_status[old.status].discard(old.id)
+            self.by_priority[old.priority].discard(old.id)
+            self.by_updated.remove(old.updated_at, old.id)
+            if (old.status, old.priority) != (todo.status, todo.priority):
+                self.queues[old.status, old.priority].remove(old.created_at, old.id)
+                self.queues[todo.status, todo.priority].add(todo.created_at, todo.id)
+        else:
+            self.by_created.add(todo.created_at, todo.id)
+            self.queues[todo.status, todo.priority].add(todo.created_at, todo.id)
+        self.by_status[todo.status].add(todo.id)
+        self.by_priority[todo.priority].add(todo.id)
+        self.by_updated.add(todo.updated_at, todo.id)
+        due, old_due = _open_due(todo), _open_due(old)
+        if due != old_due:
+            if old_due is not None:
+                self.by_due.remove(old_due, todo.id)
+            if due is not None:
+                self.by_due.add(due, todo.id)
+        text = _search_text(todo)
+        if old is None or text != _search_text(old):
+            self.trigrams.add(todo.id, text)
+            if self.vectors is not None:
+                self.vectors.add(todo.id, text)
+            if self.contents is not None:
+                if old is not None:
+                    self._uncontent(old)
+                self.contents.setdefault(content_hash(todo.title, todo.description), set()).add(todo.id)
+        if self.tags is not None and (old is None or todo.tags != old.tags):
+            self.tags.set(todo.id, todo.tags)
+        if self.graph is not None and _graph_changed(todo, old):
+            self.graph.put(*_graph_entry(todo))
+        if self.columns is not None and (old is None or (todo.status, todo.priority) != (old.status, old.priority)):
+            self.columns.put(todo, old)
+
+    def _unindex(self, todo: Todo):
+        self.by_status[todo.status].discard(todo.id)
+        self.by_priority[todo.priority].discard(todo.id)
+        self.by_created.remove(todo.created_at, todo.id)
+        self.by_updated.remove(todo.updated_at, todo.id)
+        self.queues[todo.status, todo.priority].remove(todo.created_at, todo.id)
+        if _open_due(todo) is not None:
+            self.by_due.remove(todo.due_at, todo.id)
+        self.trigrams.remove(todo.id)
+        if self.vectors is not None:
+            self.vectors.remove(todo.id)
+        if self.tags is not None:
+            self.tags.remove(todo.id)
+        if self.graph is not None:
+            self.graph.remove(todo.id)
+        if self.columns is not None:
+            self.columns.remove(todo.id)
+        if self.contents is not None:
+            self._uncontent(todo)
+
+    def _uncontent(self, todo: Todo):
+        key = content_hash(todo.title, todo.description)
+        ids = self.contents.get(key)
+        if ids is not None:
+            ids.discard(todo.id)
+            if not ids:
+                del self.contents[key]
+
+    def _tag_index(self):
+        if self.tags is None:
+            from bitmap_index import TagIndex
+            self.tags = TagIndex()
+            self.tags.add_many((todo.id, todo.tags) for todo in self.todos.values())
+        return self.tags
+
+    def _columns(self):
+        if self.columns is None:
+            from columnar import TodoColumns
+            self.columns = TodoColumns()
+            self.columns.add_many(self.todos.values())
+        return self.columns
+
+    def _graph(self):
+        if self.graph is None:
+            from todo_graph import DependencyGraph
+            self.graph = DependencyGraph()
+            self.graph.load(_graph_entry(todo) for todo in self.todos.values())
+        return self.graph
+
+    def _content_index(self):
+        if self.contents is None:
+            self.contents = {}
+            for todo in self.todos.values():
+                self.contents.setdefault(content_hash(todo.title, todo.description), set()).add(todo.id)
+        return self.contents
+
+    def _check(self, todo: Todo, old: Optional[Todo] = None):
+        """Refuse relations to missing todos, or that would close a dependency cycle"""
+        if self.check_relations and any(_new_relations(todo, old)):
+            self._graph().check(todo.id, todo.parent_id, todo.blocked_by,
+                                old.parent_id if old else None, old.blocked_by if old else ())
+
+    def all(self, status: Optional[TodoStatus] = None) -> List[Todo]:
+        if status:
+            return [self.todos[todo_id] for todo_id in sorted(self.by_status[TodoStatus(status)])]
+        return list(self.todos.values())
+
+    def get(self, todo_id: int) -> Optional[Todo]:
+        return self.todos.get(todo_id)
+
+    def get_many(self, todo_ids: Iterable[int]) -> List[Todo]:
+        """The todos with these ids that exist, in the order given"""
+        return [self.todos[todo_id] for todo_id in todo_ids if todo_id in self.todos]
+
+    def counts(self) -> Dict[TodoStatus, int]:
+        return {status: len(ids) for status, ids in self.by_status.items()}
+
+    def create(self, todo_data: TodoCreate, todo_id: Optional[int] = None) -> Todo:
+        """Add a todo, numbered by this store unless a router assigned `todo_id`"""
+        now = datetime.now()
+        new_todo = Todo(
+            id=todo_id or self.next_id,
+            title=todo_data.title,
+            description=todo_data.description,
+            status=todo_data.status,
+            priority=todo_data.priority,
+            tags=todo_data.tags,
+            due_at=_naive(todo_data.due_at),
+            parent_id=todo_data.parent_id,
+            blocked_by=todo_data.blocked_by,
+            created_at=now,
+            updated_at=now
+        )
+        self._check(new_todo)
+        self._versioned(new_todo.id, None)
+        self.todos[new_todo.id] = new_todo
+        self._index(new_todo)
+        self.rollups.record(now, new_todo)
+        self.next_id = max(self.next_id, new_todo.id + 1)
+        return new_todo
+
+    def create_once(self, todo_data: TodoCreate, key: Optional[str] = None, dedupe: bool = False) -> Created:
+        """Create unless `key` was seen before or (with `dedupe`) the same todo exists"""
+        return _create_once(self.idempotency, todo_data, key, dedupe, self.duplicate_of, self.create)
+
+    def duplicate_of(self, title: str, description: Optional[str]) -> Optional[Todo]:
+        """The oldest todo with this title and description, ignoring case and whitespace"""
+        ids = self._content_index().get(content_hash(title, description))
+        return self.todos[min(ids)] if ids else None
+
+    def update(self, todo_id: int, todo_data: TodoUpdate) -> Optional[Todo]:
+        todo = self.todos.get(todo_id)
+        if todo is None:
+            return None
+        updated_todo = _apply_update(todo, todo_data, datetime.now())
+        self._check(updated_todo, todo)
+        self._versioned(todo_id, todo)
+        self.todos[todo_id] = updated_todo
+        self._index(updated_todo, todo)
+        self.rollups.record(updated_todo.updated_at, updated_todo, todo)
+        return updated_todo
+
+    def delete(self, todo_id: int) -> bool:
+        todo = self.todos.pop(todo_id, None)
+        if todo is None:
+            return False
+        self._versioned(todo_id, todo)
+        self._unindex(todo)
+        now = datetime.now()
+        self.rollups.record(now, None, todo)
+        self.tombstones.add(now, todo_id)
+        self.tombstones.trim(TOMBSTONE_LIMIT)
+        return True
+
+    def next(self, statuses: List[TodoStatus], limit: int) -> List[Todo]:
+        """Highest priority first, oldest first within a priority
+
+        Walks the priority buckets from 5 down, merging the statuses' queues,
+        and stops after `limit` todos: O(limit + log n), with no sort.
+        """
+        found = []
+        for priority in range(5, 0, -1):
+            queues = [self.queues[TodoStatus(status), priority].after() for status in statuses]
+            for _, todo_id in islice(heapq.merge(*queues), limit - len(found)):
+                found.append(self.todos[todo_id])
+            if len(found) >= limit:
+                break
+        return found
+
+    def overdue(self, now: datetime, limit: Optional[int] = None) -> List[Todo]:
+        """Open todos due before `now`, most overdue first: O(log n + k)"""
+        end = self.by_due.count(None, now)
+        return [self.todos[todo_id] for _, todo_id in self.by_due.keys[:min(end, limit or end)]]
+
+    def came_due(self, start: datetime, end: datetime) -> List[Todo]:
+        """Open todos due in [start, end), earliest first: those that just became overdue"""
+        return [self.todos[todo_id] for todo_id in self.by_due.ids(start, end)]
+
+    def ready(self, limit: Optional[int] = None) -> List[Todo]:
+        """Todos waiting on nothing, highest priority then oldest first: O(r log limit)"""
+        return [self.todos[todo_id] for todo_id in self._graph().ready_ids(limit)]
+
+    def relations(self, todo_id: int) -> Optional[TodoRelations]:
+        todo = self.todos.get(todo_id)
+        if todo is None:
+            return None
+        return _relations(todo, self._graph(), lambda ids: {t.id: t for t in self.get_many(ids)})
+
+    def timeseries(self, resolution: str, first: int, last: int) -> List[List[int]]:
+        """Activity counters (rollups.METRICS) of buckets first..last: O(buckets)"""
+        return self.rollups.rows(resolution, first, last)
+
+    def analytics(self, group_by: AnalyticsGroupBy, now: datetime):
+        """Partial group-by aggregates (columnar.Partial), vectorised over the columnar mirror"""
+        tags = None
+        if group_by == AnalyticsGroupBy.TAG:
+            tags = {tag: bitmap.array() for tag, bitmap in self._tag_index().tags.items()}
+        return self._columns().group(group_by, now, tags)
+
+    def changes_since(self, since: Optional[Key], limit: int) -> TodoChanges:
+        """Todos updated and deleted after a (timestamp, id) position
+
+        Both sides are read from sorted indexes, so a page costs
+        O(log n + limit) however large the store is.
+        """
+        full_resync = _resync_needed(since, len(self.tombstones), self.tombstones.oldest())
+        if full_resync:
+            since = None
+        updated = ((key, self.todos[key[1]]) for key in self.by_updated.after(since))
+        deleted = self.tombstones.after(since) if since is not None else ()
+        return _changes_page(since, updated, deleted, limit, full_resync)
+
+    def search(self, query: str) -> List[Todo]:
+        query_lower = query.lower()
+        return [todo for todo in self.todos.values() if _matches(todo, query_lower)]
+
+    def fuzzy_search(self, query: str, threshold: float = DEFAULT_THRESHOLD) -> List[Todo]:
+        return [self.todos[todo_id] for todo_id, _ in self.trigrams.search(query, threshold)]
+
+    def semantic_search(self, query: str, limit: int = 10) -> List[Tuple[Todo, float]]:
+        if self.vectors is None:
+            from vector_index import VectorIndex
+            self.vectors = VectorIndex()
+            self.vectors.add_many((todo.id, _search_text(todo)) for todo in self.todos.values())
+        return [(self.todos[todo_id], score) for todo_id, score in self.vectors.search(query, limit)]
+
+    def query(self, q: TodoQuery) -> Tuple[List[Todo], List[str]]:
+        """Run a combined query; returns the todos and the plan that was used
+
+        Every indexed predicate is an access path that can estimate its size
+        cheaply, list its ids and test membership. The planner reads ids from
+        the smallest path and probes the others in increasing size, so the
+        work is bounded by the most selective predicate. Substring text, which
+        has no index, is then checked on the surviving todos only.
+        """
+        if q.snapshot is not None:
+            return self._snapshot_query(q)
+        paths = []
+
+        def id_sets(label, sets):
+            # Disjoint id sets whose union matches the predicate
+            paths.append((label, sum(len(ids) for ids in sets), None,
+                          lambda reverse: [todo_id for ids in sets for todo_id in ids],
+                          lambda todo_id: any(todo_id in ids for ids in sets)))
+
+        def time_range(field, index, start, end):
+            start, end = _naive(start), _naive(end)
+            if start is None and end is None:
+                return
+            label = f"{field} in [{start.isoformat() if start else '-inf'}, {end.isoformat() if end else 'now'})"
+            paths.append((label, index.count(start, end), field,
+                          lambda reverse: index.ids(start, end, reverse),
+                          lambda todo_id: (start is None or getattr(self.todos[todo_id], field) >= start) and
+                                          (end is None or getattr(self.todos[todo_id], field) < end)))
+
+        if q.statuses:
+            statuses = sorted(set(q.statuses), key=lambda st: st.value)
+            id_sets(f"status in ({', '.join(st.value for st in statuses)})", [self.by_status[st] for st in statuses])
+        low, high = q.min_priority or 1, q.max_priority or 5
+        if (low, high) != (1, 5):
+            id_sets(f"priority {low}-{high}", [self.by_priority[p] for p in range(low, high + 1)])
+        time_range("created_at", self.by_created, q.created_after, q.created_before)
+        time_range("updated_at", self.by_updated, q.updated_after, q.updated_before)
+        tags = _tag_filters(q)
+        if tags is not None:
+            # One bitmap AND / OR / AND-NOT pass; its ids come out in id order
+            tagged = self._tag_index().match(*tags)
+            paths.append((f"tags {_tag_label(tags)}", len(tagged), "id",
+                          lambda reverse: tagged.ids()[::-1] if reverse else tagged.ids(),
+                          tagged.__contains__))
+        rank = None
+        if q.text and q.text_mode == SearchMode.FUZZY:
+            ranked = self.trigrams.search(q.text, q.threshold)
+            rank = {todo_id: i for i, (todo_id, _) in enumerate(ranked)}
+            id_sets(f"fuzzy text {q.text!r} >= {q.threshold}", [rank.keys()])
+
+        plan = []
+        if paths:
+            paths.sort(key=lambda path: path[1])
+            label, _, field, list_ids, _ = paths[0]
+            # A time index yields ids in time order; read it in the requested
+            # direction when the query sorts on the same field
+            reverse = q.order == SortOrder.DESC and (q.sort_by or SortField.ID).value == field
+            candidates = list_ids(reverse)
+            presorted = (field, reverse) if field else None
+            plan.append(f"index {label}: {len(candidates)} ids")
+            for label, size, _, _, contains in paths[1:]:
+                candidates = [todo_id for todo_id in candidates if contains(todo_id)]
+                plan.append(f"probe {label} (~{size} ids): {len(candidates)} left")
+            todos = [self.todos[todo_id] for todo_id in candidates]
+        else:
+            plan.append(f"full scan: {len(self.todos)} todos")
+            todos = self.todos.values()
+            presorted = ("id", False)
+
+        text_filter = _text_filter(q)
+        if text_filter:
+            label, predicate = text_filter
+            todos = [todo for todo in todos if predicate(todo)]
+            plan.append(f"filter {label}: {len(todos)} left")
+
+        todos, step = _order(todos, q, rank, presorted)
+        plan.append(step)
+        return todos, plan
+
+    def _snapshot_query(self, q: TodoQuery) -> Tuple[List[Todo], List[str]]:
+        """The query as of a snapshot: current results, corrected for later writes"""
+        snapshot = q.snapshot
+        self._renew(snapshot)
+        changed = [todo_id for todo_id, versions in self.history.items() if versions[-1][0] > snapshot]
+        if not changed:
+            todos, plan = self.query(q.model_copy(update={"snapshot": None}))
+            return todos, [f"snapshot {snapshot}: no writes since"] + plan
+        end = q.offset + q.limit if q.limit else None
+        whole = q.model_copy(update={"snapshot": None, "offset": 0, "limit": None})
+        result_key = (snapshot, whole.model_dump_json())
+        todos = self.snapshot_results.get(result_key)
+        if todos is not None:
+            return todos[q.offset:end], [f"snapshot {snapshot}: page of {len(todos)} cached results"]
+
+        current, plan = self.query(whole)
+        skip = set(changed)
+        matches = _query_predicate(q)
+        older = [todo for todo in (self._as_of(todo_id, snapshot) for todo_id in changed)
+                 if todo is not None and matches(todo)]
+        plan.append(f"snapshot {snapshot}: {len(changed)} todos changed since, {len(older)} old versions match")
+        key, descending, label = _query_order(q)
+        older.sort(key=key, reverse=descending)
+        todos = list(heapq.merge((todo for todo in current if todo.id not in skip), older,
+                                 key=key, reverse=descending))
+        plan.append(f"merge old versions by {label}, cache {len(todos)} results for later pages")
+        # The result never changes, so the next pages only slice it
+        self.snapshot_results[result_key] = todos
+        while len(self.snapshot_results) > SNAPSHOT_RESULTS:
+            del self.snapshot_results[next(iter(self.snapshot_results))]
+        return todos[q.offset:end], plan
+
+    def facets(self, q: TodoQuery) -> Dict[str, int]:
+        """Todos per tag among all the query's matches (its offset and limit ignored)"""
+        whole = q.model_copy(update={"offset": 0, "limit": None, "sort_by": None, "order": SortOrder.ASC})
+        if q.snapshot is not None:
+            return _count_tags(self.query(whole)[0])
+        if whole == TodoQuery():
+            # No filters: the size of every tag's bitmap
+            return self._tag_index().facets()
+        return self._tag_index().facets(todo.id for todo in self.query(whole)[0])
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """SQLite storage that can be shared by several processes
+
+    The database runs in WAL mode so readers in one worker never block a
+    writer in another. Each todo is stored as its JSON document next to the
+    columns used for filtering, so new model fields need no migration.
+    Due times stay in the JSON; a partial index on the JSON field, over
+    todos that are not completed, answers overdue checks without a column.
+    Tags are also kept one row per (tag, todo) in todo_tags, whose primary
+    key answers tag filters as index lookups combined with INTERSECT,
+    IN and NOT IN. Relations are rows of todo_links, (waiter, dependency,
+    kind): a parent waits for each child, a todo for each blocker. Cycle
+    checks walk them with a recursive query inside the write transaction,
+    and the ready todos are a query for open todos with no open dependency,
+    since another worker may have changed any of them. Activity rollups
+    are rows of todo_rollups, one per (resolution, bucket, counter), added
+    to in each write's transaction so every worker's writes count.
+    Idempotency keys are rows of idempotency_keys, with their expiry in
+    wall-clock time, and each todo's content hash a row of todo_contents;
+    create_once reads and writes both in the create's transaction, so a
+    retry that reaches another worker still finds the first request's key.
+
+    A snapshot is a read transaction held open on a connection of its own;
+    WAL mode shows it the database as of its first read. Snapshots live in
+    the worker that pinned them, so their ids are random to keep workers
+    from mistaking each other's.
+    """
+
+    # Calls wait on file I/O and locks held by other processes
+    blocking = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS todos_status ON todos (status);
+        CREATE INDEX IF NOT EXISTS todos_created_at ON todos (created_at, id);
+        CREATE INDEX IF NOT EXISTS todos_updated_at ON todos (updated_at, id);
+        CREATE INDEX IF NOT EXISTS todos_queue ON todos (status, priority DESC, created_at, id);
+        CREATE INDEX IF NOT EXISTS todos_due ON todos (json_extract(data, '$.due_at'), id)
+            WHERE status != 'completed' AND json_extract(data, '$.due_at') IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS deleted_todos (
+            id INTEGER NOT NULL,
+            deleted_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS deleted_todos_deleted_at ON deleted_todos (deleted_at, id);
+        CREATE TABLE IF NOT EXISTS todo_tags (
+            tag TEXT NOT NULL,
+            todo_id INTEGER NOT NULL,
+            PRIMARY KEY (tag, todo_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS todo_tags_todo_id ON todo_tags (todo_id);
+        CREATE TABLE IF NOT EXISTS todo_links (
+            todo_id INTEGER NOT NULL,
+            depends_on INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            PRIMARY KEY (todo_id, kind, depends_on)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS todo_links_depends_on ON todo_links (depends_on, kind);
+        CREATE TABLE IF NOT EXISTS todo_rollups (
+            resolution TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (resolution, bucket, metric)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS todo_contents (
+            hash TEXT NOT NULL,
+            todo_id INTEGER NOT NULL,
+            PRIMARY KEY (hash, todo_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS todo_contents_todo_id ON todo_contents (todo_id);
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            duplicate INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at);
+    """
+
+    # Whether the second todo can be reached from the first by following dependencies
+    REACHES = """
+        WITH RECURSIVE reach(id) AS (
+            SELECT ? UNION SELECT l.depends_on FROM todo_links l JOIN reach ON l.todo_id = reach.id
+        )
+        SELECT 1 FROM reach WHERE id = ? LIMIT 1
+    """
+    # Open dependencies of todo t
+    OPEN_DEPENDENCIES = ("SELECT 1 FROM todo_links l JOIN todos d ON d.id = l.depends_on "
+                         "WHERE l.todo_id = t.id AND d.status != 'completed'")
+
+    def __init__(self, path: str):
+        import sqlite3
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        # Snapshot id -> [connection, its lock, lease expiry, ttl]
+        self.snapshots: Dict[int, list] = {}
+        self.snapshot_expiry = float("inf")
+        # Minute bucket up to which rollups past their ring's length were deleted
+        self.rollups_trimmed: Optional[int] = None
+        # Whether todos written before todo_contents existed have been hashed
+        self.contents_complete = False
+
+    def _rows(self, sql: str, params=(), snapshot: Optional[int] = None) -> List[Todo]:
+        conn, lock = self._reader(snapshot)
+        with lock:
+            rows = conn.execute(sql, params).fetchall()
+        return [Todo.model_validate_json(row[0]) for row in rows]
+
+    def pin(self, ttl: float = SNAPSHOT_TTL) -> int:
+        """Pin a snapshot of the current todos; returns its id"""
+        import secrets
+        import sqlite3
+        self._expire()
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+        conn.execute("BEGIN")
+        # The transaction's view of the database is fixed by its first read
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        snapshot = secrets.randbits(48)
+        expiry = time.monotonic() + ttl
+        self.snapshots[snapshot] = [conn, threading.Lock(), expiry, ttl]
+        self.snapshot_expiry = min(self.snapshot_expiry, expiry)
+        return snapshot
+
+    def _reader(self, snapshot: Optional[int]):
+        """(connection, lock) to read the current todos or a snapshot with"""
+        if self.snapshots and time.monotonic() >= self.snapshot_expiry:
+            self._expire()
+        if snapshot is None:
+            return self.conn, self.lock
+        held = self.snapshots.get(snapshot)
+        if held is None:
+            raise SnapshotExpired(f"Snapshot {snapshot} has expired or was pinned by another worker")
+        held[2] = time.monotonic() + held[3]
+        return held[0], held[1]
+
+    def _expire(self):
+        """End the read transactions of expired snapshots, so the WAL can be checkpointed"""
+        now = time.monotonic()
+        for snapshot, held in list(self.snapshots.items()):
+            if held[2] <= now:
+                del self.snapshots[snapshot]
+                with held[1]:
+                    held[0].close()
+        self.snapshot_expiry = min((held[2] for held in self.snapshots.values()), default=float("inf"))
+
+    def _write(self, cur: "sqlite3.Cursor", todo: Todo, old: Optional[Todo] = None):
+        cur.execute(
+            "UPDATE todos SET status = ?, priority = ?, created_at = ?, updated_at = ?, data = ? WHERE id = ?",
+            (todo.status.value, todo.priority, todo.created_at.isoformat(),
+             todo.updated_at.isoformat(), todo.model_dump_json(), todo.id)
+        )
+        if old is None or (todo.title, todo.description) != (old.title, old.description):
+            cur.execute("DELETE FROM todo_contents WHERE todo_id = ?", (todo.id,))
+            cur.execute("INSERT INTO todo_contents (hash, todo_id) VALUES (?, ?)",
+                        (content_hash(todo.title, todo.description), todo.id))
+        if old is None or todo.tags != old.tags:
+            cur.execute("DELETE FROM todo_tags WHERE todo_id = ?", (todo.id,))
+            cur.executemany("INSERT INTO todo_tags (tag, todo_id) VALUES (?, ?)",
+                            [(tag, todo.id) for tag in todo.tags])
+        # Only link todos that exist: kept ids may point at deleted ones
+        if old is None or todo.blocked_by != old.blocked_by:
+            cur.execute("DELETE FROM todo_links WHERE todo_id = ? AND kind = 'blocker'", (todo.id,))
+            cur.executemany("INSERT INTO todo_links SELECT ?, id, 'blocker' FROM todos WHERE id = ?",
+                            [(todo.id, blocker) for blocker in todo.blocked_by])
+        if old is None or todo.parent_id != old.parent_id:
+            cur.execute("DELETE FROM todo_links WHERE depends_on = ? AND kind = 'child'", (todo.id,))
+            if todo.parent_id is not None:
+                cur.execute("INSERT INTO todo_links SELECT id, ?, 'child' FROM todos WHERE id = ?",
+                            (todo.id, todo.parent_id))
+        self._rollup(cur, todo.updated_at, todo, old)
+
+    def _rollup(self, cur: "sqlite3.Cursor", when: datetime, todo: Optional[Todo], old: Optional[Todo] = None):
+        """Count a write in the activity rollups, and once a minute drop buckets no ring keeps"""
+        metrics = rollups.changes(todo, old)
+        cur.executemany(
+            "INSERT INTO todo_rollups VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (resolution, bucket, metric) DO UPDATE SET count = count + 1",
+            [(resolution, rollups.bucket_of(when, width), metric)
+             for resolution, (width, _) in rollups.RESOLUTIONS.items() for metric in metrics])
+        minute = rollups.bucket_of(when, 60)
+        if metrics and minute != self.rollups_trimmed:
+            self.rollups_trimmed = minute
+            cur.executemany("DELETE FROM todo_rollups WHERE resolution = ? AND bucket <= ?",
+                            [(resolution, rollups.bucket_of(when, width) - size)
+                             for resolution, (width, size) in rollups.RESOLUTIONS.items()])
+
+    def _check(self, cur: "sqlite3.Cursor", todo: Todo, old: Optional[Todo] = None):
+        """Refuse relations to missing todos, or that closed a dependency cycle
+
+        Runs after _write, in its transaction, which the caller rolls back on
+        ValueError: the links are already the new ones, so any cycle runs
+        through an added edge, back from its dependency to its waiter.
+        """
+        parent_id, blocked_by = _new_relations(todo, old)
+        others = ([parent_id] if parent_id is not None else []) + blocked_by
+        if not others:
+            return
+        if todo.id in others:
+            raise ValueError(f"Todo {todo.id} cannot depend on itself")
+        found = {row[0] for row in cur.execute(
+            f"SELECT id FROM todos WHERE id IN ({', '.join('?' * len(others))})", others)}
+        missing = [other for other in others if other not in found]
+        if missing:
+            raise ValueError(f"Todo {missing[0]} does not exist")
+        edges = [(todo.id, blocker) for blocker in blocked_by]
+        if parent_id is not None:
+            edges.append((parent_id, todo.id))
+        for waiter, dependency in edges:
+            if cur.execute(self.REACHES, (dependency, waiter)).fetchone():
+                raise ValueError(f"That relation would create a dependency cycle: "
+                                 f"{waiter} -> {dependency} -> ... -> {waiter}")
+
+    def all(self, status: Optional[TodoStatus] = None) -> List[Todo]:
+        if status:
+            return self._rows("SELECT data FROM todos WHERE status = ? ORDER BY id", (TodoStatus(status).value,))
+        return self._rows("SELECT data FROM todos ORDER BY id")
+
+    def get(self, todo_id: int) -> Optional[Todo]:
+        rows = self._rows("SELECT data FROM todos WHERE id = ?", (todo_id,))
+        return rows[0] if rows else None
+
+    def counts(self) -> Dict[TodoStatus, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM todos GROUP BY status").fetchall()
+        counts = {status: 0 for status in TodoStatus}
+        counts.update({TodoStatus(status): count for status, count in rows})
+        return counts
+
+    def _insert(self, cur: "sqlite3.Cursor", todo_data: TodoCreate) -> Todo:
+        now = datetime.now()
+        # Insert first so SQLite hands out an id that is unique across workers
+        cur.execute(
+            "INSERT INTO todos (status, priority, created_at, updated_at, data) VALUES (?, ?, ?, ?, '{}')",
+            (TodoStatus(todo_data.status).value, todo_data.priority, now.isoformat(), now.isoformat())
+        )
+        new_todo = Todo(
+            id=cur.lastrowid,
+            title=todo_data.title,
+            description=todo_data.description,
+            status=todo_data.status,
+            priority=todo_data.priority,
+            tags=todo_data.tags,
+            due_at=_naive(todo_data.due_at),
+            parent_id=todo_data.parent_id,
+            blocked_by=todo_data.blocked_by,
+            created_at=now,
+            updated_at=now
+        )
+        self._write(cur, new_todo)
+        self._check(cur, new_todo)
+        return new_todo
+
+    def create(self, todo_data: TodoCreate) -> Todo:
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                new_todo = self._insert(cur, todo_data)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return new_todo
+
+    def _hash_contents(self, cur: "sqlite3.Cursor"):
+        """Hash the todos that have no todo_contents row yet (written before the table existed)"""
+        if self.contents_complete:
+            return
+        rows = cur.execute("SELECT data FROM todos WHERE id NOT IN (SELECT todo_id FROM todo_contents)").fetchall()
+        todos = [Todo.model_validate_json(data) for (data,) in rows]
+        cur.executemany("INSERT INTO todo_contents (hash, todo_id) VALUES (?, ?)",
+                        [(content_hash(todo.title, todo.description), todo.id) for todo in todos])
+        self.contents_complete = True
+
+    def _duplicate_of(self, cur: "sqlite3.Cursor", title: str, description: Optional[str]) -> Optional[Todo]:
+        row = cur.execute(
+            "SELECT t.data FROM todo_contents c JOIN todos t ON t.id = c.todo_id WHERE c.hash = ? "
+            "ORDER BY c.todo_id LIMIT 1", (content_hash(title, description),)
+        ).fetchone()
+        return Todo.model_validate_json(row[0]) if row else None
+
+    def create_once(self, todo_data: TodoCreate, key: Optional[str] = None, dedupe: bool = False) -> Created:
+        """Create unless `key` was seen before or (with `dedupe`) the same todo exists"""
+        fingerprint = _fingerprint(todo_data)
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                replay = key is not None and cur.execute(
+                    "SELECT fingerprint, duplicate, data FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if not replay:
+                    existing = None
+                    if dedupe:
+                        self._hash_contents(cur)
+                        existing = self._duplicate_of(cur, todo_data.title, todo_data.description)
+                    result = Created(existing, duplicate=True) if existing else Created(self._insert(cur, todo_data))
+                    if key is not None:
+                        cur.execute("INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?, ?, ?)",
+                                    (key, fingerprint, now + IDEMPOTENCY_TTL, result.duplicate,
+                                     result.todo.model_dump_json()))
+                        cur.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+                        cur.execute("DELETE FROM idempotency_keys WHERE rowid <= "
+                                    "(SELECT MAX(rowid) FROM idempotency_keys) - ?", (IDEMPOTENCY_KEYS,))
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                self.contents_complete = False
+                raise
+        if replay:
+            if replay[0] != fingerprint:
+                raise _reused(key)
+            return Created(Todo.model_validate_json(replay[2]), bool(replay[1]), replayed=True)
+        return result
+
+    def duplicate_of(self, title: str, description: Optional[str]) -> Optional[Todo]:
+        """The oldest todo with this title and description, ignoring case and whitespace"""
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                self._hash_contents(cur)
+                existing = self._duplicate_of(cur, title, description)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                self.contents_complete = False
+                raise
+        return existing
+
+    def update(self, todo_id: int, todo_data: TodoUpdate) -> Optional[Todo]:
+        with self.lock:
+            cur = self.conn.cursor()
+            # Take the write lock before reading so concurrent workers cannot lose updates
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                row = cur.execute("SELECT data FROM todos WHERE id = ?", (todo_id,)).fetchone()
+                if row is None:
+                    cur.execute("ROLLBACK")
+                    return None
+                todo = Todo.model_validate_json(row[0])
+                updated_todo = _apply_update(todo, todo_data, datetime.now())
+                self._write(cur, updated_todo, todo)
+                self._check(cur, updated_todo, todo)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return updated_todo
+
+    def delete(self, todo_id: int) -> bool:
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = cur.execute("DELETE FROM todos WHERE id = ?", (todo_id,)).rowcount > 0
+                if deleted:
+                    cur.execute("DELETE FROM todo_contents WHERE todo_id = ?", (todo_id,))
+                    cur.execute("DELETE FROM todo_tags WHERE todo_id = ?", (todo_id,))
+                    cur.execute("DELETE FROM todo_links WHERE todo_id = ?", (todo_id,))
+                    cur.execute("DELETE FROM todo_links WHERE depends_on = ?", (todo_id,))
+                    # Leave a tombstone for incremental sync, keeping the newest TOMBSTONE_LIMIT
+                    now = datetime.now()
+                    cur.execute("INSERT INTO deleted_todos (id, deleted_at) VALUES (?, ?)",
+                                (todo_id, now.isoformat()))
+                    self._rollup(cur, now, None)
+                    cur.execute("DELETE FROM deleted_todos WHERE rowid <= (SELECT MAX(rowid) FROM deleted_todos) - ?",
+                                (TOMBSTONE_LIMIT,))
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return deleted
+
+    def next(self, statuses: List[TodoStatus], limit: int) -> List[Todo]:
+        """Highest priority first, oldest first within a priority, via the queue index"""
+        return self._rows(
+            f"SELECT data FROM todos WHERE status IN ({', '.join('?' * len(statuses))}) "
+            "ORDER BY priority DESC, created_at, id LIMIT ?",
+            (*(TodoStatus(status).value for status in statuses), limit)
+        )
+
+    # Matches the todos_due index, so both reads are index range scans
+    OPEN_DUE = "status != 'completed' AND json_extract(data, '$.due_at') IS NOT NULL"
+
+    def overdue(self, now: datetime, limit: Optional[int] = None) -> List[Todo]:
+        """Open todos due before `now`, most overdue first, via the due index"""
+        return self._rows(
+            f"SELECT data FROM todos WHERE {self.OPEN_DUE} AND json_extract(data, '$.due_at') < ? "
+            "ORDER BY json_extract(data, '$.due_at'), id LIMIT ?", (now.isoformat(), limit or -1))
+
+    def came_due(self, start: datetime, end: datetime) -> List[Todo]:
+        """Open todos due in [start, end), earliest first"""
+        return self._rows(
+            f"SELECT data FROM todos WHERE {self.OPEN_DUE} AND json_extract(data, '$.due_at') >= ? "
+            "AND json_extract(data, '$.due_at') < ? ORDER BY json_extract(data, '$.due_at'), id",
+            (start.isoformat(), end.isoformat()))
+
+    def ready(self, limit: Optional[int] = None) -> List[Todo]:
+        """Todos waiting on nothing, highest priority then oldest first"""
+        return self._rows(
+            f"SELECT data FROM todos t WHERE status != 'completed' AND NOT EXISTS ({self.OPEN_DEPENDENCIES}) "
+            "ORDER BY priority DESC, id LIMIT ?", (limit or -1,))
+
+    def relations(self, todo_id: int) -> Optional[TodoRelations]:
+        conn, lock = self._reader(None)
+        with lock:
+            row = conn.execute("SELECT data FROM todos WHERE id = ?", (todo_id,)).fetchone()
+            if row is None:
+                return None
+            # (kind, whether the todo is the one waiting, the other todo) for its links
+            links = conn.execute(
+                "SELECT l.kind, 1, d.data FROM todo_links l JOIN todos d ON d.id = l.depends_on "
+                "WHERE l.todo_id = ? UNION ALL "
+                "SELECT l.kind, 0, d.data FROM todo_links l JOIN todos d ON d.id = l.todo_id "
+                "WHERE l.depends_on = ?", (todo_id, todo_id)).fetchall()
+        todo = Todo.model_validate_json(row[0])
+        related = {"child": ([], []), "blocker": ([], [])}
+        for kind, waits, data in links:
+            related[kind][0 if waits else 1].append(Todo.model_validate_json(data))
+        for side in (*related["child"], *related["blocker"]):
+            side.sort(key=lambda t: t.id)
+        (children, parents), (blocked_by, blocks) = related["child"], related["blocker"]
+        waiting_on = sum(1 for other in children + blocked_by if other.status != TodoStatus.COMPLETED)
+        return TodoRelations(
+            todo=todo,
+            parent=parents[0] if parents else None,
+            children=children,
+            blocked_by=blocked_by,
+            blocks=blocks,
+            waiting_on=waiting_on,
+            ready=todo.status != TodoStatus.COMPLETED and waiting_on == 0,
+        )
+
+    def timeseries(self, resolution: str, first: int, last: int) -> List[List[int]]:
+        """Activity counters (rollups.METRICS) of buckets first..last, a range read of the rollups' key"""
+        with self.lock:
+            found = self.conn.execute(
+                "SELECT bucket, metric, count FROM todo_rollups WHERE resolution = ? AND bucket BETWEEN ? AND ?",
+                (resolution, first, last)).fetchall()
+        rows = [[0] * len(rollups.METRICS) for _ in range(last - first + 1)]
+        for bucket, metric, count in found:
+            rows[bucket - first][rollups.COLUMN[metric]] = count
+        return rows
+
+    def analytics(self, group_by: AnalyticsGroupBy, now: datetime):
+        """Partial group-by aggregates (columnar.Partial): one GROUP BY, plus the completion times to take medians of"""
+        from columnar import from_rows
+        key = {
+            AnalyticsGroupBy.STATUS: "t.status",
+            AnalyticsGroupBy.PRIORITY: "CAST(t.priority AS TEXT)",
+            AnalyticsGroupBy.TAG: "g.tag",
+            AnalyticsGroupBy.NONE: "'all'",
+        }[AnalyticsGroupBy(group_by)]
+        source = "todos t JOIN todo_tags g ON g.todo_id = t.id" if group_by == AnalyticsGroupBy.TAG else "todos t"
+        conn, lock = self._reader(None)
+        with lock:
+            conn.execute("BEGIN")
+            try:
+                total = conn.execute("SELECT COUNT(*) FROM todos").fetchone()[0]
+                groups = conn.execute(
+                    f"SELECT {key}, COUNT(*), SUM(julianday(?) - julianday(t.created_at)) * 86400 "
+                    f"FROM {source} GROUP BY 1", (now.isoformat(),)).fetchall()
+                # No completion time is stored: a completed todo's last update stands in for it
+                took = conn.execute(
+                    f"SELECT {key}, (julianday(t.updated_at) - julianday(t.created_at)) * 86400 "
+                    f"FROM {source} WHERE t.status = 'completed' ORDER BY 1, 2").fetchall()
+            finally:
+                conn.execute("COMMIT")
+        return from_rows(total, groups, took)
+
+    def changes_since(self, since: Optional[Key], limit: int) -> TodoChanges:
+        """Todos updated and deleted after a (timestamp, id) position, via the time indexes"""
+        with self.lock:
+            tombstones, oldest = self.conn.execute(
+                "SELECT COUNT(*), MIN(deleted_at) FROM deleted_todos").fetchone()
+            full_resync = _resync_needed(since, tombstones, (datetime.fromisoformat(oldest), 0) if oldest else None)
+            if full_resync:
+                since = None
+            if since is None:
+                rows = self.conn.execute("SELECT data FROM todos ORDER BY updated_at, id LIMIT ?",
+                                         (limit + 1,)).fetchall()
+                deleted = []
+            else:
+                at, todo_id = since[0].isoformat(), since[1]
+                rows = self.conn.execute(
+                    "SELECT data FROM todos WHERE (updated_at, id) > (?, ?) "
+                    "ORDER BY updated_at, id LIMIT ?", (at, todo_id, limit + 1)).fetchall()
+                deleted = self.conn.execute(
+                    "SELECT deleted_at, id FROM deleted_todos WHERE (deleted_at, id) > (?, ?) "
+                    "ORDER BY deleted_at, id LIMIT ?", (at, todo_id, limit + 1)).fetchall()
+        todos = [Todo.model_validate_json(row[0]) for row in rows]
+        updated = [((todo.updated_at, todo.id), todo) for todo in todos]
+        deleted = [(datetime.fromisoformat(at), todo_id) for at, todo_id in deleted]
+        return _changes_page(since, updated, deleted, limit, full_resync)
+
+    def search(self, query: str) -> List[Todo]:
+        query_lower = query.lower()
+        return [todo for todo in self.all() if _matches(todo, query_lower)]
+
+    def fuzzy_search(self, query: str, threshold: float = DEFAULT_THRESHOLD) -> List[Todo]:
+        # No trigram index here: another worker may have changed any row
+        todos = {todo.id: todo for todo in self.all()}
+        ranked = trigram_index.scan(((t.id, _search_text(t)) for t in todos.values()), query, threshold)
+        return [todos[todo_id] for todo_id, _ in ranked]
+
+    def semantic_search(self, query: str, limit: int = 10) -> List[Tuple[Todo, float]]:
+        from vector_index import VectorIndex
+        todos = {todo.id: todo for todo in self.all()}
+        vectors = VectorIndex()
+        vectors.add_many((todo.id, _search_text(todo)) for todo in todos.values())
+        return [(todos[todo_id], score) for todo_id, score in vectors.search(query, limit)]
+
+    def query(self, q: TodoQuery) -> Tuple[List[Todo], List[str]]:
+        """Run a combined query; column predicates and ordering go to SQLite"""
+        where, params = [], []
+        if q.statuses:
+            where.append(f"status IN ({', '.join('?' * len(q.statuses))})")
+            params.extend(TodoStatus(st).value for st in q.statuses)
+        if q.min_priority is not None:
+            where.append("priority >= ?")
+            params.append(q.min_priority)
+        if q.max_priority is not None:
+            where.append("priority <= ?")
+            params.append(q.max_priority)
+        for column, op, bound in [
+            ("created_at", ">=", q.created_after), ("created_at", "<", q.created_before),
+            ("updated_at", ">=", q.updated_after), ("updated_at", "<", q.updated_before),
+        ]:
+            if bound is not None:
+                where.append(f"{column} {op} ?")
+                params.append(_naive(bound).isoformat())
+        tags = _tag_filters(q)
+        if tags is not None:
+            all_of, any_of, none_of = (sorted(part) for part in tags)
+            if all_of:
+                where.append("id IN (" + " INTERSECT ".join(
+                    ["SELECT todo_id FROM todo_tags WHERE tag = ?"] * len(all_of)) + ")")
+                params.extend(all_of)
+            for op, part in (("IN", any_of), ("NOT IN", none_of)):
+                if part:
+                    where.append(f"id {op} (SELECT todo_id FROM todo_tags WHERE tag IN ({', '.join('?' * len(part))}))")
+                    params.extend(part)
+        sql = "SELECT data FROM todos" + (f" WHERE {' AND '.join(where)}" if where else "")
+
+        if not q.text:
+            # Everything can be pushed down, including ORDER BY and LIMIT
+            column = (q.sort_by or SortField.ID).value
+            direction = "DESC" if q.order == SortOrder.DESC else "ASC"
+            sql += f" ORDER BY {column} {direction}" + (f", id {direction}" if column != "id" else "")
+            if q.limit:
+                sql += f" LIMIT {int(q.limit)}"
+            if q.offset:
+                sql += f"{'' if q.limit else ' LIMIT -1'} OFFSET {int(q.offset)}"
+            return self._rows(sql, params, q.snapshot), [f"sqlite: {sql}"]
+
+        todos = self._rows(sql + " ORDER BY id", params, q.snapshot)
+        plan = [f"sqlite: {sql}: {len(todos)} rows"]
+        rank = None
+        if q.text_mode == SearchMode.FUZZY:
+            ranked = trigram_index.scan(((t.id, _search_text(t)) for t in todos), q.text, q.threshold)
+            rank = {todo_id: i for i, (todo_id, _) in enumerate(ranked)}
+            todos = [todo for todo in todos if todo.id in rank]
+            plan.append(f"fuzzy scan {q.text!r} >= {q.threshold}: {len(todos)} left")
+        text_filter = _text_filter(q)
+        if text_filter:
+            label, predicate = text_filter
+            todos = [todo for todo in todos if predicate(todo)]
+            plan.append(f"filter {label}: {len(todos)} left")
+        todos, step = _order(todos, q, rank, presorted=("id", False))
+        plan.append(step)
+        return todos, plan
+
+    def facets(self, q: TodoQuery) -> Dict[str, int]:
+        """Todos per tag among all the query's matches (its offset and limit ignored)"""
+        whole = q.model_copy(update={"offset": 0, "limit": None, "sort_by": None, "order": SortOrder.ASC})
+        if whole == TodoQuery():
+            conn, lock = self._reader(None)
+            with lock:
+                rows = conn.execute("SELECT tag, COUNT(*) FROM todo_tags GROUP BY tag").fetchall()
+            return dict(sorted(rows, key=lambda row: (-row[1], row[0])))
+        return _count_tags(self.query(whole)[0])
+
+    def close(self):
+        """Checkpoint the write-ahead log into the main file and close"""
+        for held in self.snapshots.values():
+            held[0].close()
+        self.snapshots.clear()
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+
+
+def create_backend(kind: Optional[str] = None, path: Optional[str] = None, tenant_name: Optional[str] = None):
+    """Create a storage backend, defaulting to the TODO_DB_* environment"""
+    kind = kind or os.environ.get("TODO_DB_BACKEND", "memory")
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(path or os.environ.get("TODO_DB_PATH", "todos.db"))
+    if kind == "sharded":
+        from sharding import ShardedBackend
+        shards = int(os.environ.get("TODO_DB_SHARDS", os.cpu_count() or 1))
+        return ShardedBackend(tenant_name or current_tenant(), shards)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+_TENANT_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+_tenant: ContextVar[Optional[str]] = ContextVar("tenant", default=None)
+_settings: Tuple[Optional[str], Optional[str]] = (None, None)
+_backends: Dict[str, object] = {}
+_backends_lock = threading.Lock()
+
+
+def valid_tenant(name: str) -> bool:
+    """Tenant names are 1-64 letters, digits, '-' or '_' (they become file names)"""
+    return _TENANT_NAME.fullmatch(name) is not None
+
+
+def current_tenant() -> str:
+    return _tenant.get() or os.environ.get("TODO_TENANT", "default")
+
+
+@contextmanager
+def tenant(name: Optional[str]):
+    """Route storage calls in this block (and tasks it starts) to a tenant"""
+    if name is not None and not valid_tenant(name):
+        raise ValueError(f"Invalid tenant name: {name!r}")
+    token = _tenant.set(name)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def tenant_path(path: str, name: str) -> str:
+    """SQLite file of a tenant: the configured file itself for "default" """
+    if name == "default":
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext or '.db'}"
+
+
+def configure(kind: Optional[str] = None, path: Optional[str] = None):
+    """Replace the backends of all tenants, closing the previous ones"""
+    global _settings
+    close()
+    _settings = (kind, path)
+    return get_backend()
+
+
+def get_backend():
+    """The current tenant's backend, created from the settings on first use"""
+    name = current_tenant()
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                kind, path = _settings
+                path = tenant_path(path or os.environ.get("TODO_DB_PATH", "todos.db"), name)
+                backend = _backends[name] = create_backend(kind, path, name)
+    return backend
+
+
+def close():
+    """Flush and close every tenant's backend (call on shutdown)"""
+    with _backends_lock:
+        backends = list(_backends.values())
+        _backends.clear()
+    for backend in backends:
+        backend.close()
 
 
 def get_all_todos(status: Optional[TodoStatus] = None) -> List[Todo]:
     """Get all todos, optionally filtered by status"""
-    if status:
-        return [todo for todo in todos_db if todo.status == status]
-    return todos_db.copy()
+    return get_backend().all(status)
 
 
 def get_todo_by_id(todo_id: int) -> Optional[Todo]:
     """Get a specific todo by ID"""
-    for todo in todos_db:
-        if todo.id == todo_id:
-            return todo
-    return None
+    return get_backend().get(todo_id)
 
 
 def create_todo(todo_data: TodoCreate) -> Todo:
     """Create a new todo"""
-    global next_id
-    now = datetime.now()
-    
-    new_todo = Todo(
-        id=next_id,
-        title=todo_data.title,
-        description=todo_data.description,
-        status=todo_data.status,
-        priority=todo_data.priority,
-        created_at=now,
-        updated_at=now
-    )
-    
-    todos_db.append(new_todo)
-    next_id += 1
-    return new_todo
+    return get_backend().create(todo_data)
+
+
+def create_todo_once(todo_data: TodoCreate, idempotency_key: Optional[str] = None, dedupe: bool = False) -> Created:
+    """Create a todo unless the idempotency key was used before or, with dedupe, the same todo exists"""
+    return get_backend().create_once(todo_data, idempotency_key, dedupe)
 
 
 def update_todo(todo_id: int, todo_data: TodoUpdate) -> Optional[Todo]:
     """Update an existing todo"""
-    for i, todo in enumerate(todos_db):
-        if todo.id == todo_id:
-            update_data = todo_data.dict(exclude_unset=True)
-            now = datetime.now()
-            
-            updated_todo = Todo(
-                id=todo.id,
-                title=update_data.get('title', todo.title),
-                description=update_data.get('description', todo.description),
-                status=update_data.get('status', todo.status),
-                priority=update_data.get('priority', todo.priority),
-                created_at=todo.created_at,
-                updated_at=now
-            )
-            
-            todos_db[i] = updated_todo
-            return updated_todo
-    return None
+    return get_backend().update(todo_id, todo_data)
 
 
 def delete_todo(todo_id: int) -> bool:
     """Delete a todo by ID"""
-    for i, todo in enumerate(todos_db):
-        if todo.id == todo_id:
-            del todos_db[i]
-            return True
-    return False
+    return get_backend().delete(todo_id)
 
 
 def search_todos(query: str) -> List[Todo]:
     """Search todos by title or description"""
-    query_lower = query.lower()
-    return [
-        todo for todo in todos_db 
-        if query_lower in todo.title.lower() or 
-           (todo.description and query_lower in todo.description.lower())
-    ]
+    return get_backend().search(query)
+
+
+def fuzzy_search_todos(query: str, threshold: float = DEFAULT_THRESHOLD) -> List[Todo]:
+    """Typo-tolerant search ranked by trigram similarity (0-1), best first"""
+    return get_backend().fuzzy_search(query, threshold)
+
+
+def semantic_search_todos(query: str, limit: int = 10) -> List[Tuple[Todo, float]]:
+    """Todos closest in meaning to the query, as (todo, similarity) pairs"""
+    return get_backend().semantic_search(query, limit)
+
+
+def query_todos(q: TodoQuery) -> List[Todo]:
+    """Todos matching all of the query's filters, ordered and limited"""
+    return get_backend().query(q)[0]
+
+
+def get_next_todos(statuses: Optional[List[TodoStatus]] = None, limit: int = 10) -> List[Todo]:
+    """The next todos to work on: highest priority, then oldest (default: pending)"""
+    return get_backend().next(list(dict.fromkeys(statuses or [TodoStatus.PENDING])), limit)
+
+
+def count_todos() -> Dict[TodoStatus, int]:
+    """Number of todos in each status"""
+    return get_backend().counts()
+
+
+def get_changes_since(cursor: Optional[str] = None, limit: int = 1000) -> TodoChanges:
+    """Changes after a sync cursor (all todos when there is none), oldest first"""
+    since = decode_cursor(cursor) if cursor else None
+    return get_backend().changes_since(since, limit)
+
+
+def pin_snapshot(ttl: float = SNAPSHOT_TTL) -> int:
+    """Pin a snapshot of the todos for consistent paging (TodoQuery.snapshot)"""
+    return get_backend().pin(ttl)
+
+
+def tenants() -> List[str]:
+    """Tenants with a backend open in this process"""
+    with _backends_lock:
+        return list(_backends)
+
+
+def get_overdue_todos(limit: Optional[int] = None) -> List[Todo]:
+    """Todos past their due time and not completed, most overdue first"""
+    return get_backend().overdue(datetime.now(), limit)
+
+
+def tag_facets(q: Optional[TodoQuery] = None) -> Dict[str, int]:
+    """Todos per tag among those matching a query, most used first"""
+    return get_backend().facets(q or TodoQuery())
+
+
+def get_ready_todos(limit: Optional[int] = None) -> List[Todo]:
+    """Open todos whose children and blockers are all completed"""
+    return get_backend().ready(limit)
+
+
+def get_todo_relations(todo_id: int) -> Optional[TodoRelations]:
+    """A todo with its parent, children, blockers and the todos it blocks"""
+    return get_backend().relations(todo_id)
+
+
+def get_todo_timeseries(resolution: str, span: Optional[str] = None) -> TodoTimeseries:
+    """Todos created, completed, deleted and moved per bucket over a range ending now"""
+    first, last = rollups.window(resolution, span, datetime.now())
+    return rollups.series(resolution, first, get_backend().timeseries(resolution, first, last))
+
+
+def get_todo_analytics(group_by: AnalyticsGroupBy = AnalyticsGroupBy.STATUS) -> TodoAnalytics:
+    """Todos, mean age and median time to complete per status, priority or tag"""
+    from columnar import summarize
+    now = datetime.now()
+    return summarize(group_by, get_backend().analytics(group_by, now), now)
+
+
+def explain_query(q: TodoQuery) -> List[str]:
+    """The steps the planner takes to answer a query, with row counts"""
+    return get_backend().query(q)[1]
+
+
+# Async interface
+# ---------------
+# The API and MCP handlers are coroutines, so they use `store` instead of
+# the functions above. Backends that do their work in memory (blocking =
+# False) are called directly; the others run in a worker thread, so file
+# I/O, lock waits and shard round trips never stall the event loop.
+#
+# Reads go through a single-flight layer: identical reads that overlap in
+# time run once and share the result. Every write through the store starts
+# a new generation for its tenant, and reads only join runs of the same
+# generation, so a read that starts after a write always sees it.
+
+
+def _flight_key(args: Tuple) -> Tuple:
+    """Hashable form of a call's arguments"""
+    return tuple(
+        arg.model_dump_json() if isinstance(arg, BaseModel) else tuple(arg) if isinstance(arg, list) else arg
+        for arg in args
+    )
+
+
+# Called after each write through the store with (tenant, todo id, the todo
+# after the write or None once deleted, the todo before it or None when new)
+WriteListener = Callable[[str, int, Optional[Todo], Optional[Todo]], None]
+
+
+class AsyncStore:
+    """Awaitable access to the current tenant's backend"""
+
+    # Listings are handed out in chunks of this many todos, yielding to the
+    # event loop in between
+    CHUNK = 1000
+
+    def __init__(self):
+        self.flights = SingleFlight()
+        self.generations: Dict[str, int] = {}
+        self.listeners: List[WriteListener] = []
+
+    async def _call(self, method: str, *args):
+        backend = get_backend()
+        if not backend.blocking:
+            return getattr(backend, method)(*args)
+        return await asyncio.to_thread(getattr(backend, method), *args)
+
+    async def _read(self, method: str, *args):
+        name = current_tenant()
+        key = (name, self.generations.get(name, 0), method, _flight_key(args))
+        return await self.flights.do(key, lambda: self._call(method, *args), method)
+
+    async def _write(self, method: str, *args):
+        try:
+            return await self._call(method, *args)
+        finally:
+            name = current_tenant()
+            self.generations[name] = self.generations.get(name, 0) + 1
+
+    def listen(self, listener: WriteListener):
+        """Call listener after every create, update and delete made through this store
+
+        Updates and deletes read the todo first while anyone listens, so
+        listeners learn what changed (such as the status it moved from).
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, todo_id: int, todo: Optional[Todo], old: Optional[Todo]):
+        name = current_tenant()
+        for listener in self.listeners:
+            listener(name, todo_id, todo, old)
+
+    def version(self) -> int:
+        """The current tenant's write generation; it changes whenever a write goes through the store"""
+        return self.generations.get(current_tenant(), 0)
+
+    async def _iterate(self, todos: List[Todo]):
+        for start in range(0, len(todos), self.CHUNK):
+            if start:
+                await asyncio.sleep(0)
+            for todo in todos[start:start + self.CHUNK]:
+                yield todo
+
+    async def all(self, status: Optional[TodoStatus] = None) -> List[Todo]:
+        return await self._read("all", status)
+
+    async def iter(self, status: Optional[TodoStatus] = None):
+        """`async for todo in store.iter(...)` over all todos, optionally by status"""
+        async for todo in self._iterate(await self.all(status)):
+            yield todo
+
+    async def get(self, todo_id: int) -> Optional[Todo]:
+        return await self._read("get", todo_id)
+
+    async def create(self, todo_data: TodoCreate) -> Todo:
+        todo = await self._write("create", todo_data)
+        if self.listeners:
+            self._notify(todo.id, todo, None)
+        return todo
+
+    async def create_once(self, todo_data: TodoCreate, idempotency_key: Optional[str] = None,
+                          dedupe: bool = False) -> Created:
+        """Create, or hand back the result of an earlier create with this key or the same todo"""
+        result = await self._write("create_once", todo_data, idempotency_key, dedupe)
+        if self.listeners and not (result.duplicate or result.replayed):
+            self._notify(result.todo.id, result.todo, None)
+        return result
+
+    async def update(self, todo_id: int, todo_data: TodoUpdate) -> Optional[Todo]:
+        old = await self._call("get", todo_id) if self.listeners else None
+        todo = await self._write("update", todo_id, todo_data)
+        if todo is not None and self.listeners:
+            self._notify(todo_id, todo, old)
+        return todo
+
+    async def delete(self, todo_id: int) -> bool:
+        old = await self._call("get", todo_id) if self.listeners else None
+        deleted = await self._write("delete", todo_id)
+        if deleted and self.listeners:
+            self._notify(todo_id, None, old)
+        return deleted
+
+    async def search(self, query: str) -> List[Todo]:
+        return await self._read("search", query)
+
+    async def fuzzy_search(self, query: str, threshold: float = DEFAULT_THRESHOLD) -> List[Todo]:
+        return await self._read("fuzzy_search", query, threshold)
+
+    async def semantic_search(self, query: str, limit: int = 10) -> List[Tuple[Todo, float]]:
+        return await self._read("semantic_search", query, limit)
+
+    async def query(self, q: TodoQuery) -> List[Todo]:
+        return (await self._read("query", q))[0]
+
+    async def iter_query(self, q: TodoQuery):
+        """`async for todo in store.iter_query(q)` over a query's results"""
+        async for todo in self._iterate(await self.query(q)):
+            yield todo
+
+    async def explain(self, q: TodoQuery) -> List[str]:
+        return (await self._read("query", q))[1]
+
+    async def next(self, statuses: Optional[List[TodoStatus]] = None, limit: int = 10) -> List[Todo]:
+        return await self._read("next", list(dict.fromkeys(statuses or [TodoStatus.PENDING])), limit)
+
+    async def counts(self) -> Dict[TodoStatus, int]:
+        return await self._read("counts")
+
+    async def overdue(self, limit: Optional[int] = None) -> List[Todo]:
+        return await self._read("overdue", datetime.now(), limit)
+
+    async def came_due(self, start: datetime, end: datetime) -> List[Todo]:
+        return await self._read("came_due", start, end)
+
+    async def facets(self, q: Optional[TodoQuery] = None) -> Dict[str, int]:
+        return await self._read("facets", q or TodoQuery())
+
+    async def ready(self, limit: Optional[int] = None) -> List[Todo]:
+        return await self._read("ready", limit)
+
+    async def relations(self, todo_id: int) -> Optional[TodoRelations]:
+        return await self._read("relations", todo_id)
+
+    async def timeseries(self, resolution: str, span: Optional[str] = None) -> TodoTimeseries:
+        first, last = rollups.window(resolution, span, datetime.now())
+        return rollups.series(resolution, first, await self._read("timeseries", resolution, first, last))
+
+    async def analytics(self, group_by: AnalyticsGroupBy = AnalyticsGroupBy.STATUS) -> TodoAnalytics:
+        from columnar import summarize
+        now = datetime.now()
+        return summarize(group_by, await self._read("analytics", AnalyticsGroupBy(group_by), now), now)
+
+    async def pin(self, ttl: float = SNAPSHOT_TTL) -> int:
+        return await self._call("pin", ttl)
+
+    async def changes_since(self, cursor: Optional[str] = None, limit: int = 1000) -> TodoChanges:
+        since = decode_cursor(cursor) if cursor else None
+        return await self._read("changes_since", since, limit)
+
+
+store = AsyncStore()
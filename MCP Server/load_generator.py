@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Todo API
+
+Drives a running Todo API server (see start_server.py) with a configurable
+mix of create/read/update/search/stats requests and reports throughput and
+latency percentiles over time.
+
+Two modes are supported:
+  • closed - a fixed number of clients each send a request, wait for the
+             response, then send the next one
+  • open   - requests are issued at a target rate regardless of how fast the
+             server answers; latency is measured from the scheduled send time
+             so a slow server is not hidden by the generator backing off
+
+Examples:
+    python load_generator.py --mode closed --concurrency 32 --duration 30
+    python load_generator.py --mode open --rps 500 --mix create=10,read=60,search=20,stats=10
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+DEFAULT_MIX = {"create": 20, "read": 40, "update": 15, "search": 15, "stats": 10}
+
+SEARCH_TERMS = ["report", "deploy", "review", "fix", "meeting", "docs", "test"]
+STATUSES = ["pending", "in_progress", "completed"]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse a mix such as 'create=20,read=40' into operation weights"""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation '{name}' (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Operation mix must contain at least one positive weight")
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+@dataclass
+class Window:
+    """Latency samples collected during one reporting interval"""
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    by_op: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, op: str, latency: float, ok: bool):
+        self.latencies.append(latency)
+        self.by_op[op] = self.by_op.get(op, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, seconds: float) -> Dict[str, float]:
+        values = sorted(self.latencies)
+        count = len(values)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "throughput": round(count / seconds, 2) if seconds > 0 else 0.0,
+            "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p90_ms": round(percentile(values, 90) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+        }
+
+
+class LoadGenerator:
+    """Issues a weighted mix of Todo API calls and records their latency"""
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], seed: Optional[int] = None):
+        self.client = client
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.rng = random.Random(seed)
+        self.known_ids: List[int] = []
+        self.window = Window()
+        self.total = Window()
+        self.timeline: List[Dict[str, float]] = []
+
+    async def seed(self, count: int):
+        """Create an initial population so reads and updates have targets"""
+        for _ in range(count):
+            await self._create()
+
+    async def _create(self) -> httpx.Response:
+        response = await self.client.post("/todos", json={
+            "title": f"{self.rng.choice(SEARCH_TERMS)} task {self.rng.randint(1, 10**6)}",
+            "description": "Generated by load_generator.py",
+            "priority": self.rng.randint(1, 5),
+        })
+        if response.status_code == 201:
+            self.known_ids.append(response.json()["todo"]["id"])
+        return response
+
+    async def _read(self) -> httpx.Response:
+        if self.known_ids and self.rng.random() < 0.7:
+            return await self.client.get(f"/todos/{self.rng.choice(self.known_ids)}")
+        return await self.client.get("/todos", params={"status": self.rng.choice(STATUSES)})
+
+    async def _update(self) -> httpx.Response:
+        if not self.known_ids:
+            return await self._create()
+        todo_id = self.rng.choice(self.known_ids)
+        return await self.client.patch(f"/todos/{todo_id}/status", json={"status": self.rng.choice(STATUSES)})
+
+    async def _search(self) -> httpx.Response:
+        return await self.client.get("/todos", params={"search": self.rng.choice(SEARCH_TERMS)})
+
+    async def _stats(self) -> httpx.Response:
+        return await self.client.get("/todos/stats/summary")
+
+    async def run_one(self, scheduled: Optional[float] = None):
+        """Send one request; latency counts from `scheduled` when given"""
+        op = self.rng.choices(self.ops, self.weights)[0]
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = await getattr(self, f"_{op}")()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latency = time.perf_counter() - start
+        self.window.record(op, latency, ok)
+        self.total.record(op, latency, ok)
+
+    async def closed_loop(self, concurrency: int, deadline: float):
+        async def client_loop():
+            while time.perf_counter() < deadline:
+                await self.run_one()
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+    async def open_loop(self, rps: float, deadline: float, max_in_flight: int, poisson: bool):
+        in_flight = asyncio.Semaphore(max_in_flight)
+        tasks = set()
+        next_send = time.perf_counter()
+
+        async def fire(scheduled: float):
+            async with in_flight:
+                await self.run_one(scheduled)
+
+        while next_send < deadline:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(fire(next_send))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_send += self.rng.expovariate(rps) if poisson else 1.0 / rps
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def report_windows(self, interval: float, deadline: float, quiet: bool):
+        started = time.perf_counter()
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(min(interval, max(0.0, deadline - time.perf_counter())))
+            window, self.window = self.window, Window()
+            stats = window.summary(interval)
+            stats["t"] = round(time.perf_counter() - started, 1)
+            self.timeline.append(stats)
+            if not quiet:
+                print(f"[{stats['t']:>6}s] {stats['throughput']:>9} req/s  "
+                      f"p50 {stats['p50_ms']:>8} ms  p90 {stats['p90_ms']:>8} ms  "
+                      f"p99 {stats['p99_ms']:>8} ms  errors {stats['errors']}")
+
+
+def sizing_advice(summary: Dict[str, float], server_workers: int, target_rps: Optional[float]) -> Dict[str, float]:
+    """Turn a run summary into worker sizing numbers for uvicorn.run
+
+    Per-worker capacity is only meaningful when the server was saturated, so
+    size from a closed-loop run with enough clients to keep every worker busy.
+    """
+    throughput = summary["throughput"]
+    per_worker = throughput / server_workers if server_workers else throughput
+    # Little's law: requests in flight = arrival rate x time in system
+    in_flight = throughput * summary["mean_ms"] / 1000
+    advice = {
+        "server_workers": server_workers,
+        "throughput_per_worker": round(per_worker, 2),
+        "mean_requests_in_flight": round(in_flight, 2),
+    }
+    if target_rps and per_worker > 0:
+        advice["target_rps"] = target_rps
+        advice["recommended_workers"] = math.ceil(target_rps / per_worker)
+    return advice
+
+
+async def run(args) -> Dict:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight),
+                          max_keepalive_connections=max(args.concurrency, args.max_in_flight))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        generator = LoadGenerator(client, mix, seed=args.seed)
+        await generator.seed(args.seed_todos)
+        generator.total = Window()
+        generator.window = Window()
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        reporter = asyncio.create_task(generator.report_windows(args.interval, deadline, args.quiet))
+        if args.mode == "closed":
+            await generator.closed_loop(args.concurrency, deadline)
+        else:
+            await generator.open_loop(args.rps, deadline, args.max_in_flight, args.poisson)
+        elapsed = time.perf_counter() - started
+        await reporter
+
+    summary = generator.total.summary(elapsed)
+    summary["by_operation"] = generator.total.by_op
+    return {
+        "config": {
+            "url": args.url,
+            "mode": args.mode,
+            "duration": args.duration,
+            "concurrency": args.concurrency if args.mode == "closed" else None,
+            "target_rps": args.rps if args.mode == "open" else None,
+            "mix": mix,
+        },
+        "summary": summary,
+        "timeline": generator.timeline,
+        "sizing": sizing_advice(summary, args.server_workers, args.target_rps),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate load against the Todo API")
+    parser.add_argument("--url", default=BASE_URL, help="Base URL of the running server")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed", help="Closed- or open-loop load")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients in closed-loop mode")
+    parser.add_argument("--rps", type=float, default=200.0, help="Target request rate in open-loop mode")
+    parser.add_argument("--poisson", action="store_true", help="Use Poisson arrivals instead of a fixed rate")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Cap on outstanding requests in open-loop mode")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Operation weights, e.g. create=20,read=40,update=15,search=15,stats=10")
+    parser.add_argument("--seed-todos", type=int, default=100, help="Todos to create before measuring")
+    parser.add_argument("--interval", type=float, default=1.0, help="Reporting interval in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible mixes")
+    parser.add_argument("--server-workers", type=int, default=1, help="Workers the server was started with")
+    parser.add_argument("--target-rps", type=float, default=None, help="Throughput to size workers for")
+    parser.add_argument("--json", dest="json_path", help="Write the full report to this file")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        report = asyncio.run(run(args))
+    except httpx.ConnectError:
+        print(f"❌ Could not connect to {args.url} - is the server running?")
+        return 1
+
+    summary, sizing = report["summary"], report["sizing"]
+    print("-" * 50)
+    print(f"📊 {summary['requests']} requests, {summary['errors']} errors, {summary['throughput']} req/s")
+    print(f"⏱  mean {summary['mean_ms']} ms, p50 {summary['p50_ms']} ms, "
+          f"p90 {summary['p90_ms']} ms, p99 {summary['p99_ms']} ms, max {summary['max_ms']} ms")
+    print(f"⚙️  {sizing['throughput_per_worker']} req/s per worker, "
+          f"{sizing['mean_requests_in_flight']} requests in flight on average")
+    if "recommended_workers" in sizing:
+        print(f"💡 {sizing['recommended_workers']} worker(s) needed for {sizing['target_rps']} req/s")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
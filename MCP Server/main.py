@@ -1,11 +1,35 @@
-from fastapi import FastAPI, HTTPException, Query, Path
-from fastapi.responses import HTMLResponse
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Path, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from datetime import datetime
 from typing import List, Optional
-from models import Todo, TodoCreate, TodoUpdate, TodoResponse, ErrorResponse, TodoStatus, StatusUpdate
-from database import (
-    get_all_todos, get_todo_by_id, create_todo, 
-    update_todo, delete_todo, search_todos
+import database
+from admission import AdmissionControl, Rejected, route_key
+from content_encoding import ResponseCompressor, negotiate
+from overdue import OverdueWatcher
+from models import (
+    Todo, TodoCreate, TodoUpdate, TodoResponse, ErrorResponse, TodoStatus, StatusUpdate,
+    SearchMode, ScoredTodo, TodoQuery, TodoChanges, TodoRelations, TodoTimeseries, RollupBucket, TodoAnalytics,
+    AnalyticsGroupBy, SortField, SortOrder
 )
+# Handlers await the async store so storage work never blocks the event loop
+from database import store
+
+
+# Emits an event whenever an open todo's due time passes
+overdue = OverdueWatcher.from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = asyncio.create_task(overdue.run()) if overdue.enabled else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    # Flush pending writes before the worker exits
+    database.close()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -13,10 +37,94 @@ app = FastAPI(
     description="A simple Todo application built with FastAPI",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 
+# Registered first, so it runs innermost, inside the tenant scope
+compressor = ResponseCompressor.from_env()
+
+# Listings whose compressed bodies are cached until the tenant's next write
+CACHED_PATHS = {"/todos"}
+
+
+@app.middleware("http")
+async def compress_responses(request: Request, call_next):
+    """Compress large responses with the best encoding the client accepts"""
+    encoding = negotiate(request.headers.get("Accept-Encoding", "")) if compressor.enabled else None
+    if encoding is None:
+        return await call_next(request)
+    cache_key = None
+    # Snapshot pages are left out: each one has to reach the handler to renew its lease
+    if (request.method == "GET" and request.url.path in CACHED_PATHS and compressor.cache_entries
+            and "snapshot" not in request.query_params):
+        cache_key = (database.current_tenant(), store.version(), request.url.path, request.url.query, encoding)
+        body = compressor.cached(cache_key)
+        if body is not None:
+            return Response(body, media_type="application/json",
+                            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+    response = await call_next(request)
+    if ("content-encoding" in response.headers
+            or not compressor.wants(response.headers.get("content-type", ""),
+                                    int(response.headers.get("content-length", 0)))):
+        return response
+    body = compressor.compress(b"".join([chunk async for chunk in response.body_iterator]), encoding)
+    if cache_key is not None and response.status_code == 200:
+        compressor.remember(cache_key, body)
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    headers["content-encoding"] = encoding
+    headers["vary"] = "Accept-Encoding"
+    return Response(body, status_code=response.status_code, headers=headers)
+
+
+def invalid_tenant(name: Optional[str]) -> Optional[JSONResponse]:
+    """The 400 response for a malformed X-Tenant header, None when it is absent or valid"""
+    if name is not None and not database.valid_tenant(name):
+        return JSONResponse(status_code=400, content={"detail": f"Invalid tenant name: {name!r}"})
+    return None
+
+
+@app.middleware("http")
+async def tenant_scope(request: Request, call_next):
+    """Serve each request from the partition named in the X-Tenant header"""
+    name = request.headers.get("X-Tenant")
+    refused = invalid_tenant(name)
+    if refused is not None:
+        return refused
+    with database.tenant(name):
+        return await call_next(request)
+
+
+# Registered last, so it runs first: rejected requests cost no other work
+admission = AdmissionControl.from_env()
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Per-client rate limits and a bounded admission queue; 429 when refused
+
+    Clients are told apart by peer address within their tenant. X-Client-Id
+    is only believed when TODO_TRUST_CLIENT_ID says a proxy in front sets
+    it: otherwise a client could take a fresh bucket with every request.
+    """
+    name = request.headers.get("X-Tenant")
+    # Refused before keying, so made-up tenant names cannot mint buckets either
+    refused = invalid_tenant(name)
+    if refused is not None:
+        return refused
+    client = request.client.host if request.client else "unknown"
+    if admission.trust_client_id:
+        client = request.headers.get("X-Client-Id") or client
+    try:
+        async with admission.admit(f"{name or database.current_tenant()}/{client}",
+                                   route_key(request.method, request.url.path)):
+            return await call_next(request)
+    except Rejected as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)},
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Welcome page with API documentation link"""
@@ -53,8 +161,16 @@ async def root():
                 <h3>✨ Features</h3>
                 <ul>
                     <li>Create, read, update, and delete todos</li>
-                    <li>Filter todos by status (pending, in_progress, completed)</li>
-                    <li>Search todos by title or description</li>
+                    <li>Filter todos by status, priority range and time ranges, with sorting</li>
+                    <li>Search todos by title or description, exact or fuzzy</li>
+                    <li>Semantic search that ranks todos by meaning</li>
+                    <li>Tags with AND/OR/NOT filters and per-tag counts</li>
+                    <li>Due dates, with overdue todos and overdue events</li>
+                    <li>Subtasks and blocking todos, with the todos ready to start</li>
+                    <li>Incremental sync of changes since a cursor</li>
+                    <li>Created, completed and status-change counts per minute, hour or day</li>
+                    <li>Age and time-to-complete analytics by status, priority or tag</li>
+                    <li>Separate todo lists per tenant via the X-Tenant header</li>
                     <li>Priority levels (1-5)</li>
                     <li>Automatic timestamps</li>
                     <li>Input validation and error handling</li>
@@ -66,36 +182,184 @@ async def root():
     """
 
 
+def todo_filters(
+    status: Optional[List[TodoStatus]] = Query(None, description="Filter by todo status (repeat to match any of several)"),
+    search: Optional[str] = Query(None, description="Search in title and description"),
+    mode: SearchMode = Query(SearchMode.SUBSTRING, description="Substring match, or typo-tolerant fuzzy match ranked by similarity"),
+    threshold: float = Query(0.5, ge=0, le=1, description="Minimum similarity for fuzzy search (0-1)"),
+    min_priority: Optional[int] = Query(None, ge=1, le=5, description="Lowest priority to include"),
+    max_priority: Optional[int] = Query(None, ge=1, le=5, description="Highest priority to include"),
+    created_after: Optional[datetime] = Query(None, description="Created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Created before this time"),
+    updated_after: Optional[datetime] = Query(None, description="Updated at or after this time"),
+    updated_before: Optional[datetime] = Query(None, description="Updated before this time"),
+    updated_since: Optional[datetime] = Query(None, description="Alias of updated_after"),
+    tag: Optional[List[str]] = Query(None, description="Has this tag (repeat: has all of them)"),
+    any_tag: Optional[List[str]] = Query(None, description="Has at least one of these tags (repeat for several)"),
+    not_tag: Optional[List[str]] = Query(None, description="Has none of these tags (repeat for several)")
+) -> TodoQuery:
+    """The filters shared by the listing and its tag facets"""
+    return TodoQuery(
+        statuses=status,
+        min_priority=min_priority,
+        max_priority=max_priority,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after or updated_since,
+        updated_before=updated_before,
+        text=search,
+        text_mode=mode,
+        threshold=threshold,
+        tags_all=tag,
+        tags_any=any_tag,
+        tags_none=not_tag
+    )
+
+
 @app.get("/todos", response_model=List[Todo])
 async def get_todos(
-    status: Optional[TodoStatus] = Query(None, description="Filter by todo status"),
-    search: Optional[str] = Query(None, description="Search in title and description")
+    response: Response,
+    filters: TodoQuery = Depends(todo_filters),
+    sort: Optional[SortField] = Query(None, description="Sort field (default: id, or similarity for fuzzy search)"),
+    order: SortOrder = Query(SortOrder.ASC, description="Sort direction"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of todos to return"),
+    offset: int = Query(0, ge=0, description="Skip this many todos (for paging)"),
+    snapshot: Optional[str] = Query(None, pattern=r"^(new|\d+)$",
+                                    description="'new' to pin a snapshot for paging, or the X-Snapshot id "
+                                                "returned with the first page")
 ):
-    """Get all todos with optional filtering and search"""
-    if search:
-        todos = search_todos(search)
-        if status:
-            todos = [todo for todo in todos if todo.status == status]
-    else:
-        todos = get_all_todos(status)
-    
-    return todos
+    """Get todos matching all given filters, with optional sorting, paging and a pinned snapshot"""
+    snapshot_id = None
+    if snapshot is not None:
+        snapshot_id = await store.pin() if snapshot == "new" else int(snapshot)
+        response.headers["X-Snapshot"] = str(snapshot_id)
+    q = filters.model_copy(update={
+        "sort_by": sort, "order": order, "limit": limit, "offset": offset, "snapshot": snapshot_id
+    })
+    try:
+        return await store.query(q)
+    except database.SnapshotExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+
+@app.get("/todos/facets", response_model=dict)
+async def get_tag_facets(filters: TodoQuery = Depends(todo_filters)):
+    """How many of the todos matching the filters carry each tag, most used first"""
+    facets = await store.facets(filters)
+    return {"tags": facets}
+
+
+@app.get("/todos/overdue", response_model=List[Todo])
+async def get_overdue(limit: int = Query(100, ge=1, le=10000, description="Maximum number of todos to return")):
+    """Todos past their due time and not completed, most overdue first"""
+    return await store.overdue(limit)
+
+
+@app.get("/todos/overdue/events", response_model=dict)
+async def get_overdue_events(
+    after: int = Query(0, ge=0, description="Sequence number of the last event already seen"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of events to return")
+):
+    """Todos that became overdue, oldest event first; pass the returned cursor as `after`"""
+    events = overdue.events_since(database.current_tenant(), after, limit)
+    return {"events": events, "cursor": events[-1]["seq"] if events else after}
+
+
+@app.get("/todos/ready", response_model=List[Todo])
+async def get_ready(limit: int = Query(100, ge=1, le=10000, description="Maximum number of todos to return")):
+    """Todos not completed whose children and blockers all are: highest priority, then oldest first"""
+    return await store.ready(limit)
+
+
+@app.get("/todos/analytics", response_model=TodoAnalytics)
+async def get_analytics(
+    group_by: AnalyticsGroupBy = Query(AnalyticsGroupBy.STATUS, description="Group by status, priority or tag, or none")
+):
+    """Todos, completed todos, mean age and median time to complete per group"""
+    return await store.analytics(group_by)
+
+
+@app.get("/todos/semantic", response_model=List[ScoredTodo])
+async def semantic_search(
+    q: str = Query(..., min_length=1, description="Natural-language query"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results")
+):
+    """Rank todos by similarity in meaning to the query"""
+    return [
+        ScoredTodo(**todo.model_dump(), score=round(score, 4))
+        for todo, score in await store.semantic_search(q, limit)
+    ]
+
+
+@app.get("/todos/next", response_model=List[Todo])
+async def get_next(
+    status: Optional[List[TodoStatus]] = Query(None, description="Statuses to draw from (default: pending; repeat for several)"),
+    limit: int = Query(10, ge=1, le=100, description="Number of todos to return")
+):
+    """The next todos to work on: highest priority first, oldest first within a priority"""
+    return await store.next(status, limit)
+
+
+@app.get("/todos/changes", response_model=TodoChanges)
+async def get_changes(
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page; omit for a full initial sync"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of changes to return")
+):
+    """Todos changed and deleted since a cursor, for incremental sync"""
+    try:
+        return await store.changes_since(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/todos/{todo_id}", response_model=Todo)
 async def get_todo(todo_id: int = Path(..., description="Todo ID")):
     """Get a specific todo by ID"""
-    todo = get_todo_by_id(todo_id)
+    todo = await store.get(todo_id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     return todo
 
 
+@app.get("/todos/{todo_id}/graph", response_model=TodoRelations)
+async def get_todo_graph(todo_id: int = Path(..., description="Todo ID")):
+    """A todo with its parent, children, the todos blocking it and the todos it blocks"""
+    relations = await store.relations(todo_id)
+    if relations is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return relations
+
+
 @app.post("/todos", response_model=TodoResponse, status_code=201)
-async def create_new_todo(todo_data: TodoCreate):
-    """Create a new todo"""
-    todo = create_todo(todo_data)
-    return TodoResponse(message="Todo created successfully", todo=todo)
+async def create_new_todo(
+    todo_data: TodoCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255,
+                                            description="Repeat it on retries to create the todo only once"),
+    dedupe: bool = Query(False, description="Return an existing todo with the same title and description "
+                                            "(ignoring case and whitespace) instead of creating one")
+):
+    """Create a new todo
+
+    A retry with the same Idempotency-Key gets the first request's response
+    back, marked with Idempotent-Replayed: true. With dedupe, a duplicate
+    of an existing todo answers 200 with that todo instead of 201.
+    """
+    try:
+        if idempotency_key is None and not dedupe:
+            return TodoResponse(message="Todo created successfully", todo=await store.create(todo_data))
+        result = await store.create_once(todo_data, idempotency_key, dedupe)
+    except ValueError as e:
+        # A parent or blocker that does not exist, or a dependency cycle
+        raise HTTPException(status_code=400, detail=str(e))
+    except database.IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if result.replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    if result.duplicate:
+        response.status_code = 200
+        return TodoResponse(message="A todo with the same title and description already exists", todo=result.todo)
+    return TodoResponse(message="Todo created successfully", todo=result.todo)
 
 
 @app.put("/todos/{todo_id}", response_model=TodoResponse)
@@ -107,7 +371,10 @@ async def update_existing_todo(
     if not todo_data:
         raise HTTPException(status_code=400, detail="Update data is required")
     
-    todo = update_todo(todo_id, todo_data)
+    try:
+        todo = await store.update(todo_id, todo_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
@@ -121,7 +388,7 @@ async def update_todo_status(
 ):
     """Update only the status of a todo"""
     todo_data = TodoUpdate(status=status_data.status)
-    todo = update_todo(todo_id, todo_data)
+    todo = await store.update(todo_id, todo_data)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
@@ -131,7 +398,7 @@ async def update_todo_status(
 @app.delete("/todos/{todo_id}", response_model=dict)
 async def delete_existing_todo(todo_id: int = Path(..., description="Todo ID")):
     """Delete a todo"""
-    if not delete_todo(todo_id):
+    if not await store.delete(todo_id):
         raise HTTPException(status_code=404, detail="Todo not found")
     
     return {"message": "Todo deleted successfully"}
@@ -140,11 +407,11 @@ async def delete_existing_todo(todo_id: int = Path(..., description="Todo ID")):
 @app.get("/todos/stats/summary", response_model=dict)
 async def get_todo_stats():
     """Get statistics about todos"""
-    all_todos = get_all_todos()
-    total = len(all_todos)
-    pending = len([t for t in all_todos if t.status == TodoStatus.PENDING])
-    in_progress = len([t for t in all_todos if t.status == TodoStatus.IN_PROGRESS])
-    completed = len([t for t in all_todos if t.status == TodoStatus.COMPLETED])
+    counts = await store.counts()
+    total = sum(counts.values())
+    pending = counts[TodoStatus.PENDING]
+    in_progress = counts[TodoStatus.IN_PROGRESS]
+    completed = counts[TodoStatus.COMPLETED]
     
     return {
         "total_todos": total,
@@ -155,15 +422,47 @@ async def get_todo_stats():
     }
 
 
+@app.get("/todos/stats/admission", response_model=dict)
+async def get_admission_stats():
+    """Requests admitted, rate limited and shed, and the current queue"""
+    return admission.stats()
+
+
+@app.get("/todos/stats/compression", response_model=dict)
+async def get_compression_stats():
+    """Responses compressed, bytes before and after, and precompressed cache hits"""
+    return compressor.stats()
+
+
+@app.get("/todos/stats/timeseries", response_model=TodoTimeseries)
+async def get_todo_timeseries(
+    bucket: RollupBucket = Query(RollupBucket.HOUR, description="Bucket size"),
+    span: Optional[str] = Query(None, alias="range",
+                                description="How far back, like 90m, 24h, 7d or 4w (default: 60m, 24h or 30d by bucket)")
+):
+    """Todos created, completed, deleted and moved between statuses per bucket, from running counters"""
+    try:
+        return await store.timeseries(bucket.value, span)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/todos/stats/coalescing", response_model=dict)
+async def get_coalescing_stats():
+    """How many identical concurrent reads were merged into one execution"""
+    return store.flights.stats()
+
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return {"detail": "Resource not found"}
+    return JSONResponse(status_code=404, content={"detail": "Resource not found"})
 
 
 @app.exception_handler(422)
 async def validation_error_handler(request, exc):
-    return {"detail": "Validation error", "errors": exc.errors()}
+    # Raised by handlers (request body errors have FastAPI's own handler)
+    return JSONResponse(status_code=422, content={"detail": exc.detail})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+"""
+Streamable HTTP transport: one long-lived MCP server shared by many clients
+
+Over stdio every client session starts a server process of its own, which
+pays Python and import start-up and gets its own, empty in-memory store.
+Over HTTP one process serves every session: clients POST JSON-RPC
+messages to /mcp and read the replies, and any server notifications, as
+SSE streams. A new session then costs one initialize round trip, and all
+sessions share the store, its indexes, the rendered-text cache and the
+rate limits.
+
+Sessions are tracked by the MCP SDK's session manager through the
+Mcp-Session-Id header. At most `max_sessions` are open at once (the next
+one gets a 503 until one ends), and a session without requests for
+`session_timeout` seconds is closed. With `json_response` a reply comes
+back as a plain JSON body instead of a one-event SSE stream, which takes
+about a fifth off a tool call; notifications then only reach clients
+through the session's GET stream. Each session's tool calls wait in a
+queue of their own (admission.SessionLimits) before the shared admission
+queue, so one busy client cannot starve the others.
+
+    python mcp_server.py --transport http --port 8001
+"""
+import contextlib
+from typing import Optional
+
+from mcp.server import Server
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+PATH = "/mcp"
+
+
+def session_manager(server: Server, max_sessions: Optional[int] = 1000, session_timeout: Optional[float] = 1800,
+                    json_response: bool = False) -> StreamableHTTPSessionManager:
+    return StreamableHTTPSessionManager(server, json_response=json_response, max_sessions=max_sessions,
+                                        session_idle_timeout=session_timeout)
+
+
+def build_app(server: Server, max_sessions: Optional[int] = 1000, session_timeout: Optional[float] = 1800,
+              json_response: bool = False):
+    """ASGI app serving the MCP server at /mcp; sessions live while the app runs (its lifespan)"""
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    manager = session_manager(server, max_sessions, session_timeout, json_response)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with manager.run():
+            yield
+
+    return Starlette(routes=[Route(PATH, endpoint=manager.asgi_app)], lifespan=lifespan)
+
+
+async def serve(server: Server, host: str = "127.0.0.1", port: int = 8001, **options):
+    """Serve until interrupted; options go to build_app"""
+    import uvicorn
+
+    config = uvicorn.Config(build_app(server, **options), host=host, port=port, log_level="warning")
+    print(f"🚀 Todo MCP server listening on http://{host}:{port}{PATH}")
+    await uvicorn.Server(config).serve()
@@ -4,40 +4,83 @@ MCP Server for Todo API
 Provides tools to interact with the FastAPI Todo application
 """
 
+import argparse
 import asyncio
-import json
+from contextlib import nullcontext
 from typing import Any, Dict, List, Optional
-from datetime import datetime
 
-# MCP imports
+# Only what the initialize handshake needs is imported up front. The Todo
+# models, the storage layer and its backends load on the first tool call,
+# which keeps cold start short for clients that spawn a server per session
+# (see benchmarks/bench_mcp_startup.py).
 from mcp.server import Server
-from mcp.server.models import InitializationOptions
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.stdio import stdio_server
+from mcp.shared.exceptions import McpError
 from mcp.types import (
-    CallToolRequest,
+    INVALID_PARAMS,
     CallToolResult,
-    ListToolsRequest,
+    ErrorData,
     ListToolsResult,
+    Resource,
+    ResourceTemplate,
+    SubscribeRequest,
     Tool,
     TextContent,
-    ImageContent,
-    EmbeddedResource,
 )
 
-# Import our Todo API components
-from models import Todo, TodoCreate, TodoUpdate, TodoStatus
-from database import (
-    get_all_todos, get_todo_by_id, create_todo, 
-    update_todo, delete_todo, search_todos
-)
+from admission import AdmissionControl, Rejected, SessionLimits
+from todo_resources import STATUSES, Subscriptions, TodoResource, parse
+from todo_text import TodoText
+
+# MCP error code for a resource that does not exist
+RESOURCE_NOT_FOUND = -32002
+
+
+class TodoServer(Server):
+    """Server that advertises resources/subscribe, which the SDK's capabilities always leave off"""
+
+    def get_capabilities(self, notification_options, experimental_capabilities):
+        capabilities = super().get_capabilities(notification_options, experimental_capabilities)
+        if capabilities.resources is not None and SubscribeRequest in self.request_handlers:
+            capabilities.resources.subscribe = True
+        return capabilities
+
 
 # Create MCP server instance
-server = Server("todo-api-mcp")
+server = TodoServer("todo-api-mcp", version="1.0.0")
+
+# Rate limits per tenant and tool, and a bounded queue of running calls
+admission = AdmissionControl.from_env()
+# ... and a queue per client session, which matters when many share one server over HTTP
+session_limits = SessionLimits.from_env()
+
+# Rendered text of each todo, reused until the todo changes
+rendered = TodoText()
+
+# Resources each session subscribed to, notified from the store's writes
+subscriptions = Subscriptions()
+
+TENANT_PROPERTY = {
+    "type": "string",
+    "pattern": "^[A-Za-z0-9_-]{1,64}$",
+    "description": "Tenant (namespace) whose todos to use (optional, default: TODO_TENANT or 'default')"
+}
+
+
+def _duration(hours: float) -> str:
+    """Hours as the largest unit that keeps the number at 1 or more"""
+    if hours >= 48:
+        return f"{hours / 24:.1f} days"
+    if hours >= 1:
+        return f"{hours:.1f} hours"
+    return f"{hours * 60:.0f} minutes"
+
 
 @server.list_tools()
 async def handle_list_tools() -> ListToolsResult:
     """List all available MCP tools for Todo operations"""
-    return ListToolsResult(
+    result = ListToolsResult(
         tools=[
             Tool(
                 name="list_todos",
@@ -53,6 +96,31 @@ async def handle_list_tools() -> ListToolsResult:
                         "search": {
                             "type": "string",
                             "description": "Search todos by title or description (optional)"
+                        },
+                        "updated_since": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "Only todos updated at or after this ISO 8601 time (optional)"
+                        },
+                        "created_before": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "Only todos created before this ISO 8601 time (optional)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Page size (optional, default: all)"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Todos to skip, for the next page (optional)"
+                        },
+                        "snapshot": {
+                            "type": ["integer", "string"],
+                            "description": "'new' to pin a snapshot on the first page, then the snapshot id it "
+                                           "returns, so every page shows the same todos (optional)"
                         }
                     }
                 }
@@ -95,6 +163,37 @@ async def handle_list_tools() -> ListToolsResult:
                             "type": "string",
                             "enum": ["pending", "in_progress", "completed"],
                             "description": "Todo status (optional, default: pending)"
+                        },
+                        "tags": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Labels, case-insensitive (optional, max 20)"
+                        },
+                        "due_at": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "When the todo is due, ISO 8601 (optional)"
+                        },
+                        "parent_id": {
+                            "type": "integer",
+                            "description": "ID of the todo this one is part of (optional)"
+                        },
+                        "blocked_by": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "IDs of todos that must be completed first (optional)"
+                        },
+                        "idempotency_key": {
+                            "type": "string",
+                            "minLength": 1,
+                            "maxLength": 255,
+                            "description": "Any unique string; a retry with the same key returns the first "
+                                           "call's result instead of creating another todo (optional)"
+                        },
+                        "dedupe": {
+                            "type": "boolean",
+                            "description": "Report an existing todo with the same title and description "
+                                           "(ignoring case and whitespace) instead of creating one (optional)"
                         }
                     },
                     "required": ["title"]
@@ -128,6 +227,25 @@ async def handle_list_tools() -> ListToolsResult:
                             "type": "string",
                             "enum": ["pending", "in_progress", "completed"],
                             "description": "New status (optional)"
+                        },
+                        "tags": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Replace the todo's tags (optional; [] removes them all)"
+                        },
+                        "due_at": {
+                            "type": ["string", "null"],
+                            "format": "date-time",
+                            "description": "New due time, ISO 8601 (optional; null removes it)"
+                        },
+                        "parent_id": {
+                            "type": ["integer", "null"],
+                            "description": "New parent todo ID (optional; null detaches it)"
+                        },
+                        "blocked_by": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "Replace the IDs of todos blocking this one (optional; [] removes them)"
                         }
                     },
                     "required": ["todo_id"]
@@ -175,11 +293,263 @@ async def handle_list_tools() -> ListToolsResult:
                         "query": {
                             "type": "string",
                             "description": "Search query"
+                        },
+                        "mode": {
+                            "type": "string",
+                            "enum": ["substring", "fuzzy"],
+                            "description": "substring (default) for exact matches, fuzzy to tolerate typos and word variants, ranked by similarity"
+                        },
+                        "threshold": {
+                            "type": "number",
+                            "minimum": 0,
+                            "maximum": 1,
+                            "description": "Minimum similarity for fuzzy mode (optional, default: 0.5)"
                         }
                     },
                     "required": ["query"]
                 }
             ),
+            Tool(
+                name="semantic_search_todos",
+                description="Find todos by meaning rather than exact words, ranked by similarity",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Natural-language description of the todos to find"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 100,
+                            "description": "Maximum number of results (optional, default: 10)"
+                        }
+                    },
+                    "required": ["query"]
+                }
+            ),
+            Tool(
+                name="query_todos",
+                description="Find todos matching several filters at once (statuses, priority range, time ranges, text), sorted and limited",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "statuses": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": ["pending", "in_progress", "completed"]},
+                            "description": "Match any of these statuses (optional)"
+                        },
+                        "min_priority": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 5,
+                            "description": "Lowest priority to include (optional)"
+                        },
+                        "max_priority": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 5,
+                            "description": "Highest priority to include (optional)"
+                        },
+                        "created_after": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "Created at or after this ISO 8601 time (optional)"
+                        },
+                        "created_before": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "Created before this ISO 8601 time (optional)"
+                        },
+                        "updated_after": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "Updated at or after this ISO 8601 time (optional)"
+                        },
+                        "updated_before": {
+                            "type": "string",
+                            "format": "date-time",
+                            "description": "Updated before this ISO 8601 time (optional)"
+                        },
+                        "text": {
+                            "type": "string",
+                            "description": "Text to match in title or description (optional)"
+                        },
+                        "text_mode": {
+                            "type": "string",
+                            "enum": ["substring", "fuzzy"],
+                            "description": "How to match text (optional, default: substring)"
+                        },
+                        "tags_all": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Has every one of these tags (optional)"
+                        },
+                        "tags_any": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Has at least one of these tags (optional)"
+                        },
+                        "tags_none": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Has none of these tags (optional)"
+                        },
+                        "sort_by": {
+                            "type": "string",
+                            "enum": ["id", "priority", "created_at", "updated_at"],
+                            "description": "Sort field (optional, default: id, or similarity for fuzzy text)"
+                        },
+                        "order": {
+                            "type": "string",
+                            "enum": ["asc", "desc"],
+                            "description": "Sort direction (optional, default: asc)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Maximum number of todos to return (optional)"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="filter_by_tags",
+                description="Find todos by tag: with all of some tags, any of others and none of a third set, "
+                            "plus how many of the matches carry each tag",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "all": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Has every one of these tags (optional)"
+                        },
+                        "any": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Has at least one of these tags (optional)"
+                        },
+                        "none": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Has none of these tags (optional)"
+                        },
+                        "status": {
+                            "type": "string",
+                            "enum": ["pending", "in_progress", "completed"],
+                            "description": "Only todos with this status (optional)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Maximum number of todos to list (optional, default: 50)"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="overdue_todos",
+                description="Get the todos past their due time that are not completed, most overdue first",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 1000,
+                            "description": "Number of todos to return (optional, default: 20)"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="ready_todos",
+                description="Get the todos ready to start: not completed, with every child and blocker completed. "
+                            "Highest priority first, oldest first within a priority",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 1000,
+                            "description": "Number of todos to return (optional, default: 20)"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="todo_graph",
+                description="Show a todo's relations: its parent, children, the todos blocking it and the todos "
+                            "it blocks, and whether it is ready to start",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "todo_id": {
+                            "type": "integer",
+                            "description": "The ID of the todo"
+                        }
+                    },
+                    "required": ["todo_id"]
+                }
+            ),
+            Tool(
+                name="next_todos",
+                description="Get the next todos to work on: highest priority first, oldest first within a priority",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "statuses": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": ["pending", "in_progress", "completed"]},
+                            "description": "Statuses to draw from (optional, default: pending)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 100,
+                            "description": "Number of todos to return (optional, default: 10)"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="get_todo_trends",
+                description="Get how many todos were created, completed, deleted and moved between statuses per "
+                            "minute, hour or day over a recent range, e.g. completions per day this week",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "bucket": {
+                            "type": "string",
+                            "enum": ["minute", "hour", "day"],
+                            "description": "Bucket size (optional, default: day)"
+                        },
+                        "range": {
+                            "type": "string",
+                            "description": "How far back, a number and a unit: 90m, 24h, 7d, 4w "
+                                           "(optional, default: 60m, 24h or 30d by bucket)"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="todo_analytics",
+                description="Get how many todos there are, how many are completed, their mean age and the median "
+                            "time to complete them, per status, priority or tag",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "group_by": {
+                            "type": "string",
+                            "enum": ["status", "priority", "tag", "none"],
+                            "description": "What to group by (optional, default: status)"
+                        }
+                    }
+                }
+            ),
             Tool(
                 name="get_todo_stats",
                 description="Get statistics about todos",
@@ -190,53 +560,110 @@ async def handle_list_tools() -> ListToolsResult:
             )
         ]
     )
+    # Every tool can be pointed at a tenant's separate todo list
+    for tool in result.tools:
+        tool.inputSchema.setdefault("properties", {})["tenant"] = TENANT_PROPERTY
+    return result
+
+
+# Input schema validator of each tool, built once. The SDK's own input check
+# (jsonschema.validate) checks the schema itself again on every call, which
+# cost more than most tools do.
+_validators: Dict[str, Any] = {}
+
+
+async def _input_error(name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """Why the arguments do not fit the tool's input schema, or None"""
+    from jsonschema.exceptions import best_match
+    from jsonschema.validators import validator_for
+
+    if not _validators:
+        for tool in (await handle_list_tools()).tools:
+            validator = validator_for(tool.inputSchema)
+            validator.check_schema(tool.inputSchema)
+            _validators[tool.name] = validator(tool.inputSchema)
+    validator = _validators.get(name)
+    error = best_match(validator.iter_errors(arguments)) if validator is not None else None
+    return error.message if error is not None else None
+
 
-@server.call_tool()
+@server.call_tool(validate_input=False)
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
-    """Handle tool calls for Todo operations"""
-    
+    """Handle tool calls for Todo operations, in the caller's tenant"""
+    import database
+
+    tenant = arguments.pop("tenant", None)
+    if tenant is not None and not database.valid_tenant(tenant):
+        return CallToolResult(
+            content=[TextContent(
+                type="text",
+                text=f"Error executing tool '{name}': invalid tenant name {tenant!r}"
+            )],
+            isError=True
+        )
+    error = await _input_error(name, arguments)
+    if error is not None:
+        return CallToolResult(content=[TextContent(type="text", text=f"Input validation error: {error}")], isError=True)
+    try:
+        session = _current_session()
+        async with session_limits.slot(session) if session is not None else nullcontext():
+            async with admission.admit(f"{tenant or 'default'}/mcp", name):
+                with database.tenant(tenant):
+                    return await _call_tool(name, arguments)
+    except Rejected as e:
+        return CallToolResult(
+            content=[TextContent(
+                type="text",
+                text=f"Error executing tool '{name}': {e}"
+            )],
+            isError=True
+        )
+
+
+def _current_session():
+    """Client session of the request being handled, None outside of one (direct calls)"""
+    try:
+        return server.request_context.session
+    except LookupError:
+        return None
+
+
+async def _call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
+    """Run one tool call against the current tenant's todos"""
+    from models import TodoCreate, TodoUpdate, TodoQuery, TodoStatus
+    from database import current_tenant, store
+
+    tenant = current_tenant()
+
     try:
         if name == "list_todos":
             status = arguments.get("status")
-            search = arguments.get("search")
-            
-            if search:
-                todos = search_todos(search)
-                if status:
-                    todos = [todo for todo in todos if todo.status == status]
-            else:
-                todos = get_all_todos(status)
-            
-            result = {
-                "todos": [
-                    {
-                        "id": todo.id,
-                        "title": todo.title,
-                        "description": todo.description,
-                        "status": todo.status,
-                        "priority": todo.priority,
-                        "created_at": todo.created_at.isoformat(),
-                        "updated_at": todo.updated_at.isoformat()
-                    }
-                    for todo in todos
-                ],
-                "count": len(todos)
-            }
-            
+            snapshot = arguments.get("snapshot")
+            if snapshot == "new":
+                snapshot = await store.pin()
+            todos = [todo async for todo in store.iter_query(TodoQuery(
+                statuses=[status] if status else None,
+                text=arguments.get("search"),
+                updated_after=arguments.get("updated_since"),
+                created_before=arguments.get("created_before"),
+                limit=arguments.get("limit"),
+                offset=arguments.get("offset", 0),
+                snapshot=snapshot
+            ))]
+
+            text = f"Found {len(todos)} todos:\n\n" + "\n".join(rendered.lines(tenant, todos, "list"))
+            if snapshot is not None:
+                text += f"\n\nSnapshot: {snapshot} (pass it with the next offset to keep paging the same todos)"
             return CallToolResult(
                 content=[TextContent(
                     type="text",
-                    text=f"Found {len(todos)} todos:\n\n" + 
-                         "\n".join([
-                             f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Priority: {todo.priority})"
-                             for todo in todos
-                         ])
+                    text=text
                 )]
             )
         
         elif name == "get_todo":
             todo_id = arguments["todo_id"]
-            todo = get_todo_by_id(todo_id)
+            todo = await store.get(todo_id)
             
             if not todo:
                 return CallToolResult(
@@ -249,14 +676,7 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
             return CallToolResult(
                 content=[TextContent(
                     type="text",
-                    text=f"Todo Details:\n"
-                         f"• ID: {todo.id}\n"
-                         f"• Title: {todo.title}\n"
-                         f"• Description: {todo.description or 'No description'}\n"
-                         f"• Status: {todo.status}\n"
-                         f"• Priority: {todo.priority}\n"
-                         f"• Created: {todo.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                         f"• Updated: {todo.updated_at.strftime('%Y-%m-%d %H:%M:%S')}"
+                    text="Todo Details:\n" + rendered.line(tenant, todo, "detail")
                 )]
             )
         
@@ -265,32 +685,46 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
                 title=arguments["title"],
                 description=arguments.get("description"),
                 priority=arguments.get("priority", 1),
-                status=arguments.get("status", "pending")
+                status=arguments.get("status", "pending"),
+                tags=arguments.get("tags", []),
+                due_at=arguments.get("due_at"),
+                parent_id=arguments.get("parent_id"),
+                blocked_by=arguments.get("blocked_by", [])
             )
             
-            todo = create_todo(todo_data)
+            idempotency_key, dedupe = arguments.get("idempotency_key"), arguments.get("dedupe", False)
+            if idempotency_key is None and not dedupe:
+                todo, duplicate = await store.create(todo_data), False
+            else:
+                todo, duplicate, _ = await store.create_once(todo_data, idempotency_key, dedupe)
             
             return CallToolResult(
                 content=[TextContent(
                     type="text",
-                    text=f"✅ Todo created successfully!\n"
+                    text=("⚠️ A todo with the same title and description already exists, nothing was created:\n"
+                          if duplicate else "✅ Todo created successfully!\n") +
                          f"• ID: {todo.id}\n"
                          f"• Title: {todo.title}\n"
                          f"• Status: {todo.status}\n"
                          f"• Priority: {todo.priority}"
+                         + (f"\n• Tags: {', '.join(todo.tags)}" if todo.tags else "")
+                         + (f"\n• Due: {todo.due_at.strftime('%Y-%m-%d %H:%M:%S')}" if todo.due_at else "")
+                         + (f"\n• Parent: {todo.parent_id}" if todo.parent_id else "")
+                         + (f"\n• Blocked by: {', '.join(map(str, todo.blocked_by))}" if todo.blocked_by else "")
                 )]
             )
         
         elif name == "update_todo":
             todo_id = arguments["todo_id"]
-            update_data = TodoUpdate(
-                title=arguments.get("title"),
-                description=arguments.get("description"),
-                priority=arguments.get("priority"),
-                status=arguments.get("status")
-            )
+            # Only the fields given are changed; the others keep their values
+            update_data = TodoUpdate(**{
+                field: arguments[field]
+                for field in ("title", "description", "priority", "status", "tags", "due_at", "parent_id", "blocked_by")
+                if field in arguments
+            })
             
-            todo = update_todo(todo_id, update_data)
+            todo = await store.update(todo_id, update_data)
+            rendered.forget(tenant, todo_id)
             
             if not todo:
                 return CallToolResult(
@@ -308,6 +742,10 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
                          f"• Title: {todo.title}\n"
                          f"• Status: {todo.status}\n"
                          f"• Priority: {todo.priority}"
+                         + (f"\n• Tags: {', '.join(todo.tags)}" if todo.tags else "")
+                         + (f"\n• Due: {todo.due_at.strftime('%Y-%m-%d %H:%M:%S')}" if todo.due_at else "")
+                         + (f"\n• Parent: {todo.parent_id}" if todo.parent_id else "")
+                         + (f"\n• Blocked by: {', '.join(map(str, todo.blocked_by))}" if todo.blocked_by else "")
                 )]
             )
         
@@ -316,7 +754,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
             status = arguments["status"]
             
             update_data = TodoUpdate(status=status)
-            todo = update_todo(todo_id, update_data)
+            todo = await store.update(todo_id, update_data)
+            rendered.forget(tenant, todo_id)
             
             if not todo:
                 return CallToolResult(
@@ -338,7 +777,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
         
         elif name == "delete_todo":
             todo_id = arguments["todo_id"]
-            success = delete_todo(todo_id)
+            success = await store.delete(todo_id)
+            rendered.forget(tenant, todo_id)
             
             if not success:
                 return CallToolResult(
@@ -357,25 +797,194 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
         
         elif name == "search_todos":
             query = arguments["query"]
-            todos = search_todos(query)
+            if arguments.get("mode") == "fuzzy":
+                todos = await store.fuzzy_search(query, arguments.get("threshold", 0.5))
+            else:
+                todos = await store.search(query)
             
             return CallToolResult(
                 content=[TextContent(
                     type="text",
                     text=f"Search results for '{query}' ({len(todos)} found):\n\n" +
+                         "\n".join(rendered.lines(tenant, todos, "search")) if todos else f"No todos found matching '{query}'"
+                )]
+            )
+        
+        elif name == "semantic_search_todos":
+            query = arguments["query"]
+            results = await store.semantic_search(query, arguments.get("limit", 10))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"Todos related to '{query}' ({len(results)} found):\n\n" +
                          "\n".join([
-                             f"• {todo.title} (ID: {todo.id}, Status: {todo.status})"
-                             for todo in todos
-                         ]) if todos else f"No todos found matching '{query}'"
+                             f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Score: {score:.2f})"
+                             for todo, score in results
+                         ]) if results else f"No todos related to '{query}'"
+                )]
+            )
+        
+        elif name == "query_todos":
+            todos = await store.query(TodoQuery(**arguments))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"Found {len(todos)} todos:\n\n" + "\n".join(rendered.lines(tenant, todos, "query"))
                 )]
             )
         
+        elif name == "filter_by_tags":
+            status = arguments.get("status")
+            q = TodoQuery(
+                tags_all=arguments.get("all"),
+                tags_any=arguments.get("any"),
+                tags_none=arguments.get("none"),
+                statuses=[status] if status else None
+            )
+            # Facets count every match; the listing stops at the limit
+            facets = await store.facets(q)
+            todos = await store.query(q.model_copy(update={"limit": arguments.get("limit", 50)}))
+            if not todos:
+                text = "No todos have those tags"
+            else:
+                text = f"Showing {len(todos)} tagged todos:\n\n" + "\n".join(rendered.lines(tenant, todos, "tagged"))
+            if facets:
+                text += "\n\nTags among all matches: " + ", ".join(
+                    f"{tag} ({count})" for tag, count in list(facets.items())[:20])
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=text
+                )]
+            )
+
+        elif name == "overdue_todos":
+            todos = await store.overdue(arguments.get("limit", 20))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"{len(todos)} overdue todos, most overdue first:\n\n" +
+                         "\n".join(rendered.lines(tenant, todos, "due")) if todos else "No todos are overdue"
+                )]
+            )
+
+        elif name == "ready_todos":
+            todos = await store.ready(arguments.get("limit", 20))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"{len(todos)} todos ready to start:\n\n" +
+                         "\n".join(rendered.lines(tenant, todos, "list")) if todos else "No todos are ready to start"
+                )]
+            )
+
+        elif name == "todo_graph":
+            todo_id = arguments["todo_id"]
+            relations = await store.relations(todo_id)
+
+            if relations is None:
+                return CallToolResult(
+                    content=[TextContent(
+                        type="text",
+                        text=f"Todo with ID {todo_id} not found"
+                    )]
+                )
+
+            todo = relations.todo
+            if relations.ready:
+                readiness = "yes"
+            elif todo.status == TodoStatus.COMPLETED:
+                readiness = "no, it is completed"
+            else:
+                readiness = f"no, waiting on {relations.waiting_on} todos"
+            text = f"Relations of {todo.title} (ID: {todo.id}, Status: {todo.status}):\n• Ready to start: {readiness}"
+            for label, todos in [("Parent", [relations.parent] if relations.parent else []),
+                                 ("Children", relations.children), ("Blocked by", relations.blocked_by),
+                                 ("Blocks", relations.blocks)]:
+                if todos:
+                    text += f"\n\n{label}:\n" + "\n".join(rendered.lines(tenant, todos, "list"))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=text
+                )]
+            )
+
+        elif name == "next_todos":
+            todos = await store.next(arguments.get("statuses"), arguments.get("limit", 10))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"Next {len(todos)} todos to work on:\n\n" +
+                         "\n".join([
+                             f"{i}. {line}" for i, line in enumerate(rendered.lines(tenant, todos, "next"), 1)
+                         ]) if todos else "Nothing left to work on"
+                )]
+            )
+
+        elif name == "get_todo_trends":
+            bucket = arguments.get("bucket", "day")
+            series = await store.timeseries(bucket, arguments.get("range"))
+            label = {"minute": "%Y-%m-%d %H:%M", "hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}[bucket]
+            totals = series.totals
+
+            lines = []
+            for point in series.points:
+                if point.created or point.completed or point.deleted or point.transitions:
+                    lines.append(f"• {point.start.strftime(label)}: {point.created} created, "
+                                 f"{point.completed} completed, {point.deleted} deleted")
+            quiet = len(series.points) - len(lines)
+            if quiet:
+                lines.append(f"• {quiet} of {len(series.points)} {bucket}s without activity")
+            moves = ", ".join(f"{metric.replace('_to_', ' → ')} {totals[metric]}"
+                              for metric in totals if "_to_" in metric and totals[metric])
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"📈 Todo activity per {bucket}, {series.start.strftime(label)} to now:\n" +
+                         "\n".join(lines) +
+                         f"\n\nTotals: {totals['created']} created, {totals['completed']} completed, "
+                         f"{totals['deleted']} deleted" +
+                         (f"\nStatus changes: {moves}" if moves else "")
+                )]
+            )
+
+        elif name == "todo_analytics":
+            report = await store.analytics(arguments.get("group_by", "status"))
+            if not report.groups:
+                text = "No todos to analyse"
+            else:
+                lines = []
+                for group in report.groups:
+                    line = (f"• {group.key}: {group.count} todos, {group.completed} completed, "
+                            f"mean age {_duration(group.mean_age_hours)}")
+                    if group.median_hours_to_complete is not None:
+                        line += f", median time to complete {_duration(group.median_hours_to_complete)}"
+                    lines.append(line)
+                text = (f"📊 Todo analytics by {report.group_by.value} ({report.total} todos):\n" + "\n".join(lines))
+
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=text
+                )]
+            )
+
         elif name == "get_todo_stats":
-            all_todos = get_all_todos()
-            total = len(all_todos)
-            pending = len([t for t in all_todos if t.status == "pending"])
-            in_progress = len([t for t in all_todos if t.status == "in_progress"])
-            completed = len([t for t in all_todos if t.status == "completed"])
+            # Per-status counters, summed across shards, instead of fetching every todo
+            counts = await store.counts()
+            total = sum(counts.values())
+            pending = counts[TodoStatus.PENDING]
+            in_progress = counts[TodoStatus.IN_PROGRESS]
+            completed = counts[TodoStatus.COMPLETED]
             completion_rate = round((completed / total * 100) if total > 0 else 0, 2)
             
             return CallToolResult(
@@ -407,20 +1016,115 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
         )
 
 async def main():
-    """Main function to run the MCP server"""
+    """Main function to run the MCP server over stdio, one client per process"""
     async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="todo-api-mcp",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=None,
-                    experimental_capabilities=None,
-                ),
-            ),
-        )
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
+def _resource(uri) -> TodoResource:
+    """The todo:// resource a URI names, as an MCP invalid-params error when it names none"""
+    import database
+
+    try:
+        resource = parse(str(uri))
+    except ValueError as e:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e))) from None
+    if resource.tenant is not None and not database.valid_tenant(resource.tenant):
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Invalid tenant name: {resource.tenant!r}"))
+    return resource
+
+
+@server.list_resources()
+async def handle_list_resources() -> List[Resource]:
+    """The todo lists; single todos are reached through the todo://{id} template"""
+    lists = [Resource(uri="todo://list", name="All todos", mimeType="text/plain",
+                      description="Every todo, one line each")]
+    for status in STATUSES:
+        label = status.replace("_", " ").capitalize()
+        lists.append(Resource(uri=f"todo://list?status={status}", name=f"{label} todos", mimeType="text/plain",
+                              description=f"Todos with status {status}, one line each"))
+    return lists
+
+
+@server.list_resource_templates()
+async def handle_list_resource_templates() -> List[ResourceTemplate]:
+    return [
+        ResourceTemplate(uriTemplate="todo://{id}{?tenant}", name="Todo", mimeType="application/json",
+                         description="One todo with all its fields"),
+        ResourceTemplate(uriTemplate="todo://list{?status,limit,tenant}", name="Todo list", mimeType="text/plain",
+                         description="Todos, optionally of one status (pending, in_progress, completed), one line each"),
+    ]
+
+
+@server.read_resource()
+async def handle_read_resource(uri) -> List[ReadResourceContents]:
+    """Read a todo or a list, only now that it is asked for"""
+    import database
+    from models import TodoQuery
+
+    resource = _resource(uri)
+    with database.tenant(resource.tenant):
+        if resource.todo_id is not None:
+            todo = await database.store.get(resource.todo_id)
+            if todo is None:
+                raise McpError(ErrorData(code=RESOURCE_NOT_FOUND, message=f"Todo {resource.todo_id} not found"))
+            return [ReadResourceContents(todo.model_dump_json(indent=2), "application/json")]
+        todos = [todo async for todo in database.store.iter_query(TodoQuery(
+            statuses=[resource.status] if resource.status else None,
+            limit=resource.limit,
+        ))]
+        lines = rendered.lines(database.current_tenant(), todos, "list")
+        return [ReadResourceContents(f"Found {len(todos)} todos:\n\n" + "\n".join(lines), "text/plain")]
+
+
+@server.subscribe_resource()
+async def handle_subscribe_resource(uri) -> None:
+    import database
+
+    resource = _resource(uri)
+    session = _current_session()
+    if session is None:
+        return
+    if subscriptions.changed not in database.store.listeners:
+        database.store.listen(subscriptions.changed)
+    with database.tenant(resource.tenant):
+        subscriptions.subscribe(session, str(uri), resource.key(database.current_tenant()))
+
+
+@server.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri) -> None:
+    import database
+
+    resource = _resource(uri)
+    session = _current_session()
+    if session is not None:
+        with database.tenant(resource.tenant):
+            subscriptions.unsubscribe(session, str(uri), resource.key(database.current_tenant()))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the Todo MCP server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                        help="stdio: one client per process; http: streamable HTTP, many clients sharing one store")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (http)")
+    parser.add_argument("--port", type=int, default=8001, help="Port to listen on (http)")
+    parser.add_argument("--max-sessions", type=int, default=1000, help="Open sessions allowed at once (http)")
+    parser.add_argument("--session-timeout", type=float, default=1800,
+                        help="Seconds before an idle session is closed (http)")
+    parser.add_argument("--json-response", action="store_true",
+                        help="Answer requests with JSON bodies instead of SSE streams (http)")
+    return parser
+
+
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.transport == "stdio":
+        asyncio.run(main())
+        return
+    from mcp_http import serve
+    asyncio.run(serve(server, args.host, args.port, max_sessions=args.max_sessions,
+                      session_timeout=args.session_timeout, json_response=args.json_response))
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -10,11 +10,63 @@ class TodoStatus(str, Enum):
     COMPLETED = "completed"
 
 
+class SearchMode(str, Enum):
+    SUBSTRING = "substring"
+    FUZZY = "fuzzy"
+
+
+class RollupBucket(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+
+class AnalyticsGroupBy(str, Enum):
+    STATUS = "status"
+    PRIORITY = "priority"
+    TAG = "tag"
+    NONE = "none"
+
+
+class SortField(str, Enum):
+    ID = "id"
+    PRIORITY = "priority"
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+def normalize_tags(tags: Optional[List[str]]) -> Optional[List[str]]:
+    """Tags are case-insensitive: trimmed, lowercased, empty ones and repeats dropped"""
+    if tags is None:
+        return None
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags if tag.strip()))
+
+
+def unique_ids(ids: Optional[List[int]]) -> Optional[List[int]]:
+    """Drop repeated ids, keeping the first of each"""
+    if ids is None:
+        return None
+    return list(dict.fromkeys(ids))
+
+
 class TodoBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200, description="Todo title")
     description: Optional[str] = Field(None, max_length=1000, description="Todo description")
     status: TodoStatus = Field(default=TodoStatus.PENDING, description="Todo status")
     priority: int = Field(default=1, ge=1, le=5, description="Priority level (1-5)")
+    tags: List[str] = Field(default_factory=list, max_length=20, description="Labels, matched case-insensitively")
+    due_at: Optional[datetime] = Field(None, description="When the todo is due; open todos past it are overdue")
+    parent_id: Optional[int] = Field(None, ge=1, description="Id of the todo this one is part of")
+    blocked_by: List[int] = Field(default_factory=list, max_length=50,
+                                  description="Ids of todos that must be completed before this one")
+
+    _tags = field_validator("tags")(normalize_tags)
+    _blocked_by = field_validator("blocked_by")(unique_ids)
 
 
 class TodoCreate(TodoBase):
@@ -26,6 +78,13 @@ class TodoUpdate(BaseModel):
     description: Optional[str] = Field(None, max_length=1000)
     status: Optional[TodoStatus] = None
     priority: Optional[int] = Field(None, ge=1, le=5)
+    tags: Optional[List[str]] = Field(None, max_length=20, description="Replaces the todo's tags")
+    due_at: Optional[datetime] = Field(None, description="New due time; null removes it")
+    parent_id: Optional[int] = Field(None, ge=1, description="New parent; null detaches the todo")
+    blocked_by: Optional[List[int]] = Field(None, max_length=50, description="Replaces the todos blocking this one")
+
+    _tags = field_validator("tags")(normalize_tags)
+    _blocked_by = field_validator("blocked_by")(unique_ids)
 
 
 class Todo(TodoBase):
@@ -37,6 +96,89 @@ class Todo(TodoBase):
         from_attributes = True
 
 
+class ScoredTodo(Todo):
+    score: float = Field(..., description="Similarity to the query")
+
+
+class TodoQuery(BaseModel):
+    """Combined filters, ordering and limit for listing todos"""
+    statuses: Optional[List[TodoStatus]] = Field(None, description="Match any of these statuses")
+    min_priority: Optional[int] = Field(None, ge=1, le=5)
+    max_priority: Optional[int] = Field(None, ge=1, le=5)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+    text: Optional[str] = Field(None, description="Match in title or description")
+    text_mode: SearchMode = SearchMode.SUBSTRING
+    threshold: float = Field(0.5, ge=0, le=1, description="Minimum similarity for fuzzy text match")
+    tags_all: Optional[List[str]] = Field(None, description="Has every one of these tags")
+    tags_any: Optional[List[str]] = Field(None, description="Has at least one of these tags")
+    tags_none: Optional[List[str]] = Field(None, description="Has none of these tags")
+    sort_by: Optional[SortField] = Field(None, description="Default: id, or similarity for fuzzy text")
+    order: SortOrder = SortOrder.ASC
+    limit: Optional[int] = Field(None, ge=1)
+    offset: int = Field(0, ge=0, description="Skip this many results, for paging")
+    snapshot: Optional[int] = Field(None, description="Read the todos as of this pinned snapshot")
+
+    _tags = field_validator("tags_all", "tags_any", "tags_none")(normalize_tags)
+
+
+class TodoChanges(BaseModel):
+    """One page of an incremental sync"""
+    todos: List[Todo] = Field(..., description="Todos created or updated since the cursor, oldest change first")
+    deleted: List[int] = Field(..., description="Ids of todos deleted since the cursor")
+    cursor: Optional[str] = Field(None, description="Pass back to get the changes after this page")
+    has_more: bool = Field(..., description="More changes are waiting; request again with the new cursor")
+    full_resync: bool = Field(False, description="The cursor is too old: replace local state with this and the following pages")
+
+
+class TodoRelations(BaseModel):
+    """A todo with its parent, children and blocking relations"""
+    todo: Todo
+    parent: Optional[Todo] = Field(None, description="The todo this one is part of")
+    children: List[Todo] = Field(..., description="Todos that are part of this one")
+    blocked_by: List[Todo] = Field(..., description="Todos that must be completed before this one")
+    blocks: List[Todo] = Field(..., description="Todos waiting for this one")
+    waiting_on: int = Field(..., description="Children and blockers that are not completed yet")
+    ready: bool = Field(..., description="Not completed, and waiting on nothing")
+
+
+class TimeseriesPoint(BaseModel):
+    """Activity in one time bucket"""
+    start: datetime = Field(..., description="Start of the bucket")
+    created: int = Field(..., description="Todos created")
+    completed: int = Field(..., description="Todos that reached completed, on creation or by a status change")
+    deleted: int = Field(..., description="Todos deleted")
+    transitions: Dict[str, int] = Field(..., description="Status changes, e.g. pending_to_in_progress, when any")
+
+
+class TodoTimeseries(BaseModel):
+    """Todo activity per minute, hour or day over a time range"""
+    bucket: RollupBucket
+    start: datetime = Field(..., description="Start of the first bucket")
+    end: datetime = Field(..., description="End of the last bucket, which holds the current time")
+    points: List[TimeseriesPoint] = Field(..., description="One entry per bucket, oldest first")
+    totals: Dict[str, int] = Field(..., description="Every counter summed over the range")
+
+
+class AnalyticsGroup(BaseModel):
+    """Aggregates over the todos of one group"""
+    key: str = Field(..., description="The status, priority or tag; \"all\" without grouping")
+    count: int = Field(..., description="Todos in the group")
+    completed: int = Field(..., description="Completed todos in the group")
+    mean_age_hours: float = Field(..., description="Mean time since the todos were created")
+    median_hours_to_complete: Optional[float] = Field(None, description="Median time from creation to completion")
+
+
+class TodoAnalytics(BaseModel):
+    """Group-by aggregates over every todo"""
+    group_by: AnalyticsGroupBy
+    as_of: datetime = Field(..., description="Ages are measured up to this time")
+    total: int = Field(..., description="Todos in the store; with several tags a todo is in several tag groups")
+    groups: List[AnalyticsGroup]
+
+
 class TodoResponse(BaseModel):
     message: str
     todo: Todo
@@ -0,0 +1,111 @@
+"""
+Overdue todos: an event when an open todo's due time passes
+
+Every backend keeps the todos that are not completed and have a due time
+in a sorted (due_at, id) index. The todos overdue now are the prefix of it
+before the current time, and the todos that became overdue since the last
+check are the slice between the two times, so neither question scans the
+store: a check costs O(log n) plus the todos it returns.
+
+The watcher checks every TODO_OVERDUE_TICK seconds (default 1; 0 turns it
+off). For each tenant with a backend open in this process it reads the
+slice since its previous check and emits one event per todo, to
+in-process listeners and into a bounded feed (GET /todos/overdue/events).
+A todo whose due time is set in the past is overdue at once but emits no
+event, since no deadline passed while it was open. Each server process
+runs its own watcher, so with several workers sharing SQLite every worker
+reports the same deadlines.
+
+A tick that fails (say, SQLite reporting the database locked) is logged
+and the watcher carries on; the tenants it did not get through are
+checked from where they left off on the next tick.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+import database
+from models import Todo
+
+# Overdue events kept for GET /todos/overdue/events
+EVENT_LIMIT = 1000
+
+Listener = Callable[[str, List[Todo]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class OverdueWatcher:
+    """Turns passing due times into events, one range read per tenant and tick"""
+
+    def __init__(self, tick: float = 1.0, keep: int = EVENT_LIMIT):
+        self.tick = tick
+        self.started = datetime.now()
+        # Tenant -> the time its last check covered up to
+        self.checked: Dict[str, datetime] = {}
+        self.events: Deque[dict] = deque(maxlen=keep)
+        self.seq = 0
+        self.listeners: List[Listener] = []
+
+    @classmethod
+    def from_env(cls) -> "OverdueWatcher":
+        return cls(tick=float(os.environ.get("TODO_OVERDUE_TICK", 1)))
+
+    @property
+    def enabled(self) -> bool:
+        return self.tick > 0
+
+    def listen(self, listener: Listener):
+        """Call listener(tenant, todos) with the todos that became overdue"""
+        self.listeners.append(listener)
+
+    async def check(self, now: Optional[datetime] = None) -> int:
+        """Emit events for due times passed since the last check; returns how many"""
+        now = now or datetime.now()
+        emitted = 0
+        for name in database.tenants():
+            since = self.checked.get(name, self.started)
+            if since >= now:
+                continue
+            with database.tenant(name):
+                todos = await database.store.came_due(since, now)
+            self.checked[name] = now
+            if not todos:
+                continue
+            for todo in todos:
+                self.seq += 1
+                self.events.append({
+                    "seq": self.seq,
+                    "tenant": name,
+                    "todo_id": todo.id,
+                    "title": todo.title,
+                    "due_at": todo.due_at.isoformat(),
+                    "detected_at": now.isoformat(),
+                })
+            for listener in self.listeners:
+                listener(name, todos)
+            emitted += len(todos)
+        return emitted
+
+    async def run(self):
+        """Check every `tick` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.check()
+            except Exception:
+                # Cancellation is not an Exception, so it still stops the loop
+                logger.exception("Overdue check failed; trying again next tick")
+
+    def events_since(self, tenant: str, after: int = 0, limit: int = 100) -> List[dict]:
+        """One tenant's events with seq > after, oldest first"""
+        found = []
+        for event in self.events:
+            if event["seq"] > after and event["tenant"] == tenant:
+                found.append(event)
+                if len(found) >= limit:
+                    break
+        return found
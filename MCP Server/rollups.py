@@ -0,0 +1,171 @@
+"""
+Time-series rollups of todo activity per minute, hour and day
+
+Every write adds one to counters of the minute, hour and day it happened
+in: todos created, completed and deleted, and each move between two
+statuses. A trend question ("completions per day this month") then reads
+one row of counters per bucket instead of scanning todos and bucketing
+their timestamps, so it costs O(buckets) whatever the number of todos.
+
+Each resolution keeps a ring of its latest buckets (RESOLUTIONS), a flat
+array of unsigned counters with one row of METRICS per bucket. A ring
+only grows as far as time has moved on since its first write, so a
+tenant that was busy for a few minutes holds a few rows, not a year of
+days. Once full, the oldest bucket's row is reused for the newest.
+
+Buckets follow local wall-clock time, like the todo timestamps: an hour
+starts on the hour and a day at midnight. The counts start with the
+store; the SQLite backend keeps the same counters in a table, so they
+survive restarts and add up the writes of every worker.
+"""
+import re
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models import RollupBucket, TimeseriesPoint, Todo, TodoStatus, TodoTimeseries
+
+STATUSES = [status.value for status in TodoStatus]
+TRANSITIONS = [f"{old}_to_{new}" for old in STATUSES for new in STATUSES if old != new]
+METRICS = ("created", "completed", "deleted", *TRANSITIONS)
+COLUMN = {metric: column for column, metric in enumerate(METRICS)}
+
+# Resolution -> (bucket width in seconds, buckets kept)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    RollupBucket.MINUTE.value: (60, 24 * 60),
+    RollupBucket.HOUR.value: (3600, 30 * 24),
+    RollupBucket.DAY.value: (86400, 366),
+}
+# Range when none is asked for: the last hour of minutes, day of hours, month of days
+DEFAULT_RANGES = {RollupBucket.MINUTE.value: "60m", RollupBucket.HOUR.value: "24h", RollupBucket.DAY.value: "30d"}
+
+EPOCH = datetime(1970, 1, 1)
+UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def bucket_of(when: datetime, width: int) -> int:
+    """Number of the bucket holding `when`, counted from the epoch"""
+    return int((when - EPOCH).total_seconds() // width)
+
+
+def bucket_start(bucket: int, width: int) -> datetime:
+    return EPOCH + timedelta(seconds=bucket * width)
+
+
+def changes(todo: Optional[Todo], old: Optional[Todo]) -> List[str]:
+    """Counters a write adds one to: `old` is None for a create, `todo` None for a delete"""
+    if todo is None:
+        return ["deleted"]
+    if old is None:
+        return ["created", "completed"] if todo.status == TodoStatus.COMPLETED else ["created"]
+    if todo.status == old.status:
+        return []
+    moved = [f"{TodoStatus(old.status).value}_to_{TodoStatus(todo.status).value}"]
+    return moved + ["completed"] if todo.status == TodoStatus.COMPLETED else moved
+
+
+def window(resolution: str, span: Optional[str], now: datetime) -> Tuple[int, int]:
+    """First and last bucket of a range like "24h" or "7d" ending now
+
+    Raises ValueError for a range that cannot be read or reaches further
+    back than the resolution keeps.
+    """
+    width, size = RESOLUTIONS[resolution]
+    span = span or DEFAULT_RANGES[resolution]
+    match = re.fullmatch(r"\s*(\d+)\s*([mhdw])\s*", span.lower())
+    if not match:
+        raise ValueError(f"Invalid range {span!r}: use a number and a unit, like 90m, 24h, 7d or 4w")
+    seconds = int(match.group(1)) * UNITS[match.group(2)]
+    count = max(1, -(-seconds // width))
+    if count > size:
+        raise ValueError(f"{resolution.capitalize()} buckets go back {size} {resolution}s at most")
+    last = bucket_of(now, width)
+    return last - count + 1, last
+
+
+class Ring:
+    """Counters of the latest `size` buckets of one width"""
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.size = size
+        self.counts = array("I")
+        # Bucket of the first write, which owns row 0, and the newest bucket written
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+
+    def _row(self, bucket: int) -> Optional[int]:
+        """Offset of a bucket's row, or None when the ring does not hold it"""
+        if self.first is None or not (self.first <= bucket <= self.last and bucket > self.last - self.size):
+            return None
+        return (bucket - self.first) % self.size * len(METRICS)
+
+    def add(self, bucket: int, columns: Sequence[int]):
+        if self.first is None:
+            self.first = self.last = bucket
+            self.counts.extend([0] * len(METRICS))
+        elif bucket > self.last:
+            rows = len(self.counts) // len(METRICS)
+            wanted = min(self.size, bucket - self.first + 1)
+            if wanted > rows:
+                self.counts.extend([0] * ((wanted - rows) * len(METRICS)))
+            # Rows reused for buckets after the last write still hold counts from a lap ago
+            for skipped in range(max(self.last + 1, bucket - self.size + 1), bucket + 1):
+                offset = (skipped - self.first) % self.size
+                if offset < rows:
+                    start = offset * len(METRICS)
+                    self.counts[start:start + len(METRICS)] = array("I", [0] * len(METRICS))
+            self.last = bucket
+        offset = self._row(bucket)
+        if offset is None:
+            # Older than the ring, or before its first write (the clock went back)
+            return
+        for column in columns:
+            self.counts[offset + column] += 1
+
+    def rows(self, first: int, last: int) -> List[List[int]]:
+        """Counters of buckets first..last, zeros for buckets the ring does not hold"""
+        found = []
+        for bucket in range(first, last + 1):
+            offset = self._row(bucket)
+            found.append([0] * len(METRICS) if offset is None else list(self.counts[offset:offset + len(METRICS)]))
+        return found
+
+
+class Rollups:
+    """Activity counters of one store, at every resolution"""
+
+    def __init__(self):
+        self.rings = {resolution: Ring(width, size) for resolution, (width, size) in RESOLUTIONS.items()}
+
+    def record(self, when: datetime, todo: Optional[Todo], old: Optional[Todo] = None):
+        """Count a write: see changes()"""
+        columns = [COLUMN[metric] for metric in changes(todo, old)]
+        if columns:
+            for ring in self.rings.values():
+                ring.add(bucket_of(when, ring.width), columns)
+
+    def rows(self, resolution: str, first: int, last: int) -> List[List[int]]:
+        return self.rings[resolution].rows(first, last)
+
+
+def series(resolution: str, first: int, rows: List[List[int]]) -> TodoTimeseries:
+    """The API shape of the counter rows of buckets first, first + 1, ..."""
+    width, _ = RESOLUTIONS[resolution]
+    points = []
+    for bucket, row in enumerate(rows, first):
+        counts = dict(zip(METRICS, row))
+        points.append(TimeseriesPoint(
+            start=bucket_start(bucket, width),
+            created=counts["created"],
+            completed=counts["completed"],
+            deleted=counts["deleted"],
+            transitions={metric: counts[metric] for metric in TRANSITIONS if counts[metric]},
+        ))
+    return TodoTimeseries(
+        bucket=resolution,
+        start=bucket_start(first, width),
+        end=bucket_start(first + len(rows), width),
+        points=points,
+        totals={metric: sum(row[column] for row in rows) for column, metric in enumerate(METRICS)},
+    )
@@ -0,0 +1,393 @@
+"""
+In-memory todos sharded across worker processes
+
+A single in-memory store is limited to one core. The sharded backend keeps
+the same MemoryBackend in N shard processes instead, and routes every call
+from the server process:
+
+- Point operations (get, update, delete) go to the one shard that owns the
+  id, `id % N`. The router hands out ids itself, so create goes straight to
+  the right shard too.
+- Listings, searches, queries and counts fan out to every shard at once.
+  Each shard answers from its own indexes, already ordered, and the router
+  merges the sorted streams (heapq.merge) and sums the counters.
+- Relations cross shards, so the router keeps the dependency graph
+  (todo_graph.py) of the whole tenant. It checks new relations for cycles
+  before the write reaches a shard, follows every write's result to keep
+  the ready set current, and fetches ready todos from their shards by id.
+- Idempotency keys are kept by the router too; a deduplicating create
+  asks every shard for a todo with the same content hash.
+
+The shard processes are shared by all tenants; each shard keeps one store
+per tenant. Select it with TODO_DB_BACKEND=sharded and TODO_DB_SHARDS=N.
+"""
+import heapq
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database import (
+    Created, IdempotencyTable, MemoryBackend, SnapshotExpired, _apply_update, _changes_page, _create_once,
+    _graph_entry, _query_order, _relations, _resync_needed, _similarity_key, DEFAULT_THRESHOLD, SNAPSHOT_TTL
+)
+from models import (
+    AnalyticsGroupBy, Todo, TodoChanges, TodoCreate, TodoRelations, TodoUpdate, TodoStatus, TodoQuery
+)
+from time_index import Key
+
+
+# Shard side
+# ----------
+
+def _changes(store: MemoryBackend, since: Optional[Key], limit: int):
+    """Raw change keys of one shard, for the router to merge"""
+    if _resync_needed(since, len(store.tombstones), store.tombstones.oldest()):
+        return True, [], []
+    updated = list(islice(((key, store.todos[key[1]]) for key in store.by_updated.after(since)), limit + 1))
+    deleted = list(islice(store.tombstones.after(since), limit + 1)) if since is not None else []
+    return False, updated, deleted
+
+
+# Calls that are not plain MemoryBackend methods
+SHARD_CALLS: Dict[str, Callable] = {"changes": _changes}
+
+
+def _serve(conn):
+    """Shard process: answer (tenant, method, args) messages until told to stop"""
+    stores: Dict[str, MemoryBackend] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        tenant, method, args = message
+        store = stores.get(tenant)
+        if store is None:
+            store = stores[tenant] = MemoryBackend()
+            # The router checks relations: this shard cannot see todos on the others
+            store.check_relations = False
+        try:
+            call = SHARD_CALLS.get(method)
+            conn.send((True, call(store, *args) if call else getattr(store, method)(*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+# Router side
+# -----------
+
+class ShardPool:
+    """N shard processes, each reached through a pipe guarded by a lock"""
+
+    def __init__(self, shards: int):
+        context = multiprocessing.get_context("spawn")
+        self.conns, self.processes = [], []
+        for _ in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def __len__(self):
+        return len(self.conns)
+
+    @staticmethod
+    def _result(reply):
+        ok, value = reply
+        if not ok:
+            raise value
+        return value
+
+    def call(self, shard: int, tenant: str, method: str, *args) -> Any:
+        """Run a call on one shard"""
+        with self.locks[shard]:
+            self.conns[shard].send((tenant, method, args))
+            return self._result(self.conns[shard].recv())
+
+    def fan_out(self, tenant: str, method: str, *args) -> List[Any]:
+        """Run a call on every shard in parallel; results in shard order"""
+        return self.scatter(tenant, method, [args] * len(self.conns))
+
+    def scatter(self, tenant: str, method: str, shard_args: List[Tuple]) -> List[Any]:
+        """Run a call on every shard in parallel, each with its own arguments"""
+        # Locks are always taken in shard order, so fan-outs cannot deadlock.
+        # Holding all of them also makes a fan-out see every shard between
+        # the same writes, which is what makes pinned snapshots consistent.
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            for conn, args in zip(self.conns, shard_args):
+                conn.send((tenant, method, args))
+            replies = [conn.recv() for conn in self.conns]
+        finally:
+            for lock in self.locks:
+                lock.release()
+        return [self._result(reply) for reply in replies]
+
+    def close(self):
+        for conn, process in zip(self.conns, self.processes):
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            conn.close()
+
+
+_pool: Optional[ShardPool] = None
+_pool_users = 0
+_pool_lock = threading.Lock()
+
+
+class ShardedBackend:
+    """One tenant's todos, hash-partitioned by id over the shard processes"""
+
+    # Every call waits on a pipe round trip to the shard processes
+    blocking = True
+
+    def __init__(self, tenant: str, shards: int):
+        global _pool, _pool_users
+        with _pool_lock:
+            if _pool is None:
+                _pool = ShardPool(max(1, shards))
+            _pool_users += 1
+            self.pool = _pool
+        self.tenant = tenant
+        self.next_id = 1
+        self.id_lock = threading.Lock()
+        # Snapshot id -> (each shard's snapshot, lease expiry, ttl)
+        self.snapshots: Dict[int, Tuple[List[int], float, float]] = {}
+        self.snapshot_seq = 0
+        # The tenant's dependency graph, built on first use. Writes to
+        # different shards finish in any order, so each todo's last seen
+        # updated_at keeps a late result from undoing a newer one.
+        self.graph = None
+        self.graph_lock = threading.RLock()
+        self.graph_stamps: Dict[int, datetime] = {}
+        # Keyed and deduplicating creates hold create_lock from their lookup to their write
+        self.idempotency = IdempotencyTable()
+        self.create_lock = threading.Lock()
+
+    def _shard(self, todo_id: int) -> int:
+        return todo_id % len(self.pool)
+
+    def _call(self, todo_id: int, method: str, *args):
+        return self.pool.call(self._shard(todo_id), self.tenant, method, *args)
+
+    def _fan_out(self, method: str, *args) -> List[Any]:
+        return self.pool.fan_out(self.tenant, method, *args)
+
+    def all(self, status: Optional[TodoStatus] = None) -> List[Todo]:
+        return list(heapq.merge(*self._fan_out("all", status), key=lambda t: t.id))
+
+    def get(self, todo_id: int) -> Optional[Todo]:
+        return self._call(todo_id, "get", todo_id)
+
+    def counts(self) -> Dict[TodoStatus, int]:
+        totals = {status: 0 for status in TodoStatus}
+        for counts in self._fan_out("counts"):
+            for status, count in counts.items():
+                totals[status] += count
+        return totals
+
+    def _get_many(self, todo_ids: List[int]) -> Dict[int, Todo]:
+        """Todos by id, one request per shard"""
+        per_shard = [[] for _ in range(len(self.pool))]
+        for todo_id in todo_ids:
+            per_shard[self._shard(todo_id)].append(todo_id)
+        results = self.pool.scatter(self.tenant, "get_many", [(ids,) for ids in per_shard])
+        return {todo.id: todo for todos in results for todo in todos}
+
+    def _graph(self):
+        with self.graph_lock:
+            if self.graph is None:
+                from todo_graph import DependencyGraph
+                todos = self.all()
+                self.graph = DependencyGraph()
+                self.graph.load(_graph_entry(todo) for todo in todos)
+                self.graph_stamps = {todo.id: todo.updated_at for todo in todos}
+            return self.graph
+
+    def _track(self, todo: Optional[Todo]):
+        """Follow a write's result in the graph, unless a newer write got there first"""
+        if todo is None or self.graph is None:
+            return
+        with self.graph_lock:
+            if self.graph_stamps.get(todo.id, datetime.min) <= todo.updated_at:
+                self.graph_stamps[todo.id] = todo.updated_at
+                self.graph.put(*_graph_entry(todo))
+
+    def create(self, todo_data: TodoCreate) -> Todo:
+        with self.id_lock:
+            todo_id = self.next_id
+            self.next_id += 1
+        if todo_data.parent_id is None and not todo_data.blocked_by:
+            todo = self._call(todo_id, "create", todo_data, todo_id)
+            self._track(todo)
+            return todo
+        # Relation changes hold the graph from their check to their write
+        with self.graph_lock:
+            self._graph().check(todo_id, todo_data.parent_id, todo_data.blocked_by)
+            todo = self._call(todo_id, "create", todo_data, todo_id)
+            self._track(todo)
+        return todo
+
+    def create_once(self, todo_data: TodoCreate, key: Optional[str] = None, dedupe: bool = False) -> Created:
+        with self.create_lock:
+            return _create_once(self.idempotency, todo_data, key, dedupe, self.duplicate_of, self.create)
+
+    def duplicate_of(self, title: str, description: Optional[str]) -> Optional[Todo]:
+        found = [todo for todo in self._fan_out("duplicate_of", title, description) if todo is not None]
+        return min(found, key=lambda todo: todo.id, default=None)
+
+    def update(self, todo_id: int, todo_data: TodoUpdate) -> Optional[Todo]:
+        if not {"parent_id", "blocked_by"} & todo_data.model_fields_set:
+            todo = self._call(todo_id, "update", todo_id, todo_data)
+            self._track(todo)
+            return todo
+        with self.graph_lock:
+            graph = self._graph()
+            old = self.get(todo_id)
+            if old is None:
+                return None
+            new = _apply_update(old, todo_data, old.updated_at)
+            graph.check(todo_id, new.parent_id, new.blocked_by, old.parent_id, old.blocked_by)
+            todo = self._call(todo_id, "update", todo_id, todo_data)
+            self._track(todo)
+        return todo
+
+    def delete(self, todo_id: int) -> bool:
+        deleted = self._call(todo_id, "delete", todo_id)
+        if deleted and self.graph is not None:
+            with self.graph_lock:
+                # No later result for this id can be newer than its deletion
+                self.graph_stamps[todo_id] = datetime.max
+                self.graph.remove(todo_id)
+        return deleted
+
+    def ready(self, limit: Optional[int] = None) -> List[Todo]:
+        with self.graph_lock:
+            todo_ids = self._graph().ready_ids(limit)
+        todos = self._get_many(todo_ids)
+        return [todos[todo_id] for todo_id in todo_ids if todo_id in todos]
+
+    def relations(self, todo_id: int) -> Optional[TodoRelations]:
+        todo = self.get(todo_id)
+        if todo is None:
+            return None
+        with self.graph_lock:
+            return _relations(todo, self._graph(), self._get_many)
+
+    def search(self, query: str) -> List[Todo]:
+        return list(heapq.merge(*self._fan_out("search", query), key=lambda t: t.id))
+
+    def fuzzy_search(self, query: str, threshold: float = DEFAULT_THRESHOLD) -> List[Todo]:
+        return list(heapq.merge(*self._fan_out("fuzzy_search", query, threshold), key=_similarity_key(query)))
+
+    def semantic_search(self, query: str, limit: int = 10) -> List[Tuple[Todo, float]]:
+        # Each shard weights terms by its own document frequencies, which
+        # agree closely once shards hold more than a few hundred todos
+        merged = heapq.merge(*self._fan_out("semantic_search", query, limit), key=lambda hit: (-hit[1], hit[0].id))
+        return list(islice(merged, limit))
+
+    def pin(self, ttl: float = SNAPSHOT_TTL) -> int:
+        """Pin a snapshot on every shard at once; returns the router's id for them"""
+        shard_snapshots = self._fan_out("pin", ttl)
+        now = time.monotonic()
+        with self.id_lock:
+            for snapshot, (_, expiry, _) in list(self.snapshots.items()):
+                if expiry <= now:
+                    del self.snapshots[snapshot]
+            self.snapshot_seq += 1
+            self.snapshots[self.snapshot_seq] = (shard_snapshots, now + ttl, ttl)
+            return self.snapshot_seq
+
+    def _shard_snapshots(self, snapshot: int) -> List[int]:
+        with self.id_lock:
+            held = self.snapshots.get(snapshot)
+            now = time.monotonic()
+            if held is None or held[1] <= now:
+                raise SnapshotExpired(f"Snapshot {snapshot} has expired or does not exist")
+            self.snapshots[snapshot] = (held[0], now + held[2], held[2])
+            return held[0]
+
+    def query(self, q: TodoQuery) -> Tuple[List[Todo], List[str]]:
+        """Run the query on every shard (each applies offset + limit) and merge"""
+        end = q.offset + q.limit if q.limit else None
+        shard_q = q.model_copy(update={"limit": end, "offset": 0})
+        if q.snapshot is None:
+            results = self._fan_out("query", shard_q)
+        else:
+            results = self.pool.scatter(self.tenant, "query", [
+                (shard_q.model_copy(update={"snapshot": snapshot}),)
+                for snapshot in self._shard_snapshots(q.snapshot)
+            ])
+        key, descending, label = _query_order(q)
+        merged = heapq.merge(*(todos for todos, _ in results), key=key, reverse=descending)
+        todos = list(islice(merged, q.offset, end))
+        plan = [f"shard {i}: {' -> '.join(steps)}" for i, (_, steps) in enumerate(results)]
+        plan.append(f"merge {len(results)} shards by {label}{f' (first {end})' if end else ''}"
+                    f"{f', skip {q.offset}' if q.offset else ''}")
+        return todos, plan
+
+    def overdue(self, now: datetime, limit: Optional[int] = None) -> List[Todo]:
+        merged = heapq.merge(*self._fan_out("overdue", now, limit), key=lambda t: (t.due_at, t.id))
+        return list(islice(merged, limit))
+
+    def came_due(self, start: datetime, end: datetime) -> List[Todo]:
+        return list(heapq.merge(*self._fan_out("came_due", start, end), key=lambda t: (t.due_at, t.id)))
+
+    def timeseries(self, resolution: str, first: int, last: int) -> List[List[int]]:
+        """Every shard counts its own writes; the series is their sum"""
+        per_shard = self._fan_out("timeseries", resolution, first, last)
+        return [[sum(column) for column in zip(*rows)] for rows in zip(*per_shard)]
+
+    def analytics(self, group_by: AnalyticsGroupBy, now: datetime):
+        """Counts and summed ages add up; each shard's sorted completion times are merged for the medians"""
+        from columnar import merge
+        return merge(self._fan_out("analytics", group_by, now))
+
+    def facets(self, q: TodoQuery) -> Dict[str, int]:
+        if q.snapshot is None:
+            results = self._fan_out("facets", q)
+        else:
+            results = self.pool.scatter(self.tenant, "facets", [
+                (q.model_copy(update={"snapshot": snapshot}),) for snapshot in self._shard_snapshots(q.snapshot)
+            ])
+        totals = Counter()
+        for counts in results:
+            totals.update(counts)
+        return dict(sorted(totals.items(), key=lambda item: (-item[1], item[0])))
+
+    def next(self, statuses: List[TodoStatus], limit: int) -> List[Todo]:
+        merged = heapq.merge(*self._fan_out("next", statuses, limit),
+                             key=lambda t: (-t.priority, t.created_at, t.id))
+        return list(islice(merged, limit))
+
+    def changes_since(self, since: Optional[Key], limit: int) -> TodoChanges:
+        results = self._fan_out("changes", since, limit)
+        full_resync = any(resync for resync, _, _ in results)
+        if full_resync:
+            since = None
+            results = self._fan_out("changes", since, limit)
+        updated = heapq.merge(*(updated for _, updated, _ in results), key=lambda change: change[0])
+        deleted = heapq.merge(*(deleted for _, _, deleted in results))
+        return _changes_page(since, updated, deleted, limit, full_resync)
+
+    def close(self):
+        """Release the shard processes; the last tenant to close stops them"""
+        global _pool, _pool_users
+        with _pool_lock:
+            _pool_users -= 1
+            if _pool_users == 0 and _pool is not None:
+                _pool.close()
+                _pool = None
@@ -0,0 +1,60 @@
+"""
+Single-flight execution of identical concurrent reads
+
+When many callers ask the same question at once (a burst of
+GET /todos?status=pending, the same search from several agents) only the
+first one runs it; the others wait for that run and get the same result.
+Requests are identical when their keys are equal. A run ends when its
+result is ready, so this never serves anything older than the requests
+already in flight; it is coalescing, not caching.
+"""
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Merges concurrent calls with equal keys into one execution"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.requests: Counter = Counter()
+        self.executions: Counter = Counter()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """Run fn() unless an equal key is already running, then share its result
+
+        Results are shared between callers, so treat them as read-only.
+        """
+        self.requests[label] += 1
+        if not self.enabled:
+            self.executions[label] += 1
+            return await fn()
+        task = self.in_flight.get(key)
+        if task is None:
+            self.executions[label] += 1
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # A cancelled caller must not cancel the run the others wait for
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, execution and coalesced counts, in total and per label"""
+        labels = sorted(self.requests)
+        requests, executions = sum(self.requests.values()), sum(self.executions.values())
+        return {
+            "requests": requests,
+            "executions": executions,
+            "coalesced": requests - executions,
+            "in_flight": len(self.in_flight),
+            "by_operation": {
+                label: {
+                    "requests": self.requests[label],
+                    "executions": self.executions[label],
+                    "coalesced": self.requests[label] - self.executions[label],
+                }
+                for label in labels
+            },
+        }
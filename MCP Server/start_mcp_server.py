@@ -2,14 +2,13 @@
 """
 Start the MCP Server for Todo API
 """
-import asyncio
 import sys
 import os
 
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from mcp_server import main
+from mcp_server import run
 
 if __name__ == "__main__":
     print("🚀 Starting Todo API MCP Server...")
@@ -21,12 +20,15 @@ if __name__ == "__main__":
     print("  • update_todo_status - Update only the status of a todo")
     print("  • delete_todo - Delete a todo by ID")
     print("  • search_todos - Search todos by title or description")
+    print("  • semantic_search_todos - Find todos by meaning")
+    print("  • query_todos - Combine status, priority, time and text filters")
+    print("  • next_todos - The next todos to work on")
     print("  • get_todo_stats - Get statistics about todos")
     print("🛑 Press Ctrl+C to stop the server")
     print("-" * 50)
     
     try:
-        asyncio.run(main())
+        run()
     except KeyboardInterrupt:
         print("\n👋 MCP Server stopped")
     except Exception as e:
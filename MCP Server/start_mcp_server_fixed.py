@@ -21,6 +21,9 @@ if __name__ == "__main__":
     print("  • update_todo_status - Update only the status of a todo")
     print("  • delete_todo - Delete a todo by ID")
     print("  • search_todos - Search todos by title or description")
+    print("  • semantic_search_todos - Find todos by meaning")
+    print("  • query_todos - Combine status, priority, time and text filters")
+    print("  • next_todos - The next todos to work on")
     print("  • get_todo_stats - Get statistics about todos")
     print("🛑 Press Ctrl+C to stop the server")
     print("-" * 50)
@@ -1,23 +1,109 @@
 #!/usr/bin/env python3
 """
 Start the Todo API server
+
+Development (default): one process with auto-reload and in-memory storage.
+Production (--workers N): N worker processes without reload, sharing one
+SQLite store so every worker sees the same todos.
+Sharded (--backend sharded --shards N): one server process whose in-memory
+todos are spread over N shard processes.
+With MCP (--mcp): the MCP server is also served at /mcp (streamable HTTP),
+from the same process and store as the API (see unified.py).
 """
+import argparse
+import os
 import uvicorn
-from main import app
 
-if __name__ == "__main__":
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Start the Todo API server")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Run in production mode with this many worker processes "
+                             "(default: $WEB_CONCURRENCY, or development mode)")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "sharded"], default=None,
+                        help="Storage backend (production mode defaults to sqlite)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Shard processes for the sharded backend (default: one per core)")
+    parser.add_argument("--db-path", default=None, help="SQLite database file (default: todos.db)")
+    parser.add_argument("--keep-alive", type=int, default=5,
+                        help="Seconds to keep idle client connections open for reuse")
+    parser.add_argument("--response-cache", type=int, default=None,
+                        help="Precompressed GET /todos responses to cache (single process only)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="Seconds to wait for in-flight requests on shutdown")
+    parser.add_argument("--mcp", action="store_true",
+                        help="Also serve the MCP server at /mcp over streamable HTTP, sharing the API's store")
+    parser.add_argument("--mcp-max-sessions", type=int, default=None, help="Open MCP sessions allowed at once")
+    parser.add_argument("--mcp-session-timeout", type=float, default=None,
+                        help="Seconds before an idle MCP session is closed")
+    parser.add_argument("--mcp-json-response", action="store_true",
+                        help="Answer MCP requests with JSON bodies instead of SSE streams")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workers = args.workers or int(os.environ.get("WEB_CONCURRENCY", 0)) or None
+    production = workers is not None
+
+    backend = args.backend or os.environ.get("TODO_DB_BACKEND") or ("sqlite" if production else "memory")
+    if backend in ("memory", "sharded") and production and workers > 1:
+        raise SystemExit(f"❌ The {backend} backend cannot be shared between workers; use --backend sqlite")
+    if args.response_cache and production and workers > 1:
+        raise SystemExit("❌ The response cache only sees its own worker's writes; use it with one worker")
+    if args.mcp and production and workers > 1:
+        raise SystemExit("❌ MCP sessions live in the worker that opened them; use --mcp with one worker")
+    # Workers are separate processes that import main/database themselves,
+    # so the storage settings travel through the environment
+    os.environ["TODO_DB_BACKEND"] = backend
+    if args.db_path:
+        os.environ["TODO_DB_PATH"] = args.db_path
+    if args.shards:
+        os.environ["TODO_DB_SHARDS"] = str(args.shards)
+    if args.response_cache is not None:
+        os.environ["TODO_RESPONSE_CACHE"] = str(args.response_cache)
+    if args.mcp_max_sessions is not None:
+        os.environ["TODO_MCP_MAX_SESSIONS"] = str(args.mcp_max_sessions)
+    if args.mcp_session_timeout is not None:
+        os.environ["TODO_MCP_SESSION_TIMEOUT"] = str(args.mcp_session_timeout)
+    if args.mcp_json_response:
+        os.environ["TODO_MCP_JSON_RESPONSE"] = "1"
+    target = "unified:app" if args.mcp else "main:app"
+
+    mode = f"production, {workers} worker(s)" if production else "development, auto-reload"
     print("🚀 Starting Todo API server...")
-    print("📍 Server will be available at: http://localhost:8000")
-    print("📚 API Documentation: http://localhost:8000/docs")
-    print("📖 ReDoc Documentation: http://localhost:8000/redoc")
+    print(f"⚙️  Mode: {mode}, storage: {backend}")
+    print(f"📍 Server will be available at: http://localhost:{args.port}")
+    print(f"📚 API Documentation: http://localhost:{args.port}/docs")
+    print(f"📖 ReDoc Documentation: http://localhost:{args.port}/redoc")
+    if args.mcp:
+        print(f"🤖 MCP (streamable HTTP): http://localhost:{args.port}/mcp")
     print("🛑 Press Ctrl+C to stop the server")
     print("-" * 50)
-    
-    uvicorn.run(
-        app, 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True,
-        log_level="info"
-    )
 
+    if production:
+        uvicorn.run(
+            target,
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            log_level="warning",
+            access_log=False,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            timeout_keep_alive=args.keep_alive
+        )
+    else:
+        uvicorn.run(
+            target,
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info",
+            timeout_keep_alive=args.keep_alive
+        )
+
+
+if __name__ == "__main__":
+    main()
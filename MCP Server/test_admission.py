@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for rate limiting and admission control
+"""
+import asyncio
+import gc
+
+import httpx
+
+from admission import AdmissionQueue, RateLimiter, Rejected, SessionLimits, route_key
+
+
+def test_token_buckets():
+    print("🧪 Testing token buckets...")
+    limiter = RateLimiter(default=(1.0, 2.0), routes={"create_todo": (10.0, 1.0)})
+    assert limiter.check("a", "list_todos", now=0.0) == 0
+    assert limiter.check("a", "list_todos", now=0.0) == 0
+    assert limiter.check("a", "list_todos", now=0.0) == 1.0
+    # Other clients and other routes have their own buckets
+    assert limiter.check("b", "list_todos", now=0.0) == 0
+    assert limiter.check("a", "create_todo", now=0.0) == 0
+    assert 0 < limiter.check("a", "create_todo", now=0.0) <= 0.1
+    # Tokens refill at the configured rate
+    assert limiter.check("a", "list_todos", now=1.0) == 0
+    assert RateLimiter().check("a", "anything") == 0
+    assert route_key("PATCH", "/todos/42/status") == "PATCH /todos/{id}/status"
+    print("✅ Buckets limit each client and route separately")
+
+
+async def check_queue():
+    queue = AdmissionQueue(max_concurrent=1, max_queue=1, max_wait=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with queue.slot():
+            await release.wait()
+
+    async def quick():
+        async with queue.slot():
+            return "ok"
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(quick())
+    await asyncio.sleep(0)
+    try:
+        await quick()
+        raise AssertionError("admitted past a full queue")
+    except Rejected as e:
+        assert "queue full" in str(e)
+    try:
+        await waiter
+        raise AssertionError("waited past the latency goal")
+    except Rejected as e:
+        assert "timed out" in str(e)
+    release.set()
+    await holder
+    assert await quick() == "ok" and queue.active == 0
+
+
+def test_admission_queue():
+    print("🧪 Testing the admission queue...")
+    asyncio.run(check_queue())
+    print("✅ Requests beyond the queue or the latency goal are shed")
+
+
+class Session:
+    pass
+
+
+async def check_sessions():
+    limits = SessionLimits(max_concurrent=1, max_queue=0, max_wait=0.05)
+    busy, other = Session(), Session()
+    release = asyncio.Event()
+
+    async def hold():
+        async with limits.slot(busy):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    try:
+        async with limits.slot(busy):
+            raise AssertionError("admitted past the session's limit")
+    except Rejected as e:
+        assert "queue full" in str(e)
+    async with limits.slot(other):
+        assert limits.stats() == {"sessions": 2, "active": 2, "queued": 0}
+    release.set()
+    await holder
+    del busy
+    gc.collect()
+    assert limits.stats()["sessions"] == 1
+
+
+def test_session_limits():
+    print("🧪 Testing per-session limits...")
+    asyncio.run(check_sessions())
+    print("✅ A session over its limit is refused while other sessions go ahead")
+
+
+async def check_api_limits():
+    import main
+    limiter = main.admission.limiter
+    main.admission.limiter = RateLimiter(routes={"POST /todos": (0.1, 2.0)})
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            codes = [(await client.post("/todos", json={"title": "Limited"})).status_code for _ in range(3)]
+            assert codes == [201, 201, 429], codes
+            limited = await client.post("/todos", json={"title": "Limited"})
+            assert int(limited.headers["Retry-After"]) >= 1
+            # Made-up client ids and tenant names do not buy a fresh bucket
+            assert (await client.post("/todos", json={"title": "Limited"},
+                                      headers={"X-Client-Id": "someone-else"})).status_code == 429
+            assert (await client.post("/todos", json={"title": "Limited"},
+                                      headers={"X-Tenant": "../x"})).status_code == 400
+            assert len(main.admission.limiter.buckets) == 1
+            # Behind a trusted proxy, the client id it sets tells clients apart
+            main.admission.trust_client_id = True
+            assert (await client.post("/todos", json={"title": "Limited"},
+                                      headers={"X-Client-Id": "someone-else"})).status_code == 201
+            assert (await client.get("/todos")).status_code == 200
+            assert (await client.get("/todos/stats/admission")).json()["rate_limited"] >= 2
+    finally:
+        main.admission.limiter = limiter
+        main.admission.trust_client_id = False
+
+
+def test_api_rate_limits():
+    print("🧪 Testing API rate limits...")
+    asyncio.run(check_api_limits())
+    print("✅ The API answers 429 with Retry-After once a client's bucket is empty")
+
+
+def test_mcp_rate_limits():
+    print("🧪 Testing MCP tool rate limits...")
+    import mcp_server
+    limiter = mcp_server.admission.limiter
+    mcp_server.admission.limiter = RateLimiter(routes={"get_todo_stats": (0.1, 1.0)})
+    try:
+        first = asyncio.run(mcp_server.handle_call_tool("get_todo_stats", {}))
+        second = asyncio.run(mcp_server.handle_call_tool("get_todo_stats", {}))
+        assert not first.isError
+        assert second.isError and "rate limit exceeded" in second.content[0].text
+    finally:
+        mcp_server.admission.limiter = limiter
+    print("✅ Over-limit tool calls return an MCP error")
+
+
+if __name__ == "__main__":
+    test_token_buckets()
+    test_admission_queue()
+    test_session_limits()
+    test_api_rate_limits()
+    test_mcp_rate_limits()
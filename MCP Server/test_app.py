@@ -1,94 +1,281 @@
 #!/usr/bin/env python3
 """
 Test script for the Todo API
+
+Runs against a live server at BASE_URL when one is reachable, otherwise
+against the app in-process.
 """
-import requests
-import json
-import time
+import asyncio
+import httpx
 
 BASE_URL = "http://localhost:8000"
 
-def test_api():
-    print("🧪 Testing Todo API...")
-    
-    # Test 1: Get welcome page
-    try:
-        response = requests.get(f"{BASE_URL}/")
-        print(f"✅ Welcome page: {response.status_code}")
-    except Exception as e:
-        print(f"❌ Welcome page failed: {e}")
-        return
-    
-    # Test 2: Get all todos (should be empty initially)
-    try:
-        response = requests.get(f"{BASE_URL}/todos")
-        print(f"✅ Get todos: {response.status_code}")
-        todos = response.json()
-        print(f"   Found {len(todos)} todos")
-    except Exception as e:
-        print(f"❌ Get todos failed: {e}")
-        return
-    
-    # Test 3: Create a new todo
+
+async def make_client() -> httpx.AsyncClient:
+    """Async client for the live server, falling back to the in-process app"""
+    client = httpx.AsyncClient(base_url=BASE_URL)
     try:
-        todo_data = {
-            "title": "Learn FastAPI",
-            "description": "Complete the FastAPI tutorial",
-            "priority": 3,
-            "status": "pending"
-        }
-        response = requests.post(f"{BASE_URL}/todos", json=todo_data)
-        print(f"✅ Create todo: {response.status_code}")
-        if response.status_code == 201:
-            created_todo = response.json()
-            todo_id = created_todo["todo"]["id"]
-            print(f"   Created todo with ID: {todo_id}")
-        else:
-            print(f"   Response: {response.text}")
+        await client.get("/todos/stats/summary")
+        return client
+    except httpx.ConnectError:
+        await client.aclose()
+        from main import app
+        print("   (no server running, testing the app in-process)")
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL)
+
+
+async def run_api_checks():
+    print("🧪 Testing Todo API...")
+
+    async with await make_client() as client:
+        # Test 1: Get welcome page
+        try:
+            response = await client.get("/")
+            print(f"✅ Welcome page: {response.status_code}")
+        except Exception as e:
+            print(f"❌ Welcome page failed: {e}")
             return
-    except Exception as e:
-        print(f"❌ Create todo failed: {e}")
-        return
-    
-    # Test 4: Get the created todo
-    try:
-        response = requests.get(f"{BASE_URL}/todos/{todo_id}")
-        print(f"✅ Get specific todo: {response.status_code}")
-        todo = response.json()
-        print(f"   Todo title: {todo['title']}")
-    except Exception as e:
-        print(f"❌ Get specific todo failed: {e}")
-    
-    # Test 5: Update todo status
-    try:
-        response = requests.patch(f"{BASE_URL}/todos/{todo_id}/status", json={"status": "in_progress"})
-        print(f"✅ Update status: {response.status_code}")
-    except Exception as e:
-        print(f"❌ Update status failed: {e}")
-    
-    # Test 6: Get statistics
-    try:
-        response = requests.get(f"{BASE_URL}/todos/stats/summary")
-        print(f"✅ Get stats: {response.status_code}")
-        stats = response.json()
-        print(f"   Total todos: {stats['total_todos']}")
-        print(f"   Completion rate: {stats['completion_rate']}%")
-    except Exception as e:
-        print(f"❌ Get stats failed: {e}")
-    
-    # Test 7: Search todos
-    try:
-        response = requests.get(f"{BASE_URL}/todos?search=FastAPI")
-        print(f"✅ Search todos: {response.status_code}")
-        search_results = response.json()
-        print(f"   Found {len(search_results)} matching todos")
-    except Exception as e:
-        print(f"❌ Search todos failed: {e}")
-    
+
+        # Test 2: Get all todos
+        try:
+            response = await client.get("/todos")
+            print(f"✅ Get todos: {response.status_code}")
+            todos = response.json()
+            print(f"   Found {len(todos)} todos")
+        except Exception as e:
+            print(f"❌ Get todos failed: {e}")
+            return
+
+        # Test 3: Create a new todo
+        try:
+            todo_data = {
+                "title": "Learn FastAPI",
+                "description": "Complete the FastAPI tutorial",
+                "priority": 3,
+                "status": "pending",
+                "tags": ["learning", "Python"]
+            }
+            response = await client.post("/todos", json=todo_data)
+            print(f"✅ Create todo: {response.status_code}")
+            if response.status_code == 201:
+                created_todo = response.json()
+                todo_id = created_todo["todo"]["id"]
+                print(f"   Created todo with ID: {todo_id}")
+            else:
+                print(f"   Response: {response.text}")
+                return
+        except Exception as e:
+            print(f"❌ Create todo failed: {e}")
+            return
+
+        # Tests 4-7 are independent reads/writes, so issue them concurrently
+        async def get_specific():
+            response = await client.get(f"/todos/{todo_id}")
+            print(f"✅ Get specific todo: {response.status_code}")
+            print(f"   Todo title: {response.json()['title']}")
+
+        async def update_status():
+            response = await client.patch(f"/todos/{todo_id}/status", json={"status": "in_progress"})
+            print(f"✅ Update status: {response.status_code}")
+
+        async def get_stats():
+            response = await client.get("/todos/stats/summary")
+            print(f"✅ Get stats: {response.status_code}")
+            stats = response.json()
+            print(f"   Total todos: {stats['total_todos']}")
+            print(f"   Completion rate: {stats['completion_rate']}%")
+
+        async def search():
+            response = await client.get("/todos", params={"search": "FastAPI"})
+            print(f"✅ Search todos: {response.status_code}")
+            print(f"   Found {len(response.json())} matching todos")
+
+        async def semantic_search():
+            response = await client.get("/todos/semantic", params={"q": "fastapi tutorials"})
+            print(f"✅ Semantic search: {response.status_code}")
+            print(f"   Best match: {response.json()[0]['title']}")
+
+        async def combined_query():
+            response = await client.get("/todos", params={
+                "status": ["pending", "in_progress"], "min_priority": 3,
+                "sort": "updated_at", "order": "desc", "limit": 10
+            })
+            print(f"✅ Combined query: {response.status_code}")
+            print(f"   Found {len(response.json())} matching todos")
+
+        async def next_todos():
+            response = await client.get("/todos/next", params={"limit": 3})
+            print(f"✅ Next todos: {response.status_code}")
+            print(f"   Up next: {[todo['title'] for todo in response.json()]}")
+
+        async def sync_changes():
+            response = await client.get("/todos/changes", params={"limit": 100})
+            print(f"✅ Sync changes: {response.status_code}")
+            print(f"   {len(response.json()['todos'])} changed todos, cursor {response.json()['cursor']}")
+
+        async def tenant_isolation():
+            response = await client.get("/todos", params={"search": "FastAPI"}, headers={"X-Tenant": "test-tenant"})
+            print(f"✅ Tenant isolation: {response.status_code}")
+            print(f"   Found {len(response.json())} matching todos in another tenant")
+
+        async def snapshot_paging():
+            response = await client.get("/todos", params={"limit": 2, "snapshot": "new"})
+            snapshot = response.headers["X-Snapshot"]
+            response = await client.get("/todos", params={"limit": 2, "offset": 2, "snapshot": snapshot})
+            print(f"✅ Snapshot paging: {response.status_code}")
+            print(f"   Second page of snapshot {snapshot}: {[todo['id'] for todo in response.json()]}")
+
+        async def tag_filters():
+            response = await client.get("/todos", params={"tag": ["learning", "python"], "not_tag": "archived"})
+            print(f"✅ Tag filters: {response.status_code}")
+            print(f"   Found {len(response.json())} todos tagged learning and python")
+            response = await client.get("/todos/facets", params={"any_tag": ["learning"]})
+            print(f"   Tag facets: {response.json()['tags']}")
+
+        async def overdue():
+            await client.post("/todos", json={"title": "Past due", "due_at": "2020-01-01T00:00:00"})
+            response = await client.get("/todos/overdue", params={"limit": 5})
+            print(f"✅ Overdue todos: {response.status_code}")
+            print(f"   Overdue: {[todo['title'] for todo in response.json()]}")
+            response = await client.get("/todos/overdue/events")
+            print(f"   Overdue events since start: {len(response.json()['events'])}")
+
+        async def relations():
+            response = await client.post("/todos", json={"title": "Write tests", "blocked_by": [todo_id]})
+            blocked_id = response.json()["todo"]["id"]
+            response = await client.get(f"/todos/{todo_id}/graph")
+            print(f"✅ Todo graph: {response.status_code}")
+            print(f"   Blocks: {[todo['title'] for todo in response.json()['blocks']]}")
+            response = await client.put(f"/todos/{todo_id}", json={"blocked_by": [blocked_id]})
+            print(f"   Cycle refused: {response.status_code} {response.json()['detail']}")
+            response = await client.get("/todos/ready", params={"limit": 5})
+            print(f"   Ready: {[todo['title'] for todo in response.json()]}")
+
+        async def timeseries():
+            response = await client.get("/todos/stats/timeseries", params={"bucket": "minute", "range": "10m"})
+            print(f"✅ Timeseries: {response.status_code}")
+            print(f"   Last 10 minutes: {response.json()['totals']['created']} created, "
+                  f"{response.json()['totals']['completed']} completed")
+            response = await client.get("/todos/stats/timeseries", params={"bucket": "hour", "range": "60d"})
+            print(f"   Range too long: {response.status_code} {response.json()['detail']}")
+
+        async def analytics():
+            response = await client.get("/todos/analytics", params={"group_by": "priority"})
+            print(f"✅ Analytics: {response.status_code}")
+            for group in response.json()["groups"]:
+                print(f"   Priority {group['key']}: {group['count']} todos, mean age {group['mean_age_hours']} h")
+            response = await client.get("/todos/analytics", params={"group_by": "owner"})
+            print(f"   Unknown grouping: {response.status_code}")
+
+        async def idempotent_create():
+            headers = {"X-Tenant": "retries", "Idempotency-Key": "req-42"}
+            first = await client.post("/todos", json={"title": "Renew domain"}, headers=headers)
+            retry = await client.post("/todos", json={"title": "Renew domain"}, headers=headers)
+            print(f"✅ Idempotent create: {first.status_code}, retry {retry.status_code} "
+                  f"(replayed: {retry.headers.get('idempotent-replayed')}, same todo: {retry.json() == first.json()})")
+            reused = await client.post("/todos", json={"title": "Renew certificate"}, headers=headers)
+            print(f"   Key reused for another todo: {reused.status_code}")
+            duplicate = await client.post("/todos", params={"dedupe": "true"}, json={"title": "renew  DOMAIN"},
+                                          headers={"X-Tenant": "retries"})
+            print(f"   Duplicate: {duplicate.status_code} {duplicate.json()['message']} "
+                  f"(ID: {duplicate.json()['todo']['id']})")
+
+        checks = [get_specific, update_status, get_stats, search, semantic_search, combined_query, next_todos,
+                  sync_changes, tenant_isolation, snapshot_paging, tag_filters, overdue, relations, timeseries,
+                  analytics, idempotent_create]
+        results = await asyncio.gather(*(check() for check in checks), return_exceptions=True)
+        for check, result in zip(checks, results):
+            if isinstance(result, Exception):
+                print(f"❌ {check.__name__} failed: {result}")
+
     print("\n🎉 API testing completed!")
 
+
+def test_api():
+    asyncio.run(run_api_checks())
+
+
+async def run_compression_checks():
+    import gzip
+    import main
+    from content_encoding import ResponseCompressor, negotiate
+
+    assert negotiate("gzip;q=0.5, br;q=0, identity") == "gzip"
+    assert negotiate("identity, gzip;q=0") is None
+    assert negotiate("*") is not None
+
+    compressor = main.compressor
+    main.compressor = ResponseCompressor(min_size=256, cache_entries=8)
+    headers = {"Accept-Encoding": "gzip", "X-Tenant": "compression"}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url=BASE_URL) as client:
+            for i in range(20):
+                await client.post("/todos", json={"title": f"Compressed todo {i}"}, headers=headers)
+            first = await client.get("/todos", headers=headers)
+            assert first.headers["content-encoding"] == "gzip" and first.headers["vary"] == "Accept-Encoding"
+            assert len(first.json()) == 20
+            # Served from the precompressed cache until the next write
+            again = await client.get("/todos", headers=headers)
+            assert again.content == first.content and main.compressor.stats()["cache_hits"] == 1
+            await client.post("/todos", json={"title": "One more"}, headers=headers)
+            assert len((await client.get("/todos", headers=headers)).json()) == 21
+            plain = await client.get("/todos", headers={"Accept-Encoding": "identity", "X-Tenant": "compression"})
+            assert "content-encoding" not in plain.headers and len(plain.json()) == 21
+            small = await client.get("/todos/1", headers=headers)
+            assert "content-encoding" not in small.headers
+            raw = await client.get("/todos/stats/compression")
+            assert raw.json()["bytes_out"] < raw.json()["bytes_in"]
+        assert gzip.decompress(main.compressor.compress(b"x" * 1000, "gzip")) == b"x" * 1000
+    finally:
+        main.compressor = compressor
+    print("✅ Large listings are compressed and cached until the next write")
+
+
+def test_compression():
+    asyncio.run(run_compression_checks())
+
+
+async def run_unified_checks():
+    import json
+    import main
+    from unified import app
+
+    accept = {"Accept": "application/json, text/event-stream"}
+
+    async def rpc(client, headers, request_id, method, params):
+        response = await client.post("/mcp", headers=headers, json={
+            "jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        data = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+        return response, json.loads(data[0])["result"]
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL) as client:
+            response, _ = await rpc(client, accept, 0, "initialize", {
+                "protocolVersion": "2025-03-26", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"}})
+            session = {**accept, "Mcp-Session-Id": response.headers["mcp-session-id"]}
+            await client.post("/mcp", headers=session, json={"jsonrpc": "2.0", "method": "notifications/initialized"})
+            admitted = main.admission.stats()["admitted"]
+            _, created = await rpc(client, session, 1, "tools/call", {
+                "name": "create_todo", "arguments": {"title": "Written by an agent", "tenant": "unified"}})
+            todo_id = int(created["content"][0]["text"].split("ID: ")[1].split("\n")[0])
+            # The API reads the todo the agent just wrote, from the same store
+            read = await client.get(f"/todos/{todo_id}", headers={"X-Tenant": "unified"})
+            assert read.status_code == 200 and read.json()["title"] == "Written by an agent"
+            assert (await client.get("/todos/999999", headers={"X-Tenant": "unified"})).status_code == 404
+            await client.patch(f"/todos/{todo_id}/status", json={"status": "completed"}, headers={"X-Tenant": "unified"})
+            _, got = await rpc(client, session, 2, "tools/call", {
+                "name": "get_todo", "arguments": {"todo_id": todo_id, "tenant": "unified"}})
+            assert "COMPLETED" in got["content"][0]["text"]
+            # Tool calls and API requests go through one admission control
+            assert main.admission.stats()["admitted"] >= admitted + 4
+    print("✅ The API and the MCP server share one store in one process")
+
+
+def test_unified():
+    asyncio.run(run_unified_checks())
+
+
 if __name__ == "__main__":
-    print("Waiting for server to start...")
-    time.sleep(3)
     test_api()
-
+    test_compression()
+    test_unified()
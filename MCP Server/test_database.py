@@ -0,0 +1,872 @@
+#!/usr/bin/env python3
+"""
+Tests for the storage backends in database.py
+"""
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models import AnalyticsGroupBy, TodoCreate, TodoUpdate, TodoStatus, TodoQuery
+import database
+import rollups
+from bitmap_index import Bitmap
+from columnar import TodoColumns, summarize
+from database import IdempotencyConflict, IdempotencyTable, MemoryBackend, SQLiteBackend, decode_cursor
+from overdue import OverdueWatcher
+from sharding import ShardedBackend
+from todo_graph import DependencyGraph
+
+
+def check_backend(backend):
+    first = backend.create(TodoCreate(title="Write report", description="Quarterly numbers", priority=2))
+    second = backend.create(TodoCreate(title="Deploy service", status="in_progress"))
+    assert second.id > first.id
+    assert backend.get(first.id).title == "Write report"
+
+    updated = backend.update(first.id, TodoUpdate(status="completed"))
+    assert updated.status == TodoStatus.COMPLETED
+    assert updated.title == "Write report"
+    assert updated.created_at == first.created_at
+    assert backend.update(9999, TodoUpdate(status="completed")) is None
+
+    assert [t.id for t in backend.all()] == [first.id, second.id]
+    assert [t.id for t in backend.all(TodoStatus.COMPLETED)] == [first.id]
+    assert [t.id for t in backend.search("quarterly")] == [first.id]
+    assert [t.id for t in backend.fuzzy_search("deployment")] == [second.id]
+    assert [t.id for t in backend.fuzzy_search("qaurterly numbers")] == [first.id]
+    assert backend.fuzzy_search("deploy", threshold=1.0)[0].id == second.id
+    assert [t.id for t, _ in backend.semantic_search("deploying services")] == [second.id]
+
+    assert backend.delete(second.id)
+    assert not backend.delete(second.id)
+    assert backend.get(second.id) is None
+    assert backend.fuzzy_search("deploy") == []
+    assert backend.semantic_search("deploying services") == []
+
+
+def test_memory_backend():
+    print("🧪 Testing memory backend...")
+    check_backend(MemoryBackend())
+    print("✅ Memory backend works")
+
+
+def test_semantic_index_follows_mutations():
+    print("🧪 Testing semantic index maintenance...")
+    backend = MemoryBackend()
+    report = backend.create(TodoCreate(title="Write quarterly finance report"))
+    assert backend.semantic_search("finance reports")[0][0].id == report.id
+
+    # Built on the first query; later mutations update it in place
+    shopping = backend.create(TodoCreate(title="Grocery shopping"))
+    assert backend.semantic_search("shop")[0][0].id == shopping.id
+    backend.update(report.id, TodoUpdate(title="Plan team offsite"))
+    assert backend.semantic_search("finance reports") == []
+    backend.delete(shopping.id)
+    assert backend.semantic_search("shop") == []
+    assert len(backend.vectors) == 1
+    print("✅ Semantic index follows creates, updates and deletes")
+
+
+def fill(backend, count=60):
+    for i in range(count):
+        backend.create(TodoCreate(
+            title=f"deploy build {i}" if i % 7 == 0 else f"task {i}",
+            priority=i % 5 + 1,
+            status=["pending", "in_progress", "completed"][i % 3]
+        ))
+
+
+QUERIES = [
+    TodoQuery(),
+    TodoQuery(limit=5),
+    TodoQuery(statuses=["pending", "completed"], min_priority=4),
+    TodoQuery(statuses=["pending"], sort_by="priority", order="desc", limit=4),
+    TodoQuery(text="deploy", max_priority=2),
+    TodoQuery(text="deplyo biuld", text_mode="fuzzy", statuses=["in_progress"]),
+    TodoQuery(min_priority=5, max_priority=1),
+]
+
+
+def test_query_planner():
+    print("🧪 Testing the query planner...")
+    backend = MemoryBackend()
+    fill(backend)
+
+    plan = backend.query(TodoQuery(statuses=["pending"], min_priority=5, max_priority=5))[1]
+    # priority 5 (12 ids) is more selective than pending (20 ids), so it drives
+    assert plan[0] == "index priority 5-5: 12 ids", plan
+    assert plan[1].startswith("probe status in (pending)"), plan
+
+    for q in QUERIES:
+        expected = [t for t in backend.all() if
+                    (not q.statuses or t.status in q.statuses) and
+                    (q.min_priority or 1) <= t.priority <= (q.max_priority or 5)]
+        if q.text and q.text_mode == "substring":
+            expected = [t for t in expected if q.text in t.title]
+        todos = backend.query(q)[0]
+        if q.sort_by is None and q.text_mode == "substring":
+            assert todos == expected[:q.limit], q
+        assert {t.id for t in todos} <= {t.id for t in expected}, q
+    print("✅ Planner picks the most selective index and returns correct results")
+
+
+def test_sqlite_backend_shared_between_connections():
+    print("🧪 Testing SQLite backend...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "todos.db")
+        writer = SQLiteBackend(path)
+        check_backend(writer)
+
+        # A second connection stands in for another worker process
+        reader = SQLiteBackend(path)
+        todo = writer.create(TodoCreate(title="Shared todo"))
+        assert reader.get(todo.id).title == "Shared todo"
+        reader.update(todo.id, TodoUpdate(priority=5))
+        assert writer.get(todo.id).priority == 5
+
+        writer.close()
+        reader.close()
+        assert SQLiteBackend(path).get(todo.id) is not None
+    print("✅ SQLite backend shares data between connections")
+
+
+def test_sqlite_query_matches_memory():
+    print("🧪 Testing SQLite queries against the memory backend...")
+    with tempfile.TemporaryDirectory() as tmp:
+        memory, sqlite = MemoryBackend(), SQLiteBackend(os.path.join(tmp, "todos.db"))
+        fill(memory)
+        fill(sqlite)
+        for q in QUERIES:
+            assert [t.id for t in memory.query(q)[0]] == [t.id for t in sqlite.query(q)[0]], q
+        sqlite.close()
+    print("✅ Both backends answer queries identically")
+
+
+def test_sharded_backend_matches_memory():
+    print("🧪 Testing the sharded backend against the memory backend...")
+    memory, sharded = MemoryBackend(), ShardedBackend("test", shards=3)
+    # Tenants share the shard processes but not their todos
+    crud, changes = ShardedBackend("crud", shards=3), ShardedBackend("changes", shards=3)
+    try:
+        check_backend(crud)
+        check_changes(changes)
+        for backend in (memory, sharded):
+            fill(backend)
+            backend.update(12, TodoUpdate(priority=5, title="deploy hotfix"))
+            backend.delete(20)
+
+        def ids(todos):
+            return [t.id for t in todos]
+        for q in QUERIES:
+            assert ids(memory.query(q)[0]) == ids(sharded.query(q)[0]), q
+        assert ids(memory.all("pending")) == ids(sharded.all("pending"))
+        assert ids(memory.fuzzy_search("deplyo")) == ids(sharded.fuzzy_search("deplyo"))
+        assert ids(memory.next(["pending", "in_progress"], 7)) == ids(sharded.next(["pending", "in_progress"], 7))
+        assert memory.counts() == sharded.counts()
+    finally:
+        for backend in (sharded, crud, changes):
+            backend.close()
+    print("✅ Sharded fan-out and merges give the same answers")
+
+
+def test_next_todos():
+    print("🧪 Testing the next-todos queues...")
+    with tempfile.TemporaryDirectory() as tmp:
+        memory, sqlite = MemoryBackend(), SQLiteBackend(os.path.join(tmp, "todos.db"))
+        for backend in (memory, sqlite):
+            fill(backend)
+            # Moving a todo between queues must be reflected immediately
+            backend.update(2, TodoUpdate(priority=5))
+            backend.update(5, TodoUpdate(status="completed"))
+            backend.delete(10)
+        for statuses in (["pending"], ["pending", "in_progress"]):
+            expected = sorted((t for t in memory.all() if t.status in statuses),
+                              key=lambda t: (-t.priority, t.created_at, t.id))
+            assert memory.next(statuses, 8) == expected[:8], statuses
+            assert [t.id for t in sqlite.next(statuses, 8)] == [t.id for t in expected[:8]], statuses
+        assert len(memory.next(["pending"], 1000)) == len(memory.all("pending"))
+        sqlite.close()
+    print("✅ Next todos come highest priority first, oldest first")
+
+
+def check_changes(backend):
+    first = backend.create(TodoCreate(title="Write report"))
+    second = backend.create(TodoCreate(title="Deploy service"))
+    page = backend.changes_since(None, limit=1)
+    assert [t.id for t in page.todos] == [first.id] and page.has_more
+    page = backend.changes_since(decode_cursor(page.cursor), limit=10)
+    assert [t.id for t in page.todos] == [second.id] and not page.has_more
+    cursor = page.cursor
+
+    backend.update(first.id, TodoUpdate(status="completed"))
+    backend.delete(second.id)
+    page = backend.changes_since(decode_cursor(cursor), limit=10)
+    assert [t.id for t in page.todos] == [first.id] and page.deleted == [second.id]
+    assert not page.full_resync
+    assert backend.changes_since(decode_cursor(page.cursor), limit=10).todos == []
+
+
+def test_changes_since():
+    print("🧪 Testing incremental sync...")
+    check_changes(MemoryBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        check_changes(sqlite)
+        sqlite.close()
+    print("✅ Both backends page through updates and deletions in change order")
+
+
+def test_tenant_partitions():
+    print("🧪 Testing tenant partitions...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "todos.db")
+        for kind in ("memory", "sqlite"):
+            database.configure(kind, path)
+            try:
+                with database.tenant("acme"):
+                    first = database.create_todo(TodoCreate(title="Acme todo"))
+                with database.tenant("globex"):
+                    # Ids and indexes are per tenant
+                    assert database.create_todo(TodoCreate(title="Globex todo")).id == first.id
+                    assert [t.title for t in database.search_todos("todo")] == ["Globex todo"]
+                with database.tenant("acme"):
+                    assert database.get_todo_by_id(first.id).title == "Acme todo"
+                assert database.get_all_todos() == []
+            finally:
+                database.close()
+        assert os.path.exists(database.tenant_path(path, "acme"))
+        database.configure()
+    try:
+        with database.tenant("../escape"):
+            raise AssertionError("invalid tenant name accepted")
+    except ValueError:
+        pass
+    print("✅ Tenants get separate ids, indexes and files")
+
+
+async def check_async_store():
+    store = database.AsyncStore()
+    store.CHUNK = 2  # several chunks, to exercise the hand-back to the event loop
+    first = await store.create(TodoCreate(title="Async report", priority=4))
+    await store.create(TodoCreate(title="Async deploy", status="in_progress"))
+    await store.create(TodoCreate(title="Async review", priority=4))
+    assert (await store.get(first.id)).title == "Async report"
+    assert [t.title async for t in store.iter()] == ["Async report", "Async deploy", "Async review"]
+    assert [t.id async for t in store.iter_query(TodoQuery(min_priority=4))] == [first.id, first.id + 2]
+    assert [t.title for t in await store.next(limit=1)] == ["Async report"]
+    assert (await store.update(first.id, TodoUpdate(status="completed"))).status == TodoStatus.COMPLETED
+    assert (await store.counts())[TodoStatus.COMPLETED] == 1
+    assert await store.delete(first.id) and await store.get(first.id) is None
+
+
+def test_async_store():
+    print("🧪 Testing the async store...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("memory", "sqlite"):
+            database.configure(kind, os.path.join(tmp, "todos.db"))
+            try:
+                asyncio.run(check_async_store())
+            finally:
+                database.close()
+        database.configure()
+    print("✅ Async store works inline for memory and in threads for SQLite")
+
+
+async def check_coalescing():
+    store = database.AsyncStore()
+    await store.create(TodoCreate(title="Coalesced report"))
+    results = await asyncio.gather(*(store.search("report") for _ in range(10)), store.search("other"))
+    assert all(len(found) == 1 for found in results[:10]) and results[10] == []
+    stats = store.flights.stats()
+    assert stats["by_operation"]["search"] == {"requests": 11, "executions": 2, "coalesced": 9}
+
+    # A read that starts after a write never joins a run from before it
+    first = asyncio.ensure_future(store.search("report"))
+    await store.create(TodoCreate(title="Second report"))
+    second = await store.search("report")
+    assert len(second) == 2 and len(await first) in (1, 2)
+    assert store.flights.stats()["in_flight"] == 0
+
+
+def test_single_flight():
+    print("🧪 Testing request coalescing...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("memory", "sqlite"):
+            database.configure(kind, os.path.join(tmp, f"{kind}.db"))
+            try:
+                asyncio.run(check_coalescing())
+            finally:
+                database.close()
+        database.configure()
+    print("✅ Identical concurrent reads run once; writes start a new generation")
+
+
+
+def check_snapshots(backend):
+    fill(backend, 12)
+    snapshot = backend.pin(ttl=30)
+    before = [t.id for t in backend.query(TodoQuery())[0]]
+    page = TodoQuery(statuses=["pending"], limit=2, offset=1, snapshot=snapshot)
+    expected = backend.query(page)[0]
+
+    backend.update(4, TodoUpdate(status="completed"))
+    backend.update(3, TodoUpdate(status="pending", title="moved"))
+    backend.delete(7)
+    backend.create(TodoCreate(title="after the snapshot"))
+    # Pages of the snapshot are unaffected by writes made since
+    assert [t.id for t in backend.query(TodoQuery(snapshot=snapshot))[0]] == before
+    assert backend.query(page)[0] == expected
+    assert [t.id for t in backend.query(TodoQuery(statuses=["pending"], snapshot=snapshot))[0]] == [1, 4, 7, 10]
+    assert [t.id for t in backend.query(TodoQuery(statuses=["pending"]))[0]] == [1, 3, 10, 13]
+    assert [t.id for t in backend.query(TodoQuery(offset=10))[0]] == [12, 13]
+    try:
+        backend.query(TodoQuery(snapshot=snapshot + 12345))
+        raise AssertionError("unknown snapshot accepted")
+    except database.SnapshotExpired:
+        pass
+
+    # An expired lease releases the snapshot
+    short = backend.pin(ttl=0)
+    try:
+        backend.query(TodoQuery(snapshot=short))
+        raise AssertionError("expired snapshot accepted")
+    except database.SnapshotExpired:
+        pass
+
+
+def test_snapshots():
+    print("🧪 Testing snapshot reads...")
+    memory = MemoryBackend()
+    check_snapshots(memory)
+    assert memory.history
+    memory.snapshots.clear()
+    memory.update(1, TodoUpdate(priority=3))
+    memory._expire()
+    assert memory.history == {}, "old versions outlived their snapshots"
+    memory.update(2, TodoUpdate(priority=3))
+    assert memory.history == {}, "writes without snapshots keep old versions"
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        check_snapshots(sqlite)
+        sqlite.close()
+    sharded = ShardedBackend("snapshots", shards=3)
+    try:
+        check_snapshots(sharded)
+    finally:
+        sharded.close()
+    print("✅ Snapshot pages stay consistent under writes; old versions are collected")
+
+def check_tags(backend):
+    for title, tags in [("a", ["Bug", "ui"]), ("b", ["bug"]), ("c", []), ("d", ["ui", "docs"]), ("e", ["docs"])]:
+        backend.create(TodoCreate(title=title, tags=tags))
+    backend.update(5, TodoUpdate(tags=["docs", "bug"]))
+    backend.update(2, TodoUpdate(title="b2"))
+    backend.delete(4)
+
+    def ids(**filters):
+        return [t.id for t in backend.query(TodoQuery(**filters))[0]]
+    assert backend.get(1).tags == ["bug", "ui"] and backend.get(2).tags == ["bug"]
+    assert ids(tags_all=["bug"]) == [1, 2, 5]
+    assert ids(tags_all=["BUG", "docs"]) == [5]
+    assert ids(tags_any=["ui", "docs"]) == [1, 5]
+    assert ids(tags_none=["bug"]) == [3]
+    assert ids(tags_all=["bug"], tags_none=["ui"], order="desc", limit=1) == [5]
+    assert ids(tags_any=["missing"]) == []
+    assert backend.facets(TodoQuery()) == {"bug": 3, "docs": 1, "ui": 1}
+    assert backend.facets(TodoQuery(tags_none=["ui"], limit=1)) == {"bug": 2, "docs": 1}
+
+
+def test_tags():
+    print("🧪 Testing tag filters and facets...")
+    rng = random.Random(5)
+    for _ in range(20):
+        # Sizes on both sides of the switch between sorted arrays and bitmaps
+        a, b = (set(rng.sample(range(200_000), rng.choice([5, 3000, 9000]))) for _ in range(2))
+        left, right = Bitmap.from_ids(a), Bitmap.from_ids(b)
+        assert (left & right).ids() == sorted(a & b)
+        assert (left | right).ids() == sorted(a | b)
+        assert (left - right).ids() == sorted(a - b)
+        assert len(left) == len(a)
+    grown = Bitmap()
+    for todo_id in range(0, 20_000, 3):
+        grown.add(todo_id)
+    for todo_id in range(0, 20_000, 6):
+        grown.discard(todo_id)
+    assert grown.ids() == list(range(3, 20_000, 6)) and 9 in grown and 6 not in grown
+
+    memory = MemoryBackend()
+    check_tags(memory)
+    memory.create(TodoCreate(title="f", tags=["ui"]))
+    assert memory.tags is not None, "tag index not built on first use"
+    assert [t.id for t in memory.query(TodoQuery(tags_any=["ui"]))[0]] == [1, 6]
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        check_tags(sqlite)
+        sqlite.close()
+    sharded = ShardedBackend("tags", shards=3)
+    try:
+        check_tags(sharded)
+    finally:
+        sharded.close()
+    print("✅ Tag filters run as bitmap operations and agree across backends")
+
+
+def check_overdue(backend):
+    now = datetime.now()
+    for hours, status in [(-3, "pending"), (-1, "in_progress"), (-2, "completed"), (2, "pending"), (None, "pending")]:
+        due = now + timedelta(hours=hours) if hours is not None else None
+        backend.create(TodoCreate(title=f"due {hours}", status=status, due_at=due))
+    assert [t.id for t in backend.overdue(now)] == [1, 2]
+    assert [t.id for t in backend.overdue(now, 1)] == [1]
+    backend.update(1, TodoUpdate(status="completed"))
+    backend.update(3, TodoUpdate(status="pending"))
+    backend.update(5, TodoUpdate(due_at=now - timedelta(minutes=5)))
+    backend.update(2, TodoUpdate(due_at=None))
+    assert [t.id for t in backend.overdue(now)] == [3, 5]
+    assert backend.get(2).due_at is None
+    backend.delete(3)
+    assert [t.id for t in backend.came_due(now - timedelta(hours=1), now + timedelta(hours=3))] == [5, 4]
+
+
+def test_overdue():
+    print("🧪 Testing overdue todos...")
+    check_overdue(MemoryBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        check_overdue(sqlite)
+        sqlite.close()
+    sharded = ShardedBackend("overdue", shards=3)
+    try:
+        check_overdue(sharded)
+    finally:
+        sharded.close()
+
+    async def watch():
+        watcher = OverdueWatcher(tick=0)
+        heard = []
+        watcher.listen(lambda tenant, todos: heard.extend((tenant, todo.id) for todo in todos))
+        now = watcher.started
+        with database.tenant("deadlines"):
+            soon = await database.store.create(TodoCreate(title="soon", due_at=now + timedelta(minutes=1)))
+            await database.store.create(TodoCreate(title="late", due_at=now + timedelta(minutes=2)))
+            await database.store.create(TodoCreate(title="already late", due_at=now - timedelta(minutes=1)))
+            done = await database.store.create(TodoCreate(title="done", due_at=now + timedelta(minutes=1)))
+            await database.store.update(done.id, TodoUpdate(status="completed"))
+        assert await watcher.check(now + timedelta(seconds=90)) == 1
+        assert await watcher.check(now + timedelta(seconds=90)) == 0
+        assert await watcher.check(now + timedelta(minutes=5)) == 1
+        assert heard == [("deadlines", soon.id), ("deadlines", soon.id + 1)]
+        events = watcher.events_since("deadlines", after=1)
+        assert [event["title"] for event in events] == ["late"] and watcher.events_since("default") == []
+    asyncio.run(watch())
+
+    async def survive_failed_tick():
+        watcher = OverdueWatcher(tick=0.01)
+        ticks = []
+
+        async def check(now=None):
+            ticks.append(now)
+            if len(ticks) == 1:
+                raise RuntimeError("database is locked")
+            return 0
+
+        watcher.check = check
+        task = asyncio.create_task(watcher.run())
+        while len(ticks) < 3 and not task.done():
+            await asyncio.sleep(0.01)
+        assert not task.done(), "watcher stopped after a failed check"
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    asyncio.run(survive_failed_tick())
+    print("✅ Overdue todos come from the due index; passing deadlines emit one event each")
+
+
+def check_relations(backend):
+    epic = backend.create(TodoCreate(title="epic"))
+    design = backend.create(TodoCreate(title="design", parent_id=epic.id))
+    build = backend.create(TodoCreate(title="build", parent_id=epic.id, blocked_by=[design.id], priority=3))
+    loose = backend.create(TodoCreate(title="loose"))
+    assert [t.title for t in backend.ready()] == ["design", "loose"]
+    backend.update(design.id, TodoUpdate(status="completed"))
+    assert [t.title for t in backend.ready()] == ["build", "loose"]
+    assert [t.title for t in backend.ready(1)] == ["build"]
+    for todo_id, change in [
+        (design.id, TodoUpdate(blocked_by=[build.id])),   # build already waits for design
+        (epic.id, TodoUpdate(parent_id=design.id)),       # epic already waits for its child
+        (build.id, TodoUpdate(blocked_by=[build.id])),
+        (build.id, TodoUpdate(blocked_by=[999])),
+    ]:
+        try:
+            backend.update(todo_id, change)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"relation accepted: {todo_id} {change}")
+    try:
+        backend.create(TodoCreate(title="orphan", parent_id=999))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("parent that does not exist accepted")
+    relations = backend.relations(build.id)
+    assert relations.parent.id == epic.id and [t.id for t in relations.blocked_by] == [design.id]
+    assert relations.ready and relations.waiting_on == 0 and relations.children == []
+    relations = backend.relations(epic.id)
+    assert [t.id for t in relations.children] == [design.id, build.id]
+    assert not relations.ready and relations.waiting_on == 1
+    assert [t.id for t in backend.relations(design.id).blocks] == [build.id]
+
+    backend.update(build.id, TodoUpdate(status="completed"))
+    assert [t.title for t in backend.ready()] == ["epic", "loose"]
+    backend.update(build.id, TodoUpdate(status="in_progress"))
+    backend.update(loose.id, TodoUpdate(blocked_by=[build.id], parent_id=epic.id))
+    assert [t.title for t in backend.ready()] == ["build"]
+    backend.delete(design.id)
+    assert backend.relations(build.id).blocked_by == [] and backend.relations(999) is None
+    # The stale blocker id is kept, and does not stop other changes
+    assert backend.update(build.id, TodoUpdate(title="build it")).blocked_by == [design.id]
+    # Leaving the epic and waiting for it instead is no cycle: the parent edge goes in the same change
+    backend.update(loose.id, TodoUpdate(parent_id=None, blocked_by=[epic.id]))
+    assert [t.title for t in backend.ready()] == ["build it"]
+    backend.update(loose.id, TodoUpdate(blocked_by=[]))
+    assert [t.title for t in backend.ready()] == ["build it", "loose"]
+    # A completed todo still counts its open dependencies, though it is never ready
+    backend.update(epic.id, TodoUpdate(status="completed"))
+    relations = backend.relations(epic.id)
+    assert relations.waiting_on == 1 and not relations.ready
+
+
+def test_relations():
+    print("🧪 Testing todo relations and the ready set...")
+    # Cycle checks and the incremental ready set against recomputing both from scratch
+    rng = random.Random(11)
+    graph, todos = DependencyGraph(), {}
+
+    def dependencies(state):
+        waits = {todo_id: {b for b in blockers if b in state} for todo_id, (_, blockers, _) in state.items()}
+        for todo_id, (parent, _, _) in state.items():
+            if parent in state:
+                waits[parent].add(todo_id)
+        return waits
+
+    def has_cycle(state):
+        waits, done, active = dependencies(state), set(), set()
+
+        def visit(todo_id):
+            active.add(todo_id)
+            for other in waits[todo_id]:
+                if other in active or other not in done and visit(other):
+                    return True
+            active.discard(todo_id)
+            done.add(todo_id)
+            return False
+        return any(todo_id not in done and visit(todo_id) for todo_id in state)
+
+    def ready():
+        waits = dependencies(todos)
+        return {todo_id for todo_id, (_, _, is_open) in todos.items()
+                if is_open and not any(todos[other][2] for other in waits[todo_id])}
+
+    for step in range(2000):
+        todo_id = rng.choice(list(todos)) if todos and rng.random() < 0.6 else step + 1000
+        if todo_id in todos and rng.random() < 0.2:
+            del todos[todo_id]
+            graph.remove(todo_id)
+            todos = {i: (p if p != todo_id else None, b - {todo_id}, o) for i, (p, b, o) in todos.items()}
+        else:
+            parent, blockers, is_open = todos.get(todo_id, (None, set(), True))
+            if rng.random() < 0.5:
+                is_open = not is_open
+            elif todos:
+                parent = rng.choice(list(todos)) if rng.random() < 0.5 else None
+                blockers = set(rng.sample(list(todos), min(len(todos), rng.randint(0, 2))))
+                old_parent, old_blockers = todos.get(todo_id, (None, set(), True))[:2]
+                proposed = {**todos, todo_id: (parent, blockers, is_open)}
+                try:
+                    graph.check(todo_id, parent, blockers, old_parent, old_blockers)
+                except ValueError:
+                    assert todo_id in blockers or parent == todo_id or has_cycle(proposed), f"refused at {step}"
+                    continue
+                assert not has_cycle(proposed), f"cycle accepted at step {step}"
+            todos[todo_id] = (parent, blockers, is_open)
+            graph.put(todo_id, parent, blockers, (0, todo_id) if is_open else None)
+        assert graph.ready == ready(), f"ready set wrong after step {step}"
+        assert all(graph.level.get(other, 0) < graph.level.get(waiter, 0)
+                   for waiter in graph.nodes for other in graph.dependencies(waiter)), f"levels wrong at {step}"
+    loaded = DependencyGraph()
+    loaded.load((i, p, b, (0, i) if o else None) for i, (p, b, o) in reversed(list(todos.items())))
+    assert loaded.ready == graph.ready and loaded.waiting == graph.waiting
+
+    memory = MemoryBackend()
+    check_relations(memory)
+    assert memory.graph is not None, "dependency graph not built on first use"
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        check_relations(sqlite)
+        sqlite.close()
+    sharded = ShardedBackend("relations", shards=3)
+    try:
+        check_relations(sharded)
+    finally:
+        sharded.close()
+    print("✅ Relations refuse cycles, and the ready set follows status changes")
+
+
+
+def check_timeseries(backend):
+    todo = backend.create(TodoCreate(title="draft"))
+    backend.create(TodoCreate(title="done already", status="completed"))
+    backend.update(todo.id, TodoUpdate(status="in_progress"))
+    backend.update(todo.id, TodoUpdate(title="renamed"))  # no status change: not counted
+    backend.update(todo.id, TodoUpdate(status="completed"))
+    backend.delete(todo.id)
+    for resolution in rollups.RESOLUTIONS:
+        first, last = rollups.window(resolution, None, datetime.now())
+        series = rollups.series(resolution, first, backend.timeseries(resolution, first, last))
+        totals = series.totals
+        assert (totals["created"], totals["completed"], totals["deleted"]) == (2, 2, 1), (resolution, totals)
+        assert totals["pending_to_in_progress"] == totals["in_progress_to_completed"] == 1
+        assert sum(totals.values()) == 7
+        assert len(series.points) == last - first + 1 and series.points[-1].start <= datetime.now() < series.end
+
+
+def test_timeseries():
+    print("🧪 Testing activity rollups...")
+    # A ring of 5 one-minute buckets grows to its length, then reuses the oldest rows
+    ring, width = rollups.Ring(60, 5), len(rollups.METRICS)
+    ring.add(100, [0])
+    ring.add(100, [0])
+    ring.add(102, [1])
+    assert [row[:2] for row in ring.rows(99, 103)] == [[0, 0], [2, 0], [0, 0], [0, 1], [0, 0]]
+    assert len(ring.counts) == 3 * width
+    ring.add(106, [0])
+    ring.add(50, [0])  # older than the ring: dropped
+    assert len(ring.counts) == 5 * width
+    assert [row[:2] for row in ring.rows(100, 106)] == [[0, 0], [0, 0], [0, 1], [0, 0], [0, 0], [0, 0], [1, 0]]
+    ring.add(120, [2])
+    assert [row[2] for row in ring.rows(115, 120)] == [0, 0, 0, 0, 0, 1]
+
+    now = datetime(2026, 3, 1, 12, 30)
+    assert rollups.window("hour", "24h", now) == (rollups.bucket_of(now, 3600) - 23, rollups.bucket_of(now, 3600))
+    first, last = rollups.window("minute", "90m", now)
+    assert last - first + 1 == 90 and rollups.bucket_start(last, 60) == now
+    assert rollups.bucket_start(rollups.window("day", "1w", now)[0], 86400) == datetime(2026, 2, 23)
+    for resolution, span in [("hour", "31d"), ("day", "two weeks"), ("minute", "25h")]:
+        try:
+            rollups.window(resolution, span, now)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"range accepted: {resolution} {span}")
+
+    check_timeseries(MemoryBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "todos.db")
+        sqlite = SQLiteBackend(path)
+        check_timeseries(sqlite)
+        sqlite.close()
+        # The counters live in the database: another worker, or a restart, sees them
+        reopened = SQLiteBackend(path)
+        first, last = rollups.window("day", "2d", datetime.now())
+        assert sum(row[rollups.COLUMN["created"]] for row in reopened.timeseries("day", first, last)) == 2
+        reopened.close()
+    sharded = ShardedBackend("timeseries", shards=3)
+    try:
+        check_timeseries(sharded)
+    finally:
+        sharded.close()
+    print("✅ Activity rollups count every write, per minute, hour and day")
+
+
+
+def check_analytics(backend):
+    launch = backend.create(TodoCreate(title="launch", priority=3, tags=["web", "ops"]))
+    docs = backend.create(TodoCreate(title="docs", priority=3, tags=["web"]))
+    dropped = backend.create(TodoCreate(title="dropped", priority=1, tags=["ops"]))
+    backend.create(TodoCreate(title="review", priority=5, status="in_progress"))
+    backend.update(launch.id, TodoUpdate(status="completed"))
+    backend.update(docs.id, TodoUpdate(status="completed"))
+    backend.delete(dropped.id)
+    now = datetime.now()
+    expected = {
+        AnalyticsGroupBy.STATUS: [("in_progress", 1, 0), ("completed", 2, 2)],
+        AnalyticsGroupBy.PRIORITY: [("5", 1, 0), ("3", 2, 2)],
+        AnalyticsGroupBy.TAG: [("web", 2, 2), ("ops", 1, 1)],
+        AnalyticsGroupBy.NONE: [("all", 3, 2)],
+    }
+    for group_by, groups in expected.items():
+        report = summarize(group_by, backend.analytics(group_by, now), now)
+        assert report.total == 3 and [(g.key, g.count, g.completed) for g in report.groups] == groups, report
+        for group in report.groups:
+            assert 0 <= group.mean_age_hours < 1
+            assert (group.median_hours_to_complete is None) == (group.completed == 0)
+
+
+def test_analytics():
+    print("🧪 Testing columnar analytics...")
+    # The mirror's aggregates against plain Python over the same todos, through updates and deletes
+    rng = random.Random(9)
+    backend = MemoryBackend()
+    for i in range(500):
+        backend.create(TodoCreate(title=f"task {i}", priority=rng.randint(1, 5),
+                                  tags=rng.sample(["a", "b", "c", "d"], rng.randint(0, 2))))
+    backend.analytics(AnalyticsGroupBy.NONE, datetime.now())
+    assert backend.columns is not None, "columnar mirror not built on first use"
+    for _ in range(1000):
+        todo_id = rng.choice(list(backend.todos))
+        if rng.random() < 0.1:
+            backend.delete(todo_id)
+        else:
+            backend.update(todo_id, TodoUpdate(status=rng.choice(list(TodoStatus)), priority=rng.randint(1, 5),
+                                               tags=rng.sample(["a", "b", "c", "d"], rng.randint(0, 2))))
+    now = datetime.now()
+    columns = backend.columns
+    for group_by, key_of in [
+        (AnalyticsGroupBy.STATUS, lambda todo: [todo.status.value]),
+        (AnalyticsGroupBy.PRIORITY, lambda todo: [str(todo.priority)]),
+        (AnalyticsGroupBy.TAG, lambda todo: todo.tags),
+    ]:
+        total, groups = backend.analytics(group_by, now)
+        assert total == len(backend.todos)
+        expected = {}
+        for todo in backend.todos.values():
+            row = columns.row_of[todo.id]
+            for key in key_of(todo):
+                entry = expected.setdefault(key, [0, 0.0, []])
+                entry[0] += 1
+                entry[1] += (now - todo.created_at).total_seconds()
+                if todo.status == TodoStatus.COMPLETED:
+                    entry[2].append(columns.done[row] - columns.created[row])
+        assert set(groups) == set(expected), group_by
+        for key, (count, age, took) in groups.items():
+            assert count == expected[key][0] and abs(age - expected[key][1]) < 1e-3 * count
+            assert list(took) == sorted(expected[key][2]), (group_by, key)
+    # Completion time is kept while a completed todo is edited, and cleared when it is reopened
+    todo = backend.create(TodoCreate(title="timed"))
+    completed = backend.update(todo.id, TodoUpdate(status="completed"))
+    backend.update(todo.id, TodoUpdate(title="timed, renamed"))
+    row = backend.columns.row_of[todo.id]
+    assert backend.columns.done[row] == (completed.updated_at - datetime(1970, 1, 1)).total_seconds()
+    backend.update(todo.id, TodoUpdate(status="pending"))
+    assert np.isnan(backend.columns.done[backend.columns.row_of[todo.id]])
+    mirror = TodoColumns()
+    mirror.add_many(backend.todos.values())
+    assert len(mirror) == len(backend.columns) == len(backend.todos)
+
+    check_analytics(MemoryBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteBackend(os.path.join(tmp, "todos.db"))
+        check_analytics(sqlite)
+        sqlite.close()
+    sharded = ShardedBackend("analytics", shards=3)
+    try:
+        check_analytics(sharded)
+    finally:
+        sharded.close()
+    print("✅ Group-by aggregates from the columnar mirror match the todos")
+
+
+def check_create_once(backend):
+    first = backend.create_once(TodoCreate(title="Book  flights", description="For the offsite"), "retry-1")
+    assert not (first.duplicate or first.replayed)
+    # A retry gets the first result back, even after the todo changed; nothing new is written
+    backend.update(first.todo.id, TodoUpdate(status="in_progress"))
+    replay = backend.create_once(TodoCreate(title="Book  flights", description="For the offsite"), "retry-1")
+    assert replay.replayed and replay.todo == first.todo
+    try:
+        backend.create_once(TodoCreate(title="Book hotels"), "retry-1")
+        raise AssertionError("reused key accepted")
+    except IdempotencyConflict:
+        pass
+    # Deduplication ignores case and whitespace, and follows edits and deletes
+    same = backend.create_once(TodoCreate(title="book flights ", description="for the  OFFSITE"), None, True)
+    assert same.duplicate and same.todo.id == first.todo.id
+    other = backend.create_once(TodoCreate(title="Book flights"), "retry-2", True)
+    assert not other.duplicate
+    backend.update(first.todo.id, TodoUpdate(title="Book trains"))
+    moved = backend.create_once(TodoCreate(title="Book trains", description="For the offsite"), None, True)
+    assert moved.duplicate and moved.todo.title == "Book trains"
+    backend.delete(first.todo.id)
+    fresh = backend.create_once(TodoCreate(title="Book trains", description="For the offsite"), "retry-3", True)
+    assert not fresh.duplicate and fresh.todo.id != first.todo.id
+    again = backend.create_once(TodoCreate(title="Book trains", description="For the offsite"), "retry-3", True)
+    assert again.replayed and not again.duplicate and again.todo.id == fresh.todo.id
+    assert len(backend.all()) == 2
+
+
+def test_create_once():
+    print("🧪 Testing idempotent and deduplicated creates...")
+    check_create_once(MemoryBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "todos.db")
+        sqlite = SQLiteBackend(path)
+        check_create_once(sqlite)
+        # Another worker finds the keys and content hashes, including those of todos hashed late
+        sqlite.create(TodoCreate(title="Written before hashing"))
+        sqlite.conn.execute("DELETE FROM todo_contents")
+        worker = SQLiteBackend(path)
+        retry = worker.create_once(TodoCreate(title="Book trains", description="For the offsite"), "retry-3", True)
+        assert retry.replayed and retry.todo.title == "Book trains"
+        assert worker.create_once(TodoCreate(title="written before  hashing"), None, True).duplicate
+        assert worker.create_once(TodoCreate(title="Book flights"), None, True).duplicate
+        worker.close()
+        sqlite.close()
+    sharded = ShardedBackend("create-once", shards=3)
+    try:
+        check_create_once(sharded)
+    finally:
+        sharded.close()
+
+    # The key table forgets the oldest keys beyond its limit and expired ones
+    table = IdempotencyTable(limit=3, ttl=60)
+    for key in "abcd":
+        table.put(key, "input", database.Created(None))
+    assert list(table.entries) == ["b", "c", "d"] and table.get("a", "input") is None
+    assert table.get("d", "input").replayed
+    table = IdempotencyTable(limit=3, ttl=0)
+    table.put("a", "input", database.Created(None))
+    assert table.get("a", "input") is None and len(table) == 0
+
+    async def replayed_once():
+        store = database.AsyncStore()
+        with database.tenant("create-once"):
+            notified = []
+            store.listen(lambda tenant, todo_id, todo, old: notified.append(todo_id))
+            results = [await store.create_once(TodoCreate(title="ship"), "retry", True) for _ in range(3)]
+            assert [r.replayed for r in results] == [False, True, True] and len(notified) == 1
+            assert len(await store.all()) == 1
+
+    database.configure("memory")
+    try:
+        asyncio.run(replayed_once())
+    finally:
+        database.configure()
+    print("✅ Retries replay the first result and duplicates are reported, on every backend")
+
+
+if __name__ == "__main__":
+    test_memory_backend()
+    test_semantic_index_follows_mutations()
+    test_query_planner()
+    test_sqlite_backend_shared_between_connections()
+    test_sqlite_query_matches_memory()
+    test_sharded_backend_matches_memory()
+    test_next_todos()
+    test_changes_since()
+    test_tenant_partitions()
+    test_async_store()
+    test_single_flight()
+    test_snapshots()
+    test_tags()
+    test_overdue()
+    test_relations()
+    test_timeseries()
+    test_analytics()
+    test_create_once()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Tests for the MCP server tool handlers
+"""
+import asyncio
+import json
+import subprocess
+import sys
+
+import httpx
+from mcp.shared.exceptions import McpError
+
+import mcp_server
+
+
+def call(name, **arguments):
+    result = asyncio.run(mcp_server.handle_call_tool(name, arguments))
+    return result.content[0].text
+
+
+def test_storage_loads_lazily():
+    print("🧪 Testing that importing the server skips the storage layer...")
+    code = "import sys, mcp_server; print('database' in sys.modules, 'models' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"], output
+    print("✅ database and models are imported on first tool call")
+
+
+def test_tool_calls():
+    print("🧪 Testing MCP tool calls...")
+    text = call("create_todo", title="MCP handler test", priority=4)
+    assert "created successfully" in text
+    todo_id = int(text.split("ID: ")[1].split("\n")[0])
+    assert "MCP handler test" in call("get_todo", todo_id=todo_id)
+    assert "Total todos" in call("get_todo_stats")
+    assert "MCP handler test" in call("search_todos", query="handlr tset", mode="fuzzy")
+    assert "No todos found" in call("search_todos", query="handlr tset")
+    assert "MCP handler test" in call("semantic_search_todos", query="testing handlers")
+    assert "MCP handler test" in call("query_todos", statuses=["pending"], min_priority=4, text="handler")
+    assert "Found 0 todos" in call("query_todos", max_priority=3, text="handler")
+    assert "MCP handler test" in call("next_todos", limit=100)
+    assert "deleted successfully" in call("delete_todo", todo_id=todo_id)
+    assert "Input validation error: 'title' is a required property" in call("create_todo", priority=3)
+    print("✅ MCP tool calls work")
+
+
+def test_tenants_are_separate():
+    print("🧪 Testing tenant partitions...")
+    text = call("create_todo", title="Acme launch plan", tenant="acme")
+    todo_id = int(text.split("ID: ")[1].split("\n")[0])
+    assert "Acme launch plan" in call("list_todos", tenant="acme")
+    assert "Acme launch plan" not in call("list_todos", tenant="globex")
+    assert "Acme launch plan" not in call("list_todos")
+    assert "not found" in call("get_todo", todo_id=todo_id, tenant="globex")
+    result = asyncio.run(mcp_server.handle_call_tool("list_todos", {"tenant": "../etc"}))
+    assert result.isError and "invalid tenant" in result.content[0].text
+    print("✅ Each tenant sees only its own todos")
+
+
+
+def test_rendered_text_follows_updates():
+    print("🧪 Testing cached todo text...")
+    import database
+    from models import TodoUpdate
+    text = call("create_todo", title="Render me", tenant="render")
+    todo_id = int(text.split("ID: ")[1].split("\n")[0])
+    assert f"• Render me (ID: {todo_id}, Status: " in call("list_todos", tenant="render")
+    hits = mcp_server.rendered.hits
+    call("list_todos", tenant="render")
+    assert mcp_server.rendered.hits > hits
+    call("update_todo_status", todo_id=todo_id, status="completed", tenant="render")
+    assert "COMPLETED" in call("list_todos", tenant="render")
+    # Writes that bypass the MCP tools are noticed through updated_at
+    with database.tenant("render"):
+        database.update_todo(todo_id, TodoUpdate(title="Renamed elsewhere"))
+    assert "Renamed elsewhere" in call("get_todo", todo_id=todo_id, tenant="render")
+    assert "Renamed elsewhere" in call("search_todos", query="Renamed", tenant="render")
+    call("delete_todo", todo_id=todo_id, tenant="render")
+    assert all(todo_id not in cache for (name, _), cache in mcp_server.rendered.caches.items() if name == "render")
+    print("✅ Rendered text is reused until the todo changes")
+
+
+def test_snapshot_paging():
+    print("🧪 Testing snapshot paging...")
+    for i in range(4):
+        call("create_todo", title=f"Paged {i}", tenant="paging")
+    first = call("list_todos", limit=2, snapshot="new", tenant="paging")
+    snapshot = int(first.split("Snapshot: ")[1].split()[0])
+    call("delete_todo", todo_id=3, tenant="paging")
+    call("create_todo", title="Paged late", tenant="paging")
+    second = call("list_todos", limit=2, offset=2, snapshot=snapshot, tenant="paging")
+    assert "Paged 2" in second and "Paged 3" in second and "Paged late" not in second
+    assert "Paged 2" not in call("list_todos", tenant="paging")
+    assert "expired" in call("list_todos", snapshot=snapshot + 1000, tenant="paging")
+    print("✅ Pages of a snapshot ignore later writes")
+
+
+def test_filter_by_tags():
+    print("🧪 Testing tags...")
+    call("create_todo", title="Fix login", tags=["bug", "Auth"], tenant="tags")
+    call("create_todo", title="Fix layout", tags=["bug", "ui"], tenant="tags")
+    created = call("create_todo", title="Write guide", tags=["docs"], tenant="tags")
+    assert "Tags: docs" in created
+    text = call("filter_by_tags", all=["bug"], none=["ui"], tenant="tags")
+    assert "Fix login" in text and "Fix layout" not in text and "Tags: bug, auth" in text
+    assert "Tags among all matches: auth (1), bug (1)" in text
+    assert "bug (2)" in call("filter_by_tags", any=["bug", "docs"], tenant="tags")
+    call("update_todo", todo_id=3, tags=["bug"], tenant="tags")
+    assert "Write guide" in call("filter_by_tags", all=["bug"], tenant="tags")
+    assert "Tags: bug" in call("get_todo", todo_id=3, tenant="tags")
+    assert "Fix layout" in call("query_todos", tags_any=["ui"], tenant="tags")
+    assert call("filter_by_tags", all=["missing"], tenant="tags") == "No todos have those tags"
+    print("✅ Todos are found by tag combinations, with per-tag counts")
+
+
+def test_overdue_todos():
+    print("🧪 Testing overdue todos...")
+    assert call("overdue_todos", tenant="due") == "No todos are overdue"
+    call("create_todo", title="File taxes", due_at="2020-04-15T12:00:00", tenant="due")
+    call("create_todo", title="Renew passport", due_at="2099-01-01T00:00:00", tenant="due")
+    created = call("create_todo", title="Pay rent", due_at="2021-01-01T09:00:00", tenant="due")
+    assert "Due: 2021-01-01 09:00:00" in created
+    text = call("overdue_todos", tenant="due")
+    assert text.index("File taxes") < text.index("Pay rent") and "Renew passport" not in text
+    call("update_todo_status", todo_id=1, status="completed", tenant="due")
+    call("update_todo", todo_id=3, due_at=None, tenant="due")
+    assert call("overdue_todos", tenant="due") == "No todos are overdue"
+    print("✅ Overdue todos are listed most overdue first")
+
+
+def test_todo_relations():
+    print("🧪 Testing todo relations...")
+    call("create_todo", title="Launch", tenant="graph")
+    call("create_todo", title="Write docs", parent_id=1, tenant="graph")
+    created = call("create_todo", title="Ship release", parent_id=1, blocked_by=[2], priority=4, tenant="graph")
+    assert "Parent: 1" in created and "Blocked by: 2" in created
+    assert "Write docs" in call("ready_todos", tenant="graph") and "Ship" not in call("ready_todos", tenant="graph")
+    refused = call("update_todo", todo_id=2, blocked_by=[3], tenant="graph")
+    assert refused.startswith("Error executing tool") and "cycle" in refused
+    call("update_todo_status", todo_id=2, status="completed", tenant="graph")
+    assert call("ready_todos", tenant="graph").splitlines()[2].startswith("• Ship release")
+    graph = call("todo_graph", todo_id=1, tenant="graph")
+    assert "waiting on 1 todos" in graph and "Children:" in graph and "Ship release" in graph
+    assert "Ready to start: yes" in call("todo_graph", todo_id=3, tenant="graph")
+    call("update_todo", todo_id=3, parent_id=None, tenant="graph")
+    assert "Children:\n• Write docs" in call("todo_graph", todo_id=1, tenant="graph")
+    print("✅ Relations refuse cycles and the ready list follows status changes")
+
+
+def test_todo_trends():
+    print("🧪 Testing todo trends...")
+    call("create_todo", title="Plan", tenant="trends")
+    call("create_todo", title="Review", tenant="trends")
+    call("update_todo_status", todo_id=1, status="completed", tenant="trends")
+    trends = call("get_todo_trends", bucket="hour", range="6h", tenant="trends")
+    assert "Totals: 2 created, 1 completed, 0 deleted" in trends
+    assert "Status changes: pending → completed 1" in trends and "of 6 hours without activity" in trends
+    assert call("get_todo_trends", bucket="minute", range="2d", tenant="trends").startswith("Error executing tool")
+    print("✅ Trends report created, completed and moved todos per bucket")
+
+
+def test_todo_analytics():
+    print("🧪 Testing todo analytics...")
+    call("create_todo", title="Fix login", priority=4, tags=["bug"], tenant="analytics")
+    call("create_todo", title="Fix logout", priority=4, tags=["bug"], tenant="analytics")
+    call("create_todo", title="Write guide", priority=2, tenant="analytics")
+    call("update_todo_status", todo_id=1, status="completed", tenant="analytics")
+    by_priority = call("todo_analytics", group_by="priority", tenant="analytics")
+    assert by_priority.startswith("📊 Todo analytics by priority (3 todos)")
+    assert "• 4: 2 todos, 1 completed, mean age 0 minutes, median time to complete 0 minutes" in by_priority
+    assert "• 2: 1 todos, 0 completed, mean age 0 minutes\n" not in by_priority and by_priority.endswith("0 minutes")
+    assert "• bug: 2 todos" in call("todo_analytics", group_by="tag", tenant="analytics")
+    assert call("todo_analytics", tenant="empty-analytics") == "No todos to analyse"
+    print("✅ Analytics report counts, ages and completion times per group")
+
+def test_create_todo_retries():
+    print("🧪 Testing idempotent create_todo retries...")
+    first = call("create_todo", title="Order laptops", priority=2, idempotency_key="order-1", tenant="retries")
+    assert call("create_todo", title="Order laptops", priority=2, idempotency_key="order-1", tenant="retries") == first
+    reused = call("create_todo", title="Order chairs", idempotency_key="order-1", tenant="retries")
+    assert reused.startswith("Error executing tool 'create_todo'") and "already used" in reused
+    duplicate = call("create_todo", title="order  LAPTOPS", dedupe=True, tenant="retries")
+    assert duplicate.startswith("⚠️ A todo with the same title and description already exists")
+    assert duplicate.split("ID: ")[1].split("\n")[0] == first.split("ID: ")[1].split("\n")[0]
+    assert call("list_todos", tenant="retries").startswith("Found 1 todos")
+    assert "Input validation error" in call("create_todo", title="Order desks", idempotency_key="", tenant="retries")
+    print("✅ Retried creates return the first result and duplicates name the existing todo")
+
+
+class RecordingSession:
+    """Stands in for a client session, keeping the resource notifications sent to it"""
+
+    def __init__(self):
+        self.updated = []
+
+    async def send_resource_updated(self, uri):
+        self.updated.append(str(uri))
+
+
+async def check_resources():
+    async def tool(name, **arguments):
+        return (await mcp_server.handle_call_tool(name, {**arguments, "tenant": "resources"})).content[0].text
+
+    uris = [resource.uri for resource in await mcp_server.handle_list_resources()]
+    assert "todo://list?status=pending" in [str(uri) for uri in uris]
+    templates = [template.uriTemplate for template in await mcp_server.handle_list_resource_templates()]
+    assert templates == ["todo://{id}{?tenant}", "todo://list{?status,limit,tenant}"]
+
+    first = int((await tool("create_todo", title="Subscribed todo")).split("ID: ")[1].split("\n")[0])
+    second = int((await tool("create_todo", title="Other todo")).split("ID: ")[1].split("\n")[0])
+    [content] = await mcp_server.handle_read_resource(f"todo://{first}?tenant=resources")
+    assert json.loads(content.content)["title"] == "Subscribed todo" and content.mime_type == "application/json"
+    [content] = await mcp_server.handle_read_resource("todo://list?status=pending&tenant=resources")
+    assert content.content.startswith("Found 2 todos") and "Other todo" in content.content
+    for bad in ("todo://list?status=done", "todo://abc", "https://example.com/1", f"todo://{first}?tenant=../x"):
+        try:
+            await mcp_server.handle_read_resource(bad)
+            raise AssertionError(f"read {bad}")
+        except McpError:
+            pass
+
+    session = RecordingSession()
+    current_session = mcp_server._current_session
+    mcp_server._current_session = lambda: session
+    try:
+        todo_uri, done_uri = f"todo://{first}?tenant=resources", "todo://list?status=completed&tenant=resources"
+        await mcp_server.handle_subscribe_resource(todo_uri)
+        await mcp_server.handle_subscribe_resource(done_uri)
+        await mcp_server.handle_subscribe_resource("todo://list?status=completed")
+        # A write that touches neither resource sends nothing
+        await tool("update_todo", todo_id=second, title="Other todo, renamed")
+        await asyncio.sleep(0.01)
+        assert session.updated == []
+        await tool("update_todo_status", todo_id=first, status="completed")
+        await tool("update_todo", todo_id=first, priority=5)
+        await asyncio.sleep(0.01)
+        assert sorted(set(session.updated)) == sorted([done_uri, todo_uri])
+        assert len(session.updated) <= 4
+        session.updated.clear()
+        await mcp_server.handle_unsubscribe_resource(todo_uri)
+        await tool("delete_todo", todo_id=first)
+        await asyncio.sleep(0.01)
+        # The deleted todo left the completed list; the todo itself is no longer subscribed
+        assert session.updated == [done_uri]
+    finally:
+        mcp_server._current_session = current_session
+
+
+def test_resources():
+    print("🧪 Testing todo resources and subscriptions...")
+    asyncio.run(check_resources())
+    print("✅ Resources read lazily, and subscribers hear only about the resources they chose")
+
+
+async def check_http_sessions():
+    from mcp_http import build_app
+
+    app = build_app(mcp_server.server)
+    headers = {"Accept": "application/json, text/event-stream"}
+
+    async def rpc(client, session_id, method, params, request_id=1):
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+        response = await client.post("/mcp", json=message, headers={**headers, "Mcp-Session-Id": session_id})
+        data = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+        return json.loads(data[0])["result"]
+
+    async def open_session(client):
+        response = await client.post("/mcp", headers=headers, json={
+            "jsonrpc": "2.0", "id": 0, "method": "initialize",
+            "params": {"protocolVersion": "2025-03-26", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"}},
+        })
+        session_id = response.headers["mcp-session-id"]
+        assert '"resources":{"subscribe":true' in response.text
+        await client.post("/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"},
+                          headers={**headers, "Mcp-Session-Id": session_id})
+        return session_id
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first, second = await open_session(client), await open_session(client)
+            assert first != second
+            created = await rpc(client, first, "tools/call", {
+                "name": "create_todo", "arguments": {"title": "Shared over HTTP", "tenant": "http"}})
+            assert "created successfully" in created["content"][0]["text"]
+            listed = await rpc(client, second, "tools/call", {
+                "name": "list_todos", "arguments": {"tenant": "http"}})
+            assert "Shared over HTTP" in listed["content"][0]["text"]
+            # Each session's calls went through a queue of its own
+            assert mcp_server.session_limits.stats()["sessions"] >= 2
+            assert (await client.delete("/mcp", headers={**headers, "Mcp-Session-Id": first})).status_code == 200
+            gone = await client.post("/mcp", headers={**headers, "Mcp-Session-Id": first},
+                                     json={"jsonrpc": "2.0", "id": 5, "method": "tools/list"})
+            assert gone.status_code == 404
+
+
+def test_http_sessions():
+    print("🧪 Testing the streamable HTTP transport...")
+    asyncio.run(check_http_sessions())
+    print("✅ Sessions over HTTP share one store and end when deleted")
+
+
+if __name__ == "__main__":
+    test_storage_loads_lazily()
+    test_tool_calls()
+    test_tenants_are_separate()
+    test_rendered_text_follows_updates()
+    test_snapshot_paging()
+    test_filter_by_tags()
+    test_overdue_todos()
+    test_todo_relations()
+    test_todo_trends()
+    test_todo_analytics()
+    test_create_todo_retries()
+    test_resources()
+    test_http_sessions()
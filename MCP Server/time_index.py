@@ -0,0 +1,70 @@
+"""
+Sorted timestamp index for recency queries
+
+Keeps (timestamp, id) pairs in a list ordered with bisect. Range lookups
+and counts cost O(log n); reading k results costs O(k). New timestamps are
+almost always the latest, so inserts usually append at the end, and moving
+an entry on update is a binary search plus one list deletion (a memmove).
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+Key = Tuple[datetime, int]
+
+
+class TimeIndex:
+    """(timestamp, id) pairs in ascending order"""
+
+    def __init__(self):
+        self.keys: List[Key] = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, timestamp: datetime, doc_id: int):
+        key = (timestamp, doc_id)
+        if not self.keys or key >= self.keys[-1]:
+            self.keys.append(key)
+        else:
+            insort(self.keys, key)
+
+    def remove(self, timestamp: datetime, doc_id: int):
+        key = (timestamp, doc_id)
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def bounds(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Tuple[int, int]:
+        """Positions of the entries with start <= timestamp < end"""
+        # (t,) sorts before every (t, id), so these find the first entry at or after t
+        low = bisect_left(self.keys, (start,)) if start is not None else 0
+        high = bisect_left(self.keys, (end,)) if end is not None else len(self.keys)
+        return low, max(low, high)
+
+    def count(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        low, high = self.bounds(start, end)
+        return high - low
+
+    def ids(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+            reverse: bool = False) -> List[int]:
+        """Ids with start <= timestamp < end, oldest first (or newest first)"""
+        low, high = self.bounds(start, end)
+        keys = self.keys[low:high]
+        if reverse:
+            keys.reverse()
+        return [doc_id for _, doc_id in keys]
+
+    def after(self, key: Optional[Key] = None) -> Iterator[Key]:
+        """Entries strictly after a (timestamp, id) position, oldest first"""
+        start = bisect_right(self.keys, key) if key is not None else 0
+        for i in range(start, len(self.keys)):
+            yield self.keys[i]
+
+    def oldest(self) -> Optional[Key]:
+        return self.keys[0] if self.keys else None
+
+    def trim(self, keep: int):
+        """Drop the oldest entries so at most `keep` remain"""
+        if len(self.keys) > keep:
+            del self.keys[:len(self.keys) - keep]
@@ -0,0 +1,251 @@
+"""
+Parent/child and "blocks" relations between todos, and the ready set
+
+Both relations are dependencies: a parent waits for its children, and a
+todo waits for the todos that block it. The graph keeps adjacency sets in
+both directions, so the neighbours of a todo are O(1) away whichever side
+asks.
+
+A todo is ready when it is not completed and none of the todos it depends
+on are open. Rather than re-deriving that from the whole graph, every open
+todo carries a count of its open dependencies. A status change adjusts the
+counts of the todo's direct dependents by one, and a todo enters or
+leaves the ready set when its count reaches or leaves zero. Completing a
+todo therefore costs O(its dependents), however large the graph.
+
+New relations are checked before they are stored. A relation may only
+point at an existing todo, and may not close a cycle: adding "a depends
+on b" is refused when a is already reachable from b. Walking everything
+b depends on would cost O(n) in a large project, so every todo carries a
+level, higher than the level of each todo it depends on (a pseudo-
+topological order). A dependency path only ever goes down in level, so
+b cannot reach a when b's level is not above a's: the common case, such
+as a new blocker that is older than the todo, needs no search at all.
+Otherwise the search from b skips every todo at or below a's level.
+Adding an edge lifts the waiter above its new dependency, and its
+dependents above it in turn, only as far as needed. Levels never go down
+when relations are removed, which keeps them valid, if less tight.
+
+Relations to deleted todos are dropped from the graph (a deleted blocker
+no longer blocks), while the todos keep the stale ids in their fields.
+"""
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Sort key of an open todo in ready listings: highest priority, then oldest
+Rank = Tuple[int, int]
+
+
+class DependencyGraph:
+    """Relations of one tenant's todos, with the set of todos ready to start"""
+
+    def __init__(self):
+        self.nodes: Set[int] = set()
+        self.parent: Dict[int, int] = {}
+        self.children: Dict[int, Set[int]] = {}
+        self.blocked_by: Dict[int, Set[int]] = {}
+        self.blocks: Dict[int, Set[int]] = {}
+        self.level: Dict[int, int] = {}
+        # Open todos -> their rank, and how many of their dependencies are open
+        self.open: Dict[int, Rank] = {}
+        self.waiting: Dict[int, int] = {}
+        self.ready: Set[int] = set()
+
+    def dependencies(self, node: int) -> List[int]:
+        """Todos `node` waits for: its children and its blockers"""
+        return [*self.children.get(node, ()), *self.blocked_by.get(node, ())]
+
+    def dependents(self, node: int) -> List[int]:
+        """Todos waiting for `node`: its parent and the todos it blocks"""
+        parent = self.parent.get(node)
+        return ([parent] if parent is not None else []) + list(self.blocks.get(node, ()))
+
+    def path(self, start: int, goal: int, skip: Set[Tuple[int, int]] = frozenset()) -> Optional[List[int]]:
+        """A chain of dependencies from start to goal, if there is one
+
+        Searches from both ends at once, down from start through what it
+        depends on and up from goal through what waits for it, one todo
+        from each side in turn, and stops when either side runs out. Only
+        todos strictly between the two levels can be on a chain, so both
+        searches skip everything else, and any (waiter, dependency) edge
+        in `skip`.
+        """
+        if start == goal:
+            return [start]
+        low, high = self.level.get(goal, 0), self.level.get(start, 0)
+        if high <= low:
+            return None
+        # Todo -> the neighbour it was reached from, on each side
+        ahead: Dict[int, Optional[int]] = {start: None}
+        behind: Dict[int, Optional[int]] = {goal: None}
+        sides = [([start], ahead, behind, self.dependencies, False), ([goal], behind, ahead, self.dependents, True)]
+        turn = 0
+        while True:
+            stack, seen, other_side, neighbours, upwards = sides[turn]
+            if not stack:
+                return None
+            node = stack.pop()
+            for neighbour in neighbours(node):
+                if neighbour in seen or not low < self.level.get(neighbour, 0) < high and neighbour not in other_side:
+                    continue
+                if skip and ((neighbour, node) if upwards else (node, neighbour)) in skip:
+                    continue
+                seen[neighbour] = node
+                if neighbour in other_side:
+                    chain, step = [], neighbour
+                    while step is not None:
+                        chain.append(step)
+                        step = ahead[step]
+                    chain.reverse()
+                    step = behind[neighbour]
+                    while step is not None:
+                        chain.append(step)
+                        step = behind[step]
+                    return chain
+                stack.append(neighbour)
+            turn = 1 - turn
+
+    def check(self, node: int, parent_id: Optional[int], blocked_by: Iterable[int],
+              old_parent_id: Optional[int] = None, old_blocked_by: Iterable[int] = ()):
+        """Raise ValueError unless `node` may change from the old relations to the new ones
+
+        Only the relations being added are checked: ones the todo already
+        has were checked when they were added, and may point at deleted
+        todos since. Relations being dropped are left out of the search.
+        """
+        old_blocked_by = set(old_blocked_by)
+        blockers = sorted(set(blocked_by) - old_blocked_by)
+        parent = parent_id if parent_id != old_parent_id else None
+        for other in ([parent] if parent is not None else []) + blockers:
+            if other == node:
+                raise ValueError(f"Todo {node} cannot depend on itself")
+            if other not in self.nodes:
+                raise ValueError(f"Todo {other} does not exist")
+        # Edges (waiter, dependency) this change removes
+        dropped = {(node, blocker) for blocker in old_blocked_by.difference(blocked_by)}
+        if parent_id != old_parent_id and old_parent_id is not None:
+            dropped.add((old_parent_id, node))
+        # (steps so far, todo to search from, todo that must not be reachable from it)
+        routes = [([node], blocker, node) for blocker in blockers]
+        if parent is not None:
+            # The parent will wait for node, and through it for node's new blockers
+            routes.append(([parent], node, parent))
+            routes.extend(([parent, node], blocker, parent) for blocker in blockers)
+        for steps, start, goal in routes:
+            if start != goal and goal not in self.parent and not self.blocks.get(goal):
+                # Nothing waits for the goal (say, a todo being created), so nothing leads back to it
+                continue
+            chain = self.path(start, goal, dropped)
+            if chain is not None:
+                cycle = " -> ".join(str(step) for step in steps + chain)
+                raise ValueError(f"That relation would create a dependency cycle: {cycle}")
+
+    def _lift(self, node: int, level: int):
+        """Raise node to at least `level`, and its dependents above it
+
+        Levels are a topological order everywhere but at the edge being
+        added, so taking the affected todos lowest (old) level first settles
+        each one before its dependents are looked at: every todo is raised
+        at most once, however many paths lead to it.
+        """
+        if self.level.get(node, 0) >= level:
+            return
+        needed = {node: level}
+        heap = [(self.level.get(node, 0), node)]
+        while heap:
+            _, node = heapq.heappop(heap)
+            level = needed.pop(node)
+            self.level[node] = level
+            for dependent in self.dependents(node):
+                if self.level.get(dependent, 0) <= level:
+                    if dependent not in needed:
+                        heapq.heappush(heap, (self.level.get(dependent, 0), dependent))
+                    needed[dependent] = max(needed.get(dependent, 0), level + 1)
+
+    def _count(self, node: int, delta: int):
+        """Change an open todo's count of open dependencies, moving it in or out of the ready set"""
+        if node not in self.open:
+            return
+        waiting = self.waiting[node] + delta
+        self.waiting[node] = waiting
+        if waiting == 0:
+            self.ready.add(node)
+        else:
+            self.ready.discard(node)
+
+    def _link(self, waiter: int, dependency: int, delta: int):
+        """Account for an edge appearing (+1) or disappearing (-1)"""
+        if dependency in self.open:
+            self._count(waiter, delta)
+
+    def put(self, node: int, parent_id: Optional[int], blocked_by: Iterable[int], rank: Optional[Rank]):
+        """Add or replace a todo: its relations, and rank while open (None once completed)"""
+        self.nodes.add(node)
+        # Status: an opened or completed todo changes its dependents' counts
+        was_open, is_open = node in self.open, rank is not None
+        if is_open:
+            self.open[node] = rank
+            if not was_open:
+                self.waiting[node] = sum(1 for dependency in self.dependencies(node) if dependency in self.open)
+                self._count(node, 0)
+        elif was_open:
+            del self.open[node], self.waiting[node]
+            self.ready.discard(node)
+        if was_open != is_open:
+            for dependent in self.dependents(node):
+                self._count(dependent, 1 if is_open else -1)
+
+        # Edges: the parent waits for node, and node for each blocker. Dropped
+        # edges go first, so the graph never holds the old and new ones together
+        old_parent = self.parent.get(node)
+        if parent_id not in self.nodes:
+            parent_id = None
+        old = self.blocked_by.get(node, set())
+        new = {blocker for blocker in blocked_by if blocker in self.nodes}
+        if parent_id != old_parent and old_parent is not None:
+            self.children[old_parent].discard(node)
+            self._link(old_parent, node, -1)
+            del self.parent[node]
+        for blocker in old - new:
+            self.blocks[blocker].discard(node)
+            self._link(node, blocker, -1)
+        if new:
+            self.blocked_by[node] = new
+        else:
+            self.blocked_by.pop(node, None)
+        if parent_id != old_parent and parent_id is not None:
+            self.parent[node] = parent_id
+            self.children.setdefault(parent_id, set()).add(node)
+            self._link(parent_id, node, 1)
+            self._lift(parent_id, self.level.get(node, 0) + 1)
+        for blocker in new - old:
+            self.blocks.setdefault(blocker, set()).add(node)
+            self._link(node, blocker, 1)
+            self._lift(node, self.level.get(blocker, 0) + 1)
+
+    def load(self, entries: Iterable[Tuple[int, Optional[int], Iterable[int], Optional[Rank]]]):
+        """Bulk-load (id, parent_id, blocked_by, rank) entries into an empty graph"""
+        entries = list(entries)
+        self.nodes.update(entry[0] for entry in entries)
+        for entry in entries:
+            self.put(*entry)
+
+    def remove(self, node: int):
+        """Drop a deleted todo and every relation to it"""
+        if node not in self.nodes:
+            return
+        self.put(node, None, (), None)
+        for child in self.children.pop(node, set()):
+            del self.parent[child]
+        for blocked in self.blocks.pop(node, set()):
+            self.blocked_by[blocked].discard(node)
+            if not self.blocked_by[blocked]:
+                del self.blocked_by[blocked]
+        self.nodes.discard(node)
+        self.level.pop(node, None)
+
+    def ready_ids(self, limit: Optional[int] = None) -> List[int]:
+        """Ready todos, highest priority then oldest first"""
+        if limit is None:
+            return sorted(self.ready, key=self.open.__getitem__)
+        return heapq.nsmallest(limit, self.ready, key=self.open.__getitem__)
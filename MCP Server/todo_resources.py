@@ -0,0 +1,145 @@
+"""
+Todos as MCP resources, and notifications for the ones a client subscribed to
+
+Two kinds of resource, each with an optional `tenant` query parameter:
+
+    todo://{id}                        one todo, as JSON
+    todo://list?status=...&limit=...   the todos (of one status), as text
+
+Nothing is materialised until a client reads a resource: resources/list
+names the lists only, single todos are reached through their template,
+and a list's text is joined from the rendered-text cache when read.
+
+A client that sends resources/subscribe for a URI gets a
+notifications/resources/updated for it each time a write changes what
+the resource would return. The store calls Subscriptions.changed after
+every create, update and delete with the todo before and after the write,
+which names the resources touched: the todo's own, the unfiltered list,
+and the lists of its old and new status. Only those are looked up, so a
+write costs O(resources it touches) whatever the number of subscriptions,
+and nothing polls.
+
+Notifications are sent from one flush task per session. Resources that
+change again while a flush is under way are sent once more after it, so
+a burst of writes turns into a few notifications, not one per write.
+"""
+import asyncio
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+if TYPE_CHECKING:
+    # Only for annotations: the MCP server imports this module before the models
+    from models import Todo
+
+SCHEME = "todo"
+STATUSES = ("pending", "in_progress", "completed")
+
+# (tenant, "todo" or "list", todo id or status; None for the unfiltered list)
+Key = Tuple[str, str, object]
+
+
+@dataclass(frozen=True)
+class TodoResource:
+    """A parsed todo:// URI"""
+    tenant: Optional[str]
+    todo_id: Optional[int] = None
+    status: Optional[str] = None
+    limit: Optional[int] = None
+
+    def key(self, tenant: str) -> Key:
+        """Subscription key, in the tenant the URI resolves to"""
+        if self.todo_id is not None:
+            return tenant, "todo", self.todo_id
+        return tenant, "list", self.status
+
+
+def parse(uri: str) -> TodoResource:
+    """The resource a todo:// URI names; ValueError when it names none"""
+    parts = urlsplit(str(uri))
+    if parts.scheme != SCHEME:
+        raise ValueError(f"Unknown resource {uri}: todo resources start with todo://")
+    query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+    unknown = set(query) - {"tenant", "status", "limit"}
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) in {uri}: {', '.join(sorted(unknown))}")
+    tenant = query.get("tenant")
+    if parts.netloc == "list" and parts.path in ("", "/"):
+        status = query.get("status")
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"Unknown status {status!r} in {uri}: use one of {', '.join(STATUSES)}")
+        limit = query.get("limit")
+        if limit is not None and not (limit.isdigit() and int(limit) > 0):
+            raise ValueError(f"Invalid limit {limit!r} in {uri}")
+        return TodoResource(tenant, status=status, limit=int(limit) if limit else None)
+    if parts.netloc.isdigit() and parts.path in ("", "/") and "status" not in query and "limit" not in query:
+        return TodoResource(tenant, todo_id=int(parts.netloc))
+    raise ValueError(f"Unknown resource {uri}: use todo://{{id}} or todo://list?status=...")
+
+
+def touched(tenant: str, todo_id: int, todo: Optional["Todo"], old: Optional["Todo"]) -> List[Key]:
+    """Resources whose content a write changed: `old` is None for a create, `todo` None for a delete"""
+    keys = [(tenant, "todo", todo_id), (tenant, "list", None)]
+    for version in (todo, old):
+        if version is not None:
+            key = (tenant, "list", getattr(version.status, "value", version.status))
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+class Subscriptions:
+    """Which client sessions subscribed to which resources, and the notifications owed to them"""
+
+    def __init__(self):
+        # Resource -> session -> the URIs it subscribed with (the notification repeats them)
+        self.subscribers: Dict[Key, "weakref.WeakKeyDictionary[object, Set[str]]"] = {}
+        # Session -> URIs changed since its last flush, and its running flush task
+        self.dirty: "weakref.WeakKeyDictionary[object, Set[str]]" = weakref.WeakKeyDictionary()
+        self.flushing: "weakref.WeakKeyDictionary[object, asyncio.Task]" = weakref.WeakKeyDictionary()
+        self.sent = 0
+
+    def subscribe(self, session: object, uri: str, key: Key):
+        self.subscribers.setdefault(key, weakref.WeakKeyDictionary()).setdefault(session, set()).add(str(uri))
+
+    def unsubscribe(self, session: object, uri: str, key: Key):
+        sessions = self.subscribers.get(key)
+        if sessions is None or session not in sessions:
+            return
+        sessions[session].discard(str(uri))
+        if not sessions[session]:
+            del sessions[session]
+        if not sessions:
+            del self.subscribers[key]
+
+    def count(self) -> int:
+        return sum(len(uris) for sessions in self.subscribers.values() for uris in sessions.values())
+
+    def changed(self, tenant: str, todo_id: int, todo: Optional["Todo"], old: Optional["Todo"]):
+        """Store listener: queue a notification for every subscription the write touched"""
+        for key in touched(tenant, todo_id, todo, old):
+            sessions = self.subscribers.get(key)
+            if not sessions:
+                continue
+            for session, uris in list(sessions.items()):
+                self.dirty.setdefault(session, set()).update(uris)
+                task = self.flushing.get(session)
+                if task is None or task.done():
+                    self.flushing[session] = asyncio.get_running_loop().create_task(self._flush(session))
+
+    async def _flush(self, session):
+        while True:
+            uris = self.dirty.pop(session, None)
+            if not uris:
+                return
+            for uri in uris:
+                try:
+                    await session.send_resource_updated(uri)
+                except Exception:
+                    # The session has gone: drop its subscriptions
+                    for sessions in self.subscribers.values():
+                        sessions.pop(session, None)
+                    self.dirty.pop(session, None)
+                    return
+                self.sent += 1
@@ -0,0 +1,99 @@
+"""
+Cached text rendering of todos for MCP tool responses
+
+Tool results are plain text, one line (or block) per todo. Formatting a
+line means several attribute lookups, enum and datetime formatting; for a
+listing of 100k todos that is most of the tool call. Each todo's rendered
+fragments are cached instead, one cache per (tenant, style) keyed by id,
+and a listing is the join of cached fragments.
+
+A cached fragment belongs to one version of a todo: every update sets a
+new updated_at, so a todo whose updated_at differs from the cached one is
+rendered again. That holds for writes made by any process. The MCP write
+tools also drop the entry at once, and deleted todos are forgotten.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations: the MCP server imports this module before the models
+    from models import Todo
+
+
+def _when(moment) -> str:
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+STYLES: Dict[str, Callable[["Todo"], str]] = {
+    "list": lambda todo: f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Priority: {todo.priority})",
+    "search": lambda todo: f"• {todo.title} (ID: {todo.id}, Status: {todo.status})",
+    "query": lambda todo: (f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Priority: {todo.priority}, "
+                           f"Updated: {todo.updated_at.isoformat(timespec='seconds')})"),
+    "tagged": lambda todo: (f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Priority: {todo.priority}, "
+                            f"Tags: {', '.join(todo.tags)})"),
+    "due": lambda todo: (f"• {todo.title} (ID: {todo.id}, Status: {todo.status}, Priority: {todo.priority}, "
+                         f"Due: {_when(todo.due_at)})"),
+    "next": lambda todo: f"{todo.title} (ID: {todo.id}, Priority: {todo.priority}, Status: {todo.status})",
+    "detail": lambda todo: (f"• ID: {todo.id}\n"
+                            f"• Title: {todo.title}\n"
+                            f"• Description: {todo.description or 'No description'}\n"
+                            f"• Status: {todo.status}\n"
+                            f"• Priority: {todo.priority}\n"
+                            f"• Created: {_when(todo.created_at)}\n"
+                            f"• Updated: {_when(todo.updated_at)}"
+                            + (f"\n• Tags: {', '.join(todo.tags)}" if todo.tags else "")
+                            + (f"\n• Due: {_when(todo.due_at)}" if todo.due_at else "")
+                            + (f"\n• Parent: {todo.parent_id}" if todo.parent_id else "")
+                            + (f"\n• Blocked by: {', '.join(map(str, todo.blocked_by))}" if todo.blocked_by else "")),
+}
+
+
+class TodoText:
+    """Rendered fragments per todo version, one cache per (tenant, style)"""
+
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        # (tenant, style) -> {id: (the todo rendered, its text)}
+        self.caches: Dict[Tuple[str, str], Dict[int, Tuple["Todo", str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lines(self, tenant: str, todos: Iterable["Todo"], style: str) -> List[str]:
+        """Each todo in the given style, ready to join"""
+        cache = self.caches.get((tenant, style))
+        if cache is None:
+            cache = self.caches[tenant, style] = {}
+        render = STYLES[style]
+        lines = []
+        misses = 0
+        for todo in todos:
+            entry = cache.get(todo.id)
+            if entry is not None and (entry[0] is todo or entry[0].updated_at == todo.updated_at):
+                lines.append(entry[1])
+                continue
+            misses += 1
+            if entry is None and len(cache) >= self.max_entries:
+                # Forget the oldest todo; it is rendered again if asked for
+                del cache[next(iter(cache))]
+            text = render(todo)
+            cache[todo.id] = (todo, text)
+            lines.append(text)
+        self.misses += misses
+        self.hits += len(lines) - misses
+        return lines
+
+    def line(self, tenant: str, todo: "Todo", style: str) -> str:
+        """One todo in the given style"""
+        return self.lines(tenant, (todo,), style)[0]
+
+    def forget(self, tenant: str, todo_id: int):
+        """Drop a todo's fragments after it changes or is deleted"""
+        for (name, _), cache in self.caches.items():
+            if name == tenant:
+                cache.pop(todo_id, None)
+
+    def stats(self) -> Dict[Hashable, int]:
+        return {
+            "entries": sum(len(cache) for cache in self.caches.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
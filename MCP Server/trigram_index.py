@@ -0,0 +1,113 @@
+"""
+Trigram index for fuzzy, typo-tolerant todo search
+
+Text is lower-cased and split into words; each word is padded with two
+spaces in front and one behind (as PostgreSQL's pg_trgm does) and cut into
+overlapping three-character grams. "deploy" becomes
+{"  d", " de", "dep", "epl", "plo", "loy", "oy "}.
+
+A document matches a query by the fraction of the query's trigrams it
+contains, so "deploy" finds "deployment" (6 of 7 grams) and "deplyo" still
+finds "deploy" (4 of 7), while long descriptions are not penalised for
+containing other words. Ties are broken by Jaccard similarity so shorter,
+closer texts rank first.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+DEFAULT_THRESHOLD = 0.5
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """The set of padded word trigrams in a piece of text"""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def score(query_grams: FrozenSet[str], doc_grams: FrozenSet[str]) -> Tuple[float, float]:
+    """(fraction of query trigrams in the document, Jaccard similarity)"""
+    if not query_grams or not doc_grams:
+        return 0.0, 0.0
+    shared = len(query_grams & doc_grams)
+    return shared / len(query_grams), shared / len(query_grams | doc_grams)
+
+
+def scan(docs: Iterable[Tuple[int, str]], query: str,
+         threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[int, float]]:
+    """Brute-force ranking without an index, for backends that keep none"""
+    query_grams = trigrams(query)
+    ranked = []
+    for doc_id, text in docs:
+        similarity, jaccard = score(query_grams, trigrams(text))
+        if similarity >= threshold and similarity > 0:
+            ranked.append((doc_id, similarity, jaccard))
+    ranked.sort(key=lambda item: (-item[1], -item[2], item[0]))
+    return [(doc_id, similarity) for doc_id, similarity, _ in ranked]
+
+
+class TrigramIndex:
+    """Inverted index from trigram to the ids of documents containing it
+
+    Maintained incrementally: add() and remove() touch only the postings of
+    the document's own trigrams.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.doc_grams: Dict[int, FrozenSet[str]] = {}
+
+    def __len__(self):
+        return len(self.doc_grams)
+
+    def add(self, doc_id: int, text: str):
+        """Index a document, replacing any previous text for the same id"""
+        grams = trigrams(text)
+        old = self.doc_grams.get(doc_id)
+        if old == grams:
+            return
+        if old is not None:
+            for gram in old - grams:
+                self._discard(gram, doc_id)
+            new = grams - old
+        else:
+            new = grams
+        for gram in new:
+            self.postings[gram].add(doc_id)
+        self.doc_grams[doc_id] = grams
+
+    def remove(self, doc_id: int):
+        for gram in self.doc_grams.pop(doc_id, ()):
+            self._discard(gram, doc_id)
+
+    def _discard(self, gram: str, doc_id: int):
+        ids = self.postings.get(gram)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del self.postings[gram]
+
+    def search(self, query: str, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[int, float]]:
+        """(id, similarity) pairs at or above the threshold, best first"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        # Count, per document, how many of the query's trigrams it contains
+        hits: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for doc_id in self.postings.get(gram, ()):
+                hits[doc_id] += 1
+
+        ranked = []
+        for doc_id, shared in hits.items():
+            similarity = shared / len(query_grams)
+            if similarity >= threshold:
+                doc_size = len(self.doc_grams[doc_id])
+                ranked.append((doc_id, similarity, shared / (len(query_grams) + doc_size - shared)))
+        ranked.sort(key=lambda item: (-item[1], -item[2], item[0]))
+        return [(doc_id, similarity) for doc_id, similarity, _ in ranked]
@@ -0,0 +1,54 @@
+"""
+The REST API and the MCP server in one process, on one event loop
+
+Run separately, main.py and mcp_server.py each import the storage layer
+and so each hold their own todos: with the in-memory backend an agent's
+writes never reach the API, and with SQLite they reach it through the
+database file. Here both are served by one ASGI app, so they share the
+store, its indexes and caches (the API's compressed listings are keyed by
+the store version, so they follow writes from either side), and one
+admission control, whose stats at /todos/stats/admission count tool calls
+too.
+
+Streamable HTTP requests to /mcp go straight to the MCP session manager,
+past the API's middleware: the response compression would buffer their
+SSE streams, and tool calls take the tenant from their arguments and run
+their own admission check.
+
+The MCP options come from the environment, like the storage settings,
+since uvicorn imports this module by name (see start_server.py --mcp):
+
+    TODO_MCP_MAX_SESSIONS=1000  TODO_MCP_SESSION_TIMEOUT=1800  TODO_MCP_JSON_RESPONSE=1
+"""
+import contextlib
+import os
+
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+
+import main
+import mcp_server
+from mcp_http import PATH, session_manager
+
+
+def build_app(max_sessions: int = 1000, session_timeout: float = 1800, json_response: bool = False) -> Starlette:
+    """The API at /, the MCP server at /mcp, sharing this process's store"""
+    # Tool calls count against the API's admission control: one concurrency budget, one set of stats
+    mcp_server.admission = main.admission
+    manager = session_manager(mcp_server.server, max_sessions, session_timeout, json_response)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Sessions end before the API's shutdown flushes the store
+        async with main.app.router.lifespan_context(main.app):
+            async with manager.run():
+                yield
+
+    return Starlette(routes=[Route(PATH, endpoint=manager.asgi_app), Mount("/", app=main.app)], lifespan=lifespan)
+
+
+app = build_app(
+    max_sessions=int(os.environ.get("TODO_MCP_MAX_SESSIONS", 1000)),
+    session_timeout=float(os.environ.get("TODO_MCP_SESSION_TIMEOUT", 1800)),
+    json_response=os.environ.get("TODO_MCP_JSON_RESPONSE", "") not in ("", "0"),
+)
@@ -0,0 +1,180 @@
+"""
+Local semantic search over todos with hashed bag-of-words vectors
+
+Each todo is embedded offline, without any model download: its words are
+lower-cased, stop words dropped and common suffixes stripped ("deployment",
+"deploying" and "deployed" all become "deploy"), and every remaining term
+and adjacent-term pair is hashed into one of `dimensions` buckets with a
++/-1 sign (the hashing trick). Term counts are log-scaled and each vector
+is L2-normalised. Queries are weighted by inverse document frequency, so
+rare, meaningful terms dominate the ranking.
+
+Vectors live in one contiguous float32 matrix of shape (dimensions,
+capacity): each dimension is a contiguous row over all todos. A query only
+touches the rows of its own non-zero dimensions, so scoring a few-word query
+against a million todos is a handful of vectorised multiply-adds over
+contiguous memory, followed by a top-k selection on the best candidates.
+"""
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+DEFAULT_DIMENSIONS = 256
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ments", "ment", "ings", "ing", "ations", "ation", "ers", "er", "ies", "ed", "es", "s", "e")
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have in into is it its of on or that the this
+    to was were will with i we you our my your me us do does did not no so up out about
+""".split())
+
+
+def stem(word: str) -> str:
+    """Strip one common English suffix, keeping at least three letters"""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # "shopping" -> "shopp" -> "shop"
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    return word
+
+
+def terms(text: str) -> List[str]:
+    """Stemmed content words followed by adjacent word pairs"""
+    words = [stem(w) for w in _WORD.findall(text.lower()) if w not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class VectorIndex:
+    """Hashed term vectors for a set of documents, in one NumPy matrix"""
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS, capacity: int = 1024):
+        self.dimensions = dimensions
+        self.matrix = np.zeros((dimensions, capacity), dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.rows: Dict[int, int] = {}
+        self.count = 0
+        # Number of documents with a non-zero value in each dimension, for IDF
+        self.df = np.zeros(dimensions, dtype=np.int64)
+
+    def __len__(self):
+        return self.count
+
+    def _features(self, text: str) -> Dict[int, float]:
+        features: Dict[int, float] = {}
+        for term, tf in Counter(terms(text)).items():
+            h = zlib.crc32(term.encode())
+            dim = h % self.dimensions
+            sign = 1.0 if h & 0x80000000 else -1.0
+            features[dim] = features.get(dim, 0.0) + sign * (1.0 + math.log(tf))
+        return {dim: value for dim, value in features.items() if value != 0.0}
+
+    def _embed(self, text: str) -> Tuple[List[int], List[float]]:
+        features = self._features(text)
+        norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+        dims = list(features)
+        return dims, [features[d] / norm for d in dims]
+
+    def _reserve(self, needed: int):
+        capacity = self.matrix.shape[1]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((self.dimensions, capacity), dtype=np.float32)
+        matrix[:, :self.count] = self.matrix[:, :self.count]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.count] = self.ids[:self.count]
+        self.matrix, self.ids = matrix, ids
+
+    def add(self, doc_id: int, text: str):
+        """Embed a document, replacing any previous vector for the same id"""
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, docs: Iterable[Tuple[int, str]]):
+        """Embed several documents (with distinct ids) in one scatter"""
+        docs = list(docs)
+        for doc_id, _ in docs:
+            self.remove(doc_id)
+        self._reserve(self.count + len(docs))
+        dims, cols, values = [], [], []
+        for doc_id, text in docs:
+            row = self.count
+            self.rows[doc_id] = row
+            self.ids[row] = doc_id
+            self.count += 1
+            doc_dims, doc_values = self._embed(text)
+            dims.extend(doc_dims)
+            cols.extend([row] * len(doc_dims))
+            values.extend(doc_values)
+        if dims:
+            dims = np.asarray(dims, dtype=np.intp)
+            self.matrix[dims, np.asarray(cols, dtype=np.intp)] = values
+            np.add.at(self.df, dims, 1)
+
+    def remove(self, doc_id: int):
+        """Drop a document, moving the last column into its slot"""
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        self.df[np.flatnonzero(self.matrix[:, row])] -= 1
+        last = self.count - 1
+        if row != last:
+            self.matrix[:, row] = self.matrix[:, last]
+            self.ids[row] = self.ids[last]
+            self.rows[int(self.ids[row])] = row
+        self.matrix[:, last] = 0.0
+        self.count = last
+
+    def query_vector(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """IDF-weighted, normalised (dimensions, values) of a query"""
+        features = self._features(query)
+        if not features:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        dims = np.fromiter(features, dtype=np.intp, count=len(features))
+        values = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        values *= np.log((self.count + 1) / (self.df[dims] + 1)).astype(np.float32) + 1.0
+        values /= np.linalg.norm(values) or 1.0
+        return dims, values
+
+    def scores(self, dims: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Similarity of every stored document to a sparse query vector"""
+        n = self.count
+        scores = np.zeros(n, dtype=np.float32)
+        scratch = np.empty(n, dtype=np.float32)
+        for dim, value in zip(dims, values):
+            np.multiply(self.matrix[dim, :n], value, out=scratch)
+            scores += scratch
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """(id, cosine similarity) of the `limit` closest documents, best first"""
+        dims, values = self.query_vector(query)
+        if self.count == 0 or len(dims) == 0 or limit <= 0:
+            return []
+        return self.top_k(self.scores(dims, values), limit)
+
+    def top_k(self, scores: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        best = float(scores.max())
+        if best <= 0.0:
+            return []
+        # Only positive scores count as matches. Rather than partitioning the
+        # whole array, lower a cut-off until it admits `limit` candidates,
+        # which usually leaves a few dozen to sort.
+        cutoff = best * 0.5
+        while True:
+            candidates = np.flatnonzero(scores >= cutoff)
+            if len(candidates) >= limit or cutoff <= 1e-6:
+                break
+            cutoff /= 4
+        if cutoff <= 1e-6:
+            candidates = np.flatnonzero(scores > 0.0)
+        ids = self.ids[candidates]
+        order = np.lexsort((ids, -scores[candidates]))[:limit]
+        return [(int(ids[i]), float(scores[candidates[i]])) for i in order]